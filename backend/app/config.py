@@ -67,6 +67,61 @@ class Settings:
             raise ValueError("SUPABASE_KEY no encontrada en el archivo .env")
         if not self.supabase_service_key:
             raise ValueError("SUPABASE_SERVICE_KEY no encontrada en el archivo .env")
+        
+        # Máximo de queries a Supabase ejecutándose en paralelo (hilos del pool)
+        self.db_max_concurrency = int(os.getenv("DB_MAX_CONCURRENCY", "40"))
+        
+        # Pool de conexiones HTTP hacia PostgREST (uno por worker de uvicorn)
+        self.db_pool_size = int(os.getenv("DB_POOL_SIZE", str(self.db_max_concurrency)))
+        self.db_keepalive_expiry = float(os.getenv("DB_KEEPALIVE_EXPIRY", "30"))
+        self.db_connect_timeout = float(os.getenv("DB_CONNECT_TIMEOUT", "3"))
+        self.db_read_timeout = float(os.getenv("DB_READ_TIMEOUT", "10"))
+        self.db_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+        # HTTP/2 requiere instalar httpx[http2]
+        self.db_http2 = os.getenv("DB_HTTP2", "false").lower() in ("1", "true", "yes")
+        # Reintentos con backoff exponencial solo para lecturas idempotentes
+        self.db_read_retries = int(os.getenv("DB_READ_RETRIES", "2"))
+        self.db_retry_backoff = float(os.getenv("DB_RETRY_BACKOFF", "0.1"))
+        self.storage_timeout = float(os.getenv("STORAGE_TIMEOUT", "60"))
+        
+        # Subidas de archivos: tamaño máximo y subidas simultáneas por worker
+        self.max_image_bytes = int(os.getenv("MAX_IMAGE_SIZE_MB", "20")) * 1024 * 1024
+        self.max_video_bytes = int(os.getenv("MAX_VIDEO_SIZE_MB", "200")) * 1024 * 1024
+        self.max_concurrent_uploads = int(os.getenv("MAX_CONCURRENT_UPLOADS", "4"))
+        
+        # Procesado de media en segundo plano (variantes de imagen y portadas de video)
+        self.media_workers = int(os.getenv("MEDIA_WORKERS", "2"))
+        self.media_format = os.getenv("MEDIA_FORMAT", "webp").lower()  # webp o jpeg
+        self.media_quality = int(os.getenv("MEDIA_QUALITY", "80"))
+        self.media_shutdown_timeout = float(os.getenv("MEDIA_SHUTDOWN_TIMEOUT", "30"))
+        # Posts que siguen "pending" después de estos minutos se marcan "failed"
+        # (su trabajo se perdió al reiniciarse el worker)
+        self.media_stale_minutes = float(os.getenv("MEDIA_STALE_MINUTES", "15"))
+        self.ffmpeg_path = os.getenv("FFMPEG_PATH", "ffmpeg")
+        
+        # Canal de eventos en tiempo real (SSE): cola por conexión y keep-alive
+        self.realtime_queue_size = int(os.getenv("REALTIME_QUEUE_SIZE", "100"))
+        self.realtime_keepalive = float(os.getenv("REALTIME_KEEPALIVE_SECONDS", "15"))
+        
+        # Cache en memoria de perfiles de usuario (por worker)
+        self.profile_cache_size = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+        self.profile_cache_ttl = float(os.getenv("PROFILE_CACHE_TTL", "60"))
+        
+        # Cache de respuestas públicas (feed, posts, comentarios, likes). Con varios
+        # workers cada uno invalida solo su copia; el TTL acota el desfase entre ellos.
+        self.response_cache_ttl = float(os.getenv("RESPONSE_CACHE_TTL", "5"))
+        self.response_cache_size = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+        # max-age del header Cache-Control para navegadores y CDNs (0 = revalidar siempre con ETag)
+        self.response_cache_max_age = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "0"))
+        
+        # Cache en memoria de conteos de no leídos (por worker). El TTL acota cuánto
+        # puede tardar un worker en ver los cambios hechos desde otro.
+        self.unread_cache_size = int(os.getenv("UNREAD_CACHE_SIZE", "10000"))
+        self.unread_cache_ttl = float(os.getenv("UNREAD_CACHE_TTL", "5"))
+        
+        # Avisar (en el log) cuando una petición hace al menos este número de
+        # llamadas a Supabase sobre la misma tabla, señal de un N+1 (0 = desactivado)
+        self.metrics_db_calls_warning = int(os.getenv("METRICS_DB_CALLS_WARNING", "20"))
 
 
 settings = Settings()
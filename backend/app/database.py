@@ -1,11 +1,204 @@
+import random
+import threading
+import time
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+import anyio
+import httpx
+from anyio import CapacityLimiter, to_thread
+from postgrest.utils import SyncClient
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
 from app.config import settings
+from app.metrics import metrics, table_label
+
+T = TypeVar("T")
+
+# Métodos HTTP que se pueden reintentar sin riesgo de duplicar escrituras
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
 
 
 def get_supabase_client() -> Client:
     """Crea y retorna un cliente de Supabase usando la service key"""
-    return create_client(settings.supabase_url, settings.supabase_service_key)
+    options = ClientOptions(
+        postgrest_client_timeout=settings.db_read_timeout,
+        storage_client_timeout=settings.storage_timeout,
+    )
+    return create_client(settings.supabase_url, settings.supabase_service_key, options)
+
+
+def build_http_session(base_url: str, headers: httpx.Headers) -> SyncClient:
+    """Crea la sesión HTTP con pool de conexiones keep-alive para PostgREST"""
+    return SyncClient(
+        base_url=base_url,
+        headers=headers,
+        timeout=httpx.Timeout(
+            settings.db_read_timeout,
+            connect=settings.db_connect_timeout,
+            pool=settings.db_pool_timeout,
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.db_pool_size,
+            max_keepalive_connections=settings.db_pool_size,
+            keepalive_expiry=settings.db_keepalive_expiry,
+        ),
+        http2=settings.db_http2,
+    )
+
+
+class Database:
+    """Capa de acceso a datos no bloqueante sobre el cliente síncrono de Supabase.
+
+    El cliente de Supabase hace HTTP bloqueante en `.execute()`, así que cada
+    llamada se delega a un pool de hilos acotado para no congelar el event loop.
+    El cliente se crea en el startup de FastAPI (uno por worker de uvicorn) y
+    se cierra en el shutdown.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._client: Optional[Client] = None
+        self._postgrest = None
+        self._limiter = None
+        self.queries_total = 0
+        self.retries_total = 0
+        self.errors_total = 0
+        self.peak_in_flight = 0
+        self._running = 0
+        self._running_lock = threading.Lock()
+
+    async def connect(self) -> None:
+        """Crea el cliente de Supabase y su pool de conexiones"""
+        self._open()
+
+    async def close(self) -> None:
+        """Cierra las conexiones abiertas del pool"""
+        if self._client is None:
+            return
+        self._postgrest.session.close()
+        self._client = None
+        self._postgrest = None
+
+    def _open(self) -> None:
+        if self._client is not None:
+            return
+        client = get_supabase_client()
+        postgrest = client.postgrest
+        # Reemplazar la sesión por defecto por una con pool y timeouts configurables
+        default_session = postgrest.session
+        postgrest.session = build_http_session(str(default_session.base_url), default_session.headers)
+        default_session.close()
+        self._postgrest = postgrest
+        self._client = client
+
+    @property
+    def client(self) -> Client:
+        # Fuera del ciclo de vida de la app (scripts, consola) se crea al vuelo
+        self._open()
+        return self._client
+
+    @property
+    def limiter(self) -> CapacityLimiter:
+        # anyio solo permite crear el limiter dentro del event loop
+        if self._limiter is None:
+            self._limiter = CapacityLimiter(self.max_concurrency)
+        return self._limiter
+
+    def table(self, name: str):
+        """Retorna un query builder para la tabla (no hace I/O hasta `execute`)"""
+        self._open()
+        return self._postgrest.from_(name)
+
+    def rpc(self, fn: str, params: dict):
+        """Retorna un query builder para una función RPC de Postgres"""
+        self._open()
+        return self._postgrest.rpc(fn, params)
+
+    @property
+    def storage(self):
+        return self.client.storage
+
+    @property
+    def auth(self):
+        return self.client.auth
+
+    async def execute(self, query: Any) -> Any:
+        """Ejecuta un query builder de PostgREST sin bloquear el event loop.
+
+        Las lecturas (GET/HEAD) se reintentan con backoff exponencial ante
+        errores de red o timeouts; las escrituras nunca se reintentan. Cada
+        llamada se registra en las métricas con su tabla y duración.
+        """
+        retries = settings.db_read_retries if query.http_method in IDEMPOTENT_METHODS else 0
+        attempt = 0
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    return await self._run(query.execute)
+                except httpx.TransportError:
+                    if attempt >= retries:
+                        self.errors_total += 1
+                        raise
+                    self.retries_total += 1
+                    await anyio.sleep(settings.db_retry_backoff * (2 ** attempt) * (1 + random.random()))
+                    attempt += 1
+        finally:
+            # Una llamada por query (incluidos sus reintentos), atribuida a la petición en curso
+            metrics.record_db_call(table_label(query.path), query.http_method, time.perf_counter() - start)
+
+    async def run(self, fn: Callable[..., T], *args: Any, label: str = "other", method: str = "CALL", **kwargs: Any) -> T:
+        """Ejecuta cualquier llamada bloqueante (storage, auth) en el pool de hilos.
+
+        `label` y `method` la identifican en las métricas igual que la tabla y
+        el método HTTP de una query (por ejemplo "storage:post-images" y
+        "UPLOAD", o "auth" y "GET_USER").
+        """
+        start = time.perf_counter()
+        try:
+            return await self._run(fn, *args, **kwargs)
+        finally:
+            metrics.record_db_call(label, method, time.perf_counter() - start)
+
+    async def _run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        self.queries_total += 1
+        return await to_thread.run_sync(partial(self._call, fn, *args, **kwargs), limiter=self.limiter)
+
+    def _call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        # Corre en el hilo, ya con el token del limiter: cuenta solo las llamadas
+        # que realmente se están ejecutando (las que esperan turno no)
+        with self._running_lock:
+            self._running += 1
+            if self._running > self.peak_in_flight:
+                self.peak_in_flight = self._running
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._running_lock:
+                self._running -= 1
 
+    def pool_stats(self) -> dict:
+        """Métricas de saturación del pool de hilos y de conexiones HTTP"""
+        limiter_stats = self.limiter.statistics()
+        stats = {
+            "in_flight": limiter_stats.borrowed_tokens,
+            "max_concurrency": limiter_stats.total_tokens,
+            "waiting": limiter_stats.tasks_waiting,
+            "peak_in_flight": self.peak_in_flight,
+            "saturation": limiter_stats.borrowed_tokens / limiter_stats.total_tokens,
+            "queries_total": self.queries_total,
+            "retries_total": self.retries_total,
+            "errors_total": self.errors_total,
+            "pool_size": settings.db_pool_size,
+            "open_connections": None,
+        }
+        if self._postgrest is not None:
+            # httpx no expone el pool públicamente; si cambia la estructura interna se omite
+            pool = getattr(getattr(self._postgrest.session, "_transport", None), "_pool", None)
+            connections = getattr(pool, "connections", None)
+            if connections is not None:
+                stats["open_connections"] = len(connections)
+        return stats
 
-supabase: Client = get_supabase_client()
 
+db = Database(settings.db_max_concurrency)
@@ -1,8 +1,16 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
-from app.routes import auth, posts, likes, comments, profiles, messages
+from app.routes import auth, posts, likes, comments, profiles, messages, search
+from app.database import db
+from app.media import media_pipeline
+from app.metrics import MetricsMiddleware, metrics, render_stats
+from app.profile_service import profile_cache
+from app.realtime import hub
+from app.response_cache import response_cache
+from app.uploads import UploadSizeLimitMiddleware
+from app.config import settings
 
 app = FastAPI(title="RReediitt API", version="1.0.0")
 
@@ -41,6 +49,11 @@ def is_origin_allowed(origin: str) -> bool:
     
     return False
 
+# Cortar cuerpos de petición demasiado grandes mientras se reciben (con 1 MB de
+# margen para los demás campos). Se registra antes que CORS para que las
+# respuestas 413 también lleven los headers de CORS.
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=settings.max_video_bytes + 1024 * 1024)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origin_regex=r"https://.*\.vercel\.app",  # Regex para vercel.app
@@ -51,6 +64,10 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Registrado al final para quedar por fuera de todo: mide también las
+# respuestas de CORS y de los demás middlewares
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
 # Exception handler solo para excepciones no manejadas (no HTTPException)
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -85,6 +102,21 @@ async def global_exception_handler(request: Request, exc: Exception):
         }
     )
 
+# Ciclo de vida del cliente de Supabase: uno por worker, creado al arrancar
+@app.on_event("startup")
+async def startup():
+    await db.connect()
+    media_pipeline.start()
+    media_pipeline.start_sweeper()
+    await hub.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await hub.stop()
+    await media_pipeline.stop()
+    await db.close()
+
 # Incluir routers
 app.include_router(auth.router)
 app.include_router(posts.router)
@@ -92,6 +124,7 @@ app.include_router(likes.router)
 app.include_router(comments.router)
 app.include_router(profiles.router)
 app.include_router(messages.router)
+app.include_router(search.router)
 
 
 @app.get("/")
@@ -101,5 +134,25 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "db_pool": db.pool_stats(),
+        "profile_cache": profile_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "unread_cache": messages.unread_cache.stats(),
+        "realtime": hub.stats(),
+        "media": media_pipeline.stats(),
+    }
+
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Métricas del worker en formato de texto de Prometheus"""
+    extra = (
+        render_stats("db_pool", db.pool_stats())
+        + render_stats("profile_cache", profile_cache.stats())
+        + render_stats("response_cache", response_cache.stats())
+        + render_stats("realtime", hub.stats())
+        + render_stats("media", media_pipeline.stats())
+    )
+    return PlainTextResponse(metrics.render(extra), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,214 @@
+import asyncio
+import contextvars
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Set
+from PIL import Image, ImageOps
+from app.config import settings
+from app.database import db
+from app.response_cache import response_cache
+from app.uploads import BUCKET, STORAGE_LABEL, upload_from_disk
+
+# Lado mayor (en píxeles) de cada variante de imagen
+IMAGE_VARIANTS = {
+    "thumbnail": 320,
+    "feed": 1080,
+    "full": 2048,
+}
+
+# Cada cuánto se buscan posts que quedaron "pending" sin trabajo que los procese
+STALE_SWEEP_SECONDS = 60
+
+FORMATS = {
+    "webp": ("WEBP", "webp", "image/webp"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+}
+
+
+def render_image_variants(source_path: str, output_dir: str, image_format: str) -> Dict[str, str]:
+    """Genera las variantes redimensionadas de una imagen (se ejecuta en un proceso del pool)"""
+    pil_format, extension, _ = FORMATS[image_format]
+    outputs = {}
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA") or pil_format == "JPEG":
+            image = image.convert("RGB")
+        for name, max_side in IMAGE_VARIANTS.items():
+            variant = image.copy()
+            # thumbnail() nunca agranda: las imágenes pequeñas conservan su tamaño
+            variant.thumbnail((max_side, max_side), Image.LANCZOS)
+            path = os.path.join(output_dir, f"{name}.{extension}")
+            variant.save(path, pil_format, quality=settings.media_quality)
+            outputs[name] = path
+    return outputs
+
+
+def render_video_poster(source_path: str, output_dir: str, image_format: str) -> Dict[str, str]:
+    """Extrae un fotograma del video como portada y genera su miniatura (proceso del pool)"""
+    frame_path = os.path.join(output_dir, "frame.png")
+    subprocess.run(
+        [settings.ffmpeg_path, "-v", "error", "-y", "-ss", "1", "-i", source_path,
+         "-frames:v", "1", frame_path],
+        check=True,
+        timeout=120,
+    )
+    if not os.path.exists(frame_path):
+        # Videos de menos de un segundo: usar el primer fotograma
+        subprocess.run(
+            [settings.ffmpeg_path, "-v", "error", "-y", "-i", source_path, "-frames:v", "1", frame_path],
+            check=True,
+            timeout=120,
+        )
+    variants = render_image_variants(frame_path, output_dir, image_format)
+    return {"poster": variants["feed"], "thumbnail": variants["thumbnail"]}
+
+
+class MediaPipeline:
+    """Procesa en segundo plano la media de los posts recién creados.
+
+    El trabajo de CPU (redimensionar, extraer portadas) corre en un pool de
+    procesos; las subidas y la actualización del post corren en el event loop.
+    El post es visible desde que se crea y `media_variants` se completa al terminar.
+
+    Los trabajos viven solo en la memoria del worker: si el proceso se reinicia
+    antes de terminarlos, sus posts quedarían "pending" para siempre. Un barrido
+    periódico los marca "failed" cuando llevan más de MEDIA_STALE_MINUTES, y el
+    post se sigue mostrando con el archivo original.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._sweeper: Optional[asyncio.Task] = None
+        self.stale_failed_total = 0
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def start_sweeper(self) -> None:
+        """Arranca el barrido de posts "pending" huérfanos (llamar desde el startup)"""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop(), context=contextvars.Context())
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            try:
+                await self.fail_stale()
+            except Exception as e:
+                print(f"Error buscando media pendiente huérfana: {str(e)}")
+            await asyncio.sleep(STALE_SWEEP_SECONDS)
+
+    async def fail_stale(self) -> int:
+        """Marca "failed" los posts que siguen "pending" después de MEDIA_STALE_MINUTES.
+
+        Ningún trabajo tarda tanto, así que su worker se reinició (deploy, caída)
+        y perdió el trabajo junto con la copia local del archivo. Retorna cuántos marcó.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=settings.media_stale_minutes)
+        response = await db.execute(
+            db.table("posts")
+            .update({"media_status": "failed"})
+            .eq("media_status", "pending")
+            .lt("created_at", cutoff.isoformat())
+        )
+        post_ids = [post["id"] for post in response.data or []]
+        if post_ids:
+            print(f"Media sin procesar marcada como fallida en {len(post_ids)} posts")
+            self.stale_failed_total += len(post_ids)
+            await response_cache.invalidate("feed", *(f"post:{post_id}" for post_id in post_ids))
+        return len(post_ids)
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        # Dar tiempo a que terminen los trabajos en curso antes de cerrar el pool
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=settings.media_shutdown_timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def stats(self) -> dict:
+        return {"pending": self.pending, "stale_failed_total": self.stale_failed_total}
+
+    def can_process(self, kind: str) -> bool:
+        """False si este tipo de media no genera variantes (videos sin ffmpeg disponible)"""
+        return kind != "video" or shutil.which(settings.ffmpeg_path) is not None
+
+    def submit(self, post_id: str, local_path: str, kind: str, storage_prefix: str) -> None:
+        """Encola el procesado; el archivo local pasa a ser responsabilidad del pipeline.
+
+        Solo se llama si `can_process(kind)`; el post ya quedó con media_status "pending".
+        """
+        self.start()
+        # Contexto vacío: la tarea sobrevive a la petición y sus llamadas a
+        # Supabase no deben sumarse a las métricas de esa petición
+        task = asyncio.create_task(
+            self._process(post_id, local_path, kind, storage_prefix), context=contextvars.Context()
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _restart_executor(self, broken: ProcessPoolExecutor) -> None:
+        # Varias tareas pueden ver el mismo pool roto: solo la primera lo reemplaza
+        if self._executor is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    async def _render(self, render, local_path: str, output_dir: str) -> Dict[str, str]:
+        """Ejecuta `render` en el pool; si un proceso murió (por ejemplo por falta de
+        memoria) el pool queda inutilizable, así que se reemplaza y se reintenta una vez"""
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            return await loop.run_in_executor(executor, render, local_path, output_dir, settings.media_format)
+        except BrokenProcessPool:
+            print("El pool de procesado de media se rompió; se reinicia")
+            self._restart_executor(executor)
+            return await loop.run_in_executor(self._executor, render, local_path, output_dir, settings.media_format)
+
+    async def _process(self, post_id: str, local_path: str, kind: str, storage_prefix: str) -> None:
+        output_dir = tempfile.mkdtemp(prefix="media-")
+        try:
+            render = render_video_poster if kind == "video" else render_image_variants
+            outputs = await self._render(render, local_path, output_dir)
+            
+            variants = {}
+            for name, path in outputs.items():
+                extension = path.rsplit(".", 1)[-1]
+                content_type = "image/jpeg" if extension == "jpg" else f"image/{extension}"
+                storage_path = f"{storage_prefix}_{name}.{extension}"
+                await db.run(upload_from_disk, path, storage_path, content_type, label=STORAGE_LABEL, method="UPLOAD")
+                variants[name] = db.storage.from_(BUCKET).get_public_url(storage_path)
+            
+            await db.execute(
+                db.table("posts")
+                .update({"media_variants": variants, "media_status": "ready"})
+                .eq("id", post_id)
+            )
+            await response_cache.invalidate("feed", f"post:{post_id}")
+        except Exception as e:
+            print(f"Error procesando media del post {post_id}: {str(e)}")
+            try:
+                await db.execute(db.table("posts").update({"media_status": "failed"}).eq("id", post_id))
+            except Exception:
+                pass
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+            if os.path.exists(local_path):
+                os.remove(local_path)
+
+
+media_pipeline = MediaPipeline(settings.media_workers)
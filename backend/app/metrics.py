@@ -0,0 +1,240 @@
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+
+PREFIX = "rreediitt"
+
+# Límites (en segundos) de los histogramas de latencia
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Límites del histograma de llamadas a Supabase por petición
+CALLS_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in self._values.items():
+            lines.append(f"{self.name}{format_labels(self.labels, values)} {format_number(total)}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self) -> None:
+        self.value += 1
+
+    def dec(self) -> None:
+        self.value -= 1
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.value}"]
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Por serie: conteo por bucket (no acumulado), suma y total de observaciones
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        for values, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{format_labels(names, values + (format_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{format_labels(names, values + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, values)} {format_number(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, values)} {count}")
+        return lines
+
+
+class RequestStats:
+    """Llamadas a Supabase hechas durante una petición, por tabla (o función RPC)"""
+
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+        self.seconds = 0.0
+
+    def record(self, table: str, seconds: float) -> None:
+        self.calls[table] = self.calls.get(table, 0) + 1
+        self.seconds += seconds
+
+
+# Estadísticas de la petición en curso (None fuera de una petición: startup y tareas de
+# fondo, que se crean con un contexto vacío para no heredar el de la petición)
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+class Metrics:
+    """Métricas del worker en formato de texto de Prometheus (`GET /metrics`).
+
+    Cada worker de uvicorn tiene las suyas; Prometheus las agrega al
+    recolectar cada worker (o se usa un solo worker por contenedor).
+    """
+
+    def __init__(self):
+        self.in_flight = Gauge(f"{PREFIX}_http_requests_in_flight", "Peticiones HTTP en curso")
+        self.request_duration = Histogram(
+            f"{PREFIX}_http_request_duration_seconds",
+            "Latencia de las peticiones HTTP por ruta",
+            ("method", "route", "status"),
+            LATENCY_BUCKETS,
+        )
+        self.request_db_duration = Histogram(
+            f"{PREFIX}_http_request_db_seconds",
+            "Tiempo de cada petición esperando a Supabase, por ruta",
+            ("method", "route"),
+            LATENCY_BUCKETS,
+        )
+        self.request_db_calls = Histogram(
+            f"{PREFIX}_http_request_db_calls",
+            "Llamadas a Supabase por petición, por ruta y tabla (valores altos indican N+1)",
+            ("method", "route", "table"),
+            CALLS_BUCKETS,
+        )
+        self.db_calls = Counter(f"{PREFIX}_db_calls_total", "Llamadas a Supabase por tabla (o storage/auth) y método", ("table", "method"))
+        self.db_duration = Histogram(
+            f"{PREFIX}_db_call_duration_seconds",
+            "Duración de las llamadas a Supabase por tabla",
+            ("table",),
+            LATENCY_BUCKETS,
+        )
+
+    def record_db_call(self, table: str, method: str, seconds: float) -> None:
+        self.db_calls.inc(table, method)
+        self.db_duration.observe(seconds, table)
+        stats = current_request.get()
+        if stats is not None:
+            stats.record(table, seconds)
+
+    def record_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        self.request_duration.observe(seconds, method, route, str(status))
+        self.request_db_duration.observe(stats.seconds, method, route)
+        for table, calls in stats.calls.items():
+            self.request_db_calls.observe(calls, method, route, table)
+            if settings.metrics_db_calls_warning and calls >= settings.metrics_db_calls_warning:
+                print(f"Posible N+1: {method} {route} hizo {calls} llamadas a {table}")
+
+    def render(self, extra: Iterable[str] = ()) -> str:
+        lines = []
+        for metric in (self.in_flight, self.request_duration, self.request_db_duration,
+                       self.request_db_calls, self.db_calls, self.db_duration):
+            lines.extend(metric.render())
+        lines.extend(extra)
+        return "\n".join(lines) + "\n"
+
+
+def render_stats(name: str, stats: dict) -> List[str]:
+    """Exporta como gauges los valores numéricos de un dict de estadísticas (`pool_stats`, `stats()`)"""
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        metric = f"{PREFIX}_{name}_{key}"
+        lines.extend([f"# TYPE {metric} gauge", f"{metric} {format_number(value)}"])
+    return lines
+
+
+def table_label(path: str) -> str:
+    """Nombre de la tabla a partir de la ruta de PostgREST ("/posts", "/rpc/vote_post")"""
+    path = path.strip("/")
+    return "rpc:" + path[4:] if path.startswith("rpc/") else path
+
+
+class MetricsMiddleware:
+    """Mide cada petición HTTP: latencia por ruta, peticiones en curso y llamadas a Supabase.
+
+    La ruta se reporta con su plantilla ("/api/posts/{post_id}") para no crear
+    una serie por cada id. Las conexiones SSE cuentan como en curso mientras
+    están abiertas.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+        self._routes: Dict[int, str] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        self.metrics.in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            seconds = time.perf_counter() - start
+            self.metrics.in_flight.dec()
+            current_request.reset(token)
+            self.metrics.record_request(scope["method"], self.route_label(scope), status, seconds, stats)
+
+    def route_label(self, scope: Scope) -> str:
+        # El router de Starlette deja en el scope el endpoint que atendió la petición
+        endpoint = scope.get("endpoint")
+        router = scope.get("router")
+        if endpoint is None or router is None:
+            return "unmatched"
+        if not self._routes:
+            self._routes = {id(route.endpoint): route.path for route in router.routes if hasattr(route, "endpoint")}
+        return self._routes.get(id(endpoint), "unmatched")
+
+
+metrics = Metrics()
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, TypeAdapter
+from typing import List, Optional
 from datetime import datetime
 from uuid import UUID
 
@@ -10,6 +10,14 @@ class PostBase(BaseModel):
     video_url: Optional[str] = None
 
 
+class MediaVariants(BaseModel):
+    # Imágenes: thumbnail, feed y full. Videos: poster y thumbnail.
+    thumbnail: Optional[str] = None
+    feed: Optional[str] = None
+    full: Optional[str] = None
+    poster: Optional[str] = None
+
+
 class PostCreate(PostBase):
     user_email: str
 
@@ -20,11 +28,28 @@ class Post(PostBase):
     created_at: datetime
     username: Optional[str] = None
     avatar_url: Optional[str] = None
+    # Variantes generadas en segundo plano; media_status: pending, ready o failed
+    media_status: Optional[str] = None
+    media_variants: Optional[MediaVariants] = None
+    # Solo presentes cuando se piden con include_counts=true
+    likes: Optional[int] = None
+    dislikes: Optional[int] = None
+    comment_count: Optional[int] = None
+    user_vote: Optional[bool] = None  # True = like, False = dislike, None = sin voto
     
     class Config:
         from_attributes = True
 
 
+class PostPreview(BaseModel):
+    # Versión ligera de Post para la cuadrícula del perfil (fields=grid)
+    id: UUID
+    preview: str
+    thumbnail: Optional[str] = None
+    has_video: bool = False
+    created_at: datetime
+
+
 class LikeCreate(BaseModel):
     post_id: UUID
     user_email: str
@@ -36,10 +61,15 @@ class LikeCount(BaseModel):
     dislikes: int
 
 
+class LikeResult(LikeCount):
+    message: str
+
+
 class CommentCreate(BaseModel):
     post_id: UUID
     user_email: str
     content: str
+    parent_id: Optional[UUID] = None  # Comentario al que se responde
 
 
 class Comment(BaseModel):
@@ -48,6 +78,9 @@ class Comment(BaseModel):
     user_email: str
     content: str
     created_at: datetime
+    parent_id: Optional[UUID] = None
+    depth: int = 0
+    reply_count: int = 0
     username: Optional[str] = None
     avatar_url: Optional[str] = None
     
@@ -55,6 +88,25 @@ class Comment(BaseModel):
         from_attributes = True
 
 
+class CommentThread(Comment):
+    # Comentario con sus primeras respuestas; si reply_count es mayor que
+    # len(replies), replies_cursor permite cargar las siguientes
+    replies: List[Comment] = []
+    replies_cursor: Optional[str] = None
+
+
+class SearchResult(BaseModel):
+    type: str  # "post" o "comment"
+    id: UUID
+    post_id: UUID  # Post al que lleva el resultado (el mismo id si es un post)
+    user_email: str
+    content: str
+    created_at: datetime
+    rank: float
+    username: Optional[str] = None
+    avatar_url: Optional[str] = None
+
+
 class User(BaseModel):
     email: str
     username: Optional[str] = None
@@ -111,3 +163,14 @@ class Message(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+# Validan una lista completa de filas en una sola llamada al núcleo de
+# pydantic, en lugar de construir cada modelo por separado desde Python
+PostList = TypeAdapter(List[Post])
+PostPreviewList = TypeAdapter(List[PostPreview])
+CommentList = TypeAdapter(List[Comment])
+CommentThreadList = TypeAdapter(List[CommentThread])
+MessageList = TypeAdapter(List[Message])
+UserList = TypeAdapter(List[User])
+SearchResultList = TypeAdapter(List[SearchResult])
@@ -0,0 +1,63 @@
+import base64
+import json
+from typing import Any, List, Optional, Sequence
+from fastapi import HTTPException
+
+# Header en el que se devuelve el cursor de la página siguiente
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    """Codifica los valores de la última fila en un cursor opaco"""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decodifica un cursor generado por `encode_cursor`"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return values
+
+
+def quote_value(value: Any) -> str:
+    """Entrecomilla un valor para usarlo dentro de un filtro `or=(...)` de PostgREST"""
+    # Las comillas dobles permiten valores con comas, puntos o paréntesis
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def apply_keyset(query, columns: Sequence[str], cursor_values: Optional[List[Any]] = None, desc: bool = True):
+    """Ordena por `columns` y, si hay cursor, devuelve solo las filas posteriores a él.
+
+    Equivale a `WHERE (a, b) < (x, y) ORDER BY a DESC, b DESC`, que Postgres
+    resuelve con un índice compuesto sin recorrer las filas anteriores.
+    PostgREST no acepta comparaciones de filas, así que se envía como
+    `a <= x AND (a < x OR (a = x AND b < y))`: la cota sobre `a` es redundante,
+    pero sin ella Postgres no puede usar el OR como condición del índice y
+    recorre desde el principio todas las filas de las páginas anteriores.
+    """
+    direction = "desc" if desc else "asc"
+    query.params = query.params.add("order", ",".join(f"{column}.{direction}" for column in columns))
+    if cursor_values:
+        op = "lt" if desc else "gt"
+        # (a, b) < (x, y)  <=>  a < x OR (a = x AND b < y)
+        conditions = []
+        for i, column in enumerate(columns):
+            equals = [f"{columns[j]}.eq.{quote_value(cursor_values[j])}" for j in range(i)]
+            strict = f"{column}.{op}.{quote_value(cursor_values[i])}"
+            conditions.append(f"and({','.join(equals + [strict])})" if equals else strict)
+        query.params = query.params.add("or", f"({','.join(conditions)})")
+        query.params = query.params.add(columns[0], f"{'lte' if desc else 'gte'}.{cursor_values[0]}")
+    return query
+
+
+def next_cursor(rows: List[dict], columns: Sequence[str], limit: int) -> Optional[str]:
+    """Retorna el cursor de la siguiente página, o None si no hay más filas"""
+    if len(rows) < limit:
+        return None
+    return encode_cursor(*(rows[-1][column] for column in columns))
@@ -0,0 +1,79 @@
+from typing import Dict, Iterable, Optional
+from app.cache import TTLCache
+from app.config import settings
+from app.database import db
+from app.pagination import quote_value
+
+# Perfiles por email. Los emails sin perfil se guardan como {} para no
+# volver a consultarlos en cada request.
+profile_cache = TTLCache(maxsize=settings.profile_cache_size, ttl=settings.profile_cache_ttl)
+
+# Identificador de las URLs (username o email) -> email, y ("username", email) -> username
+# para poder invalidar el username anterior cuando cambia
+identifier_cache = TTLCache(maxsize=settings.profile_cache_size, ttl=settings.profile_cache_ttl)
+
+
+async def get_profiles(emails: Iterable[str]) -> Dict[str, dict]:
+    """Obtiene los perfiles de los emails dados, consultando solo los que no están en cache"""
+    profiles = {}
+    missing = []
+    for email in set(e for e in emails if e):
+        profile = profile_cache.get(email)
+        if profile is None:
+            missing.append(email)
+        elif profile:
+            profiles[email] = profile
+    
+    if missing:
+        response = await db.execute(db.table("user_profiles").select("*").in_("email", missing))
+        for profile in response.data or []:
+            profile_cache.set(profile["email"], profile)
+            profiles[profile["email"]] = profile
+        for email in missing:
+            if email not in profiles:
+                profile_cache.set(email, {})
+    
+    return profiles
+
+
+def invalidate_profile(email: str, old_username: Optional[str] = None) -> None:
+    """Elimina un perfil del cache (llamar tras crear o actualizar el perfil).
+
+    `old_username` es el username previo a un cambio, leído de la base de
+    datos: la entrada ("username", email) puede haber salido del LRU antes que
+    la del username, y sin ella no se sabría qué username invalidar.
+    """
+    profile_cache.invalidate(email)
+    usernames = {identifier_cache.get(("username", email)), old_username}
+    for username in usernames - {None}:
+        identifier_cache.invalidate(username)
+    identifier_cache.invalidate(("username", email))
+    identifier_cache.invalidate(email)
+
+
+async def find_profile(identifier: str) -> Optional[dict]:
+    """Busca un perfil por username o email en una sola query (sin cache del perfil)"""
+    query = db.table("user_profiles").select("*")
+    value = quote_value(identifier)
+    query.params = query.params.add("or", f"(username.eq.{value},email.eq.{value})")
+    response = await db.execute(query)
+    if not response.data:
+        return None
+    # Si el identificador es el username de un perfil y el email de otro, gana el username
+    profile = next((p for p in response.data if p.get("username") == identifier), response.data[0])
+    profile_cache.set(profile["email"], profile)
+    identifier_cache.set(identifier, profile["email"])
+    if profile.get("username"):
+        identifier_cache.set(("username", profile["email"]), profile["username"])
+    return profile
+
+
+async def resolve_email(identifier: str) -> Optional[str]:
+    """Resuelve un username o email al email del perfil, usando el cache si es posible"""
+    email = identifier_cache.get(identifier)
+    if email is None:
+        profile = await find_profile(identifier)
+        if profile is None:
+            return None
+        email = profile["email"]
+    return email
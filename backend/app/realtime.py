@@ -0,0 +1,113 @@
+import asyncio
+import json
+from typing import Awaitable, Callable, Dict, Optional, Set
+from app.config import settings
+
+# Función del hub que entrega un evento a las conexiones locales de un usuario
+Deliver = Callable[[str, dict], Awaitable[None]]
+
+
+class InMemoryBroker:
+    """Broker local: entrega los eventos solo a las conexiones de este proceso.
+
+    Sirve para un único worker y para pruebas. Para varios workers se usa un
+    broker compartido (por ejemplo Redis pub/sub) con la misma interfaz:
+    `start(deliver)`, `stop()`, `publish(user_email, event)` y `shared = True`,
+    que reenvía cada evento publicado al `deliver` de todos los workers.
+    """
+
+    # False: los eventos nunca salen del proceso
+    shared = False
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+    async def publish(self, user_email: str, event: dict) -> None:
+        if self._deliver is not None:
+            await self._deliver(user_email, event)
+
+
+class RealtimeHub:
+    """Reparte eventos en tiempo real (mensajes, lecturas, no leídos) a los usuarios conectados.
+
+    Cada conexión abierta tiene su propia cola acotada; si un cliente no lee
+    a tiempo se descartan sus eventos más antiguos en lugar de acumular memoria.
+    """
+
+    def __init__(self, queue_size: int, broker=None):
+        self.queue_size = queue_size
+        self.broker = broker or InMemoryBroker()
+        self._queues: Dict[str, Set[asyncio.Queue]] = {}
+        self.events_published = 0
+        self.events_dropped = 0
+
+    async def start(self) -> None:
+        await self.broker.start(self.deliver)
+
+    async def stop(self) -> None:
+        await self.broker.stop()
+        # Cerrar las conexiones abiertas para que el shutdown no quede esperando
+        for queues in self._queues.values():
+            for queue in queues:
+                self._put(queue, None)
+
+    def set_broker(self, broker) -> None:
+        """Reemplaza el broker (antes del startup) por uno compartido entre workers"""
+        self.broker = broker
+
+    def connect(self, user_email: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._queues.setdefault(user_email, set()).add(queue)
+        return queue
+
+    def disconnect(self, user_email: str, queue: asyncio.Queue) -> None:
+        queues = self._queues.get(user_email)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._queues[user_email]
+
+    def is_listening(self, user_email: str) -> bool:
+        """True si el evento puede llegar a alguien (con un broker compartido no se sabe)"""
+        return self.broker.shared or user_email in self._queues
+
+    async def publish(self, user_email: str, event: dict) -> None:
+        """Publica un evento para un usuario; los errores del broker no afectan a la petición"""
+        self.events_published += 1
+        try:
+            await self.broker.publish(user_email, event)
+        except Exception as e:
+            print(f"Error publicando evento en tiempo real: {str(e)}")
+
+    async def deliver(self, user_email: str, event: dict) -> None:
+        for queue in self._queues.get(user_email, ()):
+            self._put(queue, event)
+
+    def _put(self, queue: asyncio.Queue, event: Optional[dict]) -> None:
+        if queue.full():
+            queue.get_nowait()
+            self.events_dropped += 1
+        queue.put_nowait(event)
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._queues),
+            "connections": sum(len(queues) for queues in self._queues.values()),
+            "events_published": self.events_published,
+            "events_dropped": self.events_dropped,
+        }
+
+
+def format_sse(event: dict) -> str:
+    """Serializa un evento en el formato de Server-Sent Events"""
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+hub = RealtimeHub(settings.realtime_queue_size)
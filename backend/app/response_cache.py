@@ -0,0 +1,188 @@
+import hashlib
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Set
+from fastapi import Request, Response
+from pydantic_core import to_json
+from app.cache import TTLCache
+from app.config import settings
+
+# Parámetros de query que personalizan la respuesta (no se cachean)
+PERSONAL_PARAMS = ("viewer_email", "user_email")
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+
+
+class InMemoryCacheBackend:
+    """Backend local (por worker): LRU con TTL e índice de claves por tag.
+
+    Un backend externo (por ejemplo Redis) implementa la misma interfaz:
+    `get(key)`, `set(key, entry, ttl, tags)`, `invalidate(tags)` y `stats()`.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._tags: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, entry: CachedResponse, ttl: float, tags: Iterable[str]) -> None:
+        self._entries.set(key, entry, ttl)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        if len(self._tags) > 2 * self._entries.maxsize:
+            self._prune_tags()
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            for key in self._tags.pop(tag, ()):
+                self._entries.invalidate(key)
+
+    def _prune_tags(self) -> None:
+        # Olvidar las claves que ya expiraron o salieron del LRU
+        live = set(self._entries.keys())
+        for tag in list(self._tags):
+            keys = self._tags[tag] & live
+            if keys:
+                self._tags[tag] = keys
+            else:
+                del self._tags[tag]
+
+    def stats(self) -> dict:
+        return {**self._entries.stats(), "tags": len(self._tags)}
+
+
+def make_etag(body: bytes) -> str:
+    """ETag débil a partir del hash del contenido"""
+    return 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True si el cliente ya tiene esta versión (header If-None-Match)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    # La comparación débil ignora el prefijo W/
+    return "*" in candidates or etag.removeprefix("W/") in (c.removeprefix("W/") for c in candidates)
+
+
+def render_json(content: Any) -> bytes:
+    """Serializa modelos, listas y dicts directamente a JSON con el serializador de pydantic-core.
+
+    Evita el paso intermedio por `jsonable_encoder` + `json.dumps` y la
+    re-validación de `response_model`: los datos ya se validaron al construirlos.
+    """
+    return to_json(content)
+
+
+def conditional_response(
+    request: Request,
+    content: Any,
+    headers: Optional[Dict[str, str]] = None,
+    private: bool = False
+) -> Response:
+    """Respuesta JSON con ETag; si el cliente ya tiene esta versión retorna 304 sin cuerpo.
+
+    Para lecturas que no pasan por el cache de respuestas. `no-cache` obliga a
+    revalidar siempre; `private` evita que un CDN guarde respuestas personalizadas.
+    """
+    body = render_json(content)
+    etag = make_etag(body)
+    headers = {
+        **(headers or {}),
+        "ETag": etag,
+        "Cache-Control": "private, no-cache" if private else "public, no-cache",
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def is_anonymous(request: Request) -> bool:
+    """Las peticiones sin credenciales ni parámetros personales comparten respuesta"""
+    if "authorization" in request.headers:
+        return False
+    return not any(param in request.query_params for param in PERSONAL_PARAMS)
+
+
+class ResponseCache:
+    """Cache de respuestas JSON de lectura, con invalidación por tags.
+
+    La clave es la ruta más los parámetros de query. Cada respuesta lleva su
+    ETag y `Cache-Control`, así navegadores y CDNs pueden revalidar y recibir
+    un 304 sin cuerpo. Las escrituras invalidan los tags afectados
+    (por ejemplo "feed" o "post:<id>").
+    """
+
+    def __init__(self, ttl: float, max_age: int, backend=None):
+        self.ttl = ttl
+        self.cache_control = f"public, max-age={max_age}, must-revalidate"
+        self.backend = backend or InMemoryCacheBackend(settings.response_cache_size, ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def set_backend(self, backend) -> None:
+        """Reemplaza el backend (antes del startup) por uno compartido entre workers"""
+        self.backend = backend
+
+    @staticmethod
+    def key(request: Request) -> str:
+        params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"{request.url.path}?{params}"
+
+    async def get(self, request: Request) -> Optional[Response]:
+        """Retorna la respuesta cacheada (200 o 304), o None si no está en cache"""
+        try:
+            entry = await self.backend.get(self.key(request))
+        except Exception as e:
+            print(f"Error leyendo cache de respuestas: {str(e)}")
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.build_response(request, entry)
+
+    async def put(
+        self,
+        request: Request,
+        content: Any,
+        tags: Iterable[str],
+        headers: Optional[Dict[str, str]] = None
+    ) -> Response:
+        """Guarda la respuesta en cache y la retorna con sus headers de validación"""
+        body = render_json(content)
+        entry = CachedResponse(body=body, etag=make_etag(body), headers=headers or {})
+        try:
+            await self.backend.set(self.key(request), entry, self.ttl, tags)
+        except Exception as e:
+            print(f"Error guardando en cache de respuestas: {str(e)}")
+        return self.build_response(request, entry)
+
+    async def invalidate(self, *tags: str) -> None:
+        try:
+            await self.backend.invalidate(tags)
+        except Exception as e:
+            print(f"Error invalidando cache de respuestas: {str(e)}")
+
+    def build_response(self, request: Request, entry: CachedResponse) -> Response:
+        headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": self.cache_control}
+        if etag_matches(request, entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "backend": self.backend.stats(),
+        }
+
+
+response_cache = ResponseCache(settings.response_cache_ttl, settings.response_cache_max_age)
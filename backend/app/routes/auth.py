@@ -1,73 +1,56 @@
-from fastapi import APIRouter, HTTPException
-from app.database import supabase
-from app.models import User
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.database import db
+from app.models import User, UserList
+from app.pagination import NEXT_CURSOR_HEADER, apply_keyset, decode_cursor, next_cursor
+from app.response_cache import conditional_response
+from typing import List, Optional
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
+# Orden del directorio; también define el contenido del cursor
+DIRECTORY_KEYSET = ("directory_name", "email")
+
+# Por debajo de este largo los trigramas no filtran bien y se busca por prefijo
+TRIGRAM_MIN_LENGTH = 3
+
+
+def escape_like(term: str) -> str:
+    """Escapa los comodines de LIKE para buscar el texto literal"""
+    # PostgREST también trata `*` como comodín
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("*", "")
+
 
 @router.get("/users", response_model=List[User])
-async def get_users():
-    """Obtiene la lista de todos los usuarios registrados con sus perfiles"""
-    unique_emails = []
-    
-    # Primero intentar obtener usuarios de los posts (más confiable)
-    try:
-        posts_response = supabase.table("posts").select("user_email").execute()
-        if posts_response.data:
-            unique_emails = list(set([post.get("user_email") for post in posts_response.data if post.get("user_email")]))
-    except Exception as e:
-        pass  # Continuar con el siguiente método
-    
-    # Como fallback, intentar obtener usuarios del Admin API
-    if not unique_emails:
-        try:
-            response = supabase.auth.admin.list_users()
-            
-            # Manejar diferentes formatos de respuesta
-            users_list = []
-            if isinstance(response, list):
-                users_list = response
-            elif hasattr(response, 'users') and isinstance(response.users, list):
-                users_list = response.users
-            elif hasattr(response, 'data') and isinstance(response.data, list):
-                users_list = response.data
-            
-            for user in users_list:
-                email = None
-                # Intentar obtener email de diferentes formas
-                if isinstance(user, dict):
-                    email = user.get('email') or user.get('user_email')
-                elif hasattr(user, 'email'):
-                    email = user.email
-                elif hasattr(user, 'user_email'):
-                    email = user.user_email
-                
-                if email and email not in unique_emails:
-                    unique_emails.append(email)
-        except Exception as e:
-            pass
-    
-    if not unique_emails:
-        return []
-    
-    # Obtener perfiles de los usuarios
+async def get_users(
+    request: Request,
+    q: Optional[str] = Query(None, max_length=100),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Directorio de usuarios registrados (con perfil), en orden alfabético.
+
+    `q` filtra por username: por prefijo (también sobre el email si no tiene
+    username) con menos de 3 caracteres, y por fragmento a partir de 3, usando
+    el índice de trigramas. El header X-Next-Cursor trae el cursor de la página siguiente.
+    """
     try:
-        profiles_response = supabase.table("user_profiles").select("email, username, avatar_url").in_("email", unique_emails).execute()
-        profiles_dict = {profile["email"]: profile for profile in profiles_response.data}
+        query = db.table("user_profiles").select("email, username, avatar_url, directory_name")
+        
+        term = escape_like(q.strip().lower()) if q else ""
+        if len(term) >= TRIGRAM_MIN_LENGTH:
+            query = query.ilike("username", f"%{term}%")
+        elif term:
+            query = query.like("directory_name", f"{term}%")
         
-        # Crear lista de usuarios con información del perfil
-        users = []
-        for email in unique_emails:
-            profile = profiles_dict.get(email, {})
-            users.append(User(
-                email=email,
-                username=profile.get("username"),
-                avatar_url=profile.get("avatar_url")
-            ))
+        cursor_values = decode_cursor(cursor, len(DIRECTORY_KEYSET)) if cursor else None
+        result = await db.execute(apply_keyset(query, DIRECTORY_KEYSET, cursor_values, desc=False).limit(limit))
         
-        return users
+        cursor_value = next_cursor(result.data, DIRECTORY_KEYSET, limit)
+        headers = {NEXT_CURSOR_HEADER: cursor_value} if cursor_value else None
+        
+        users = UserList.validate_python(result.data)
+        return conditional_response(request, users, headers)
+    except HTTPException:
+        raise
     except Exception as e:
-        # Si falla, devolver usuarios solo con email
-        return [User(email=email) for email in unique_emails]
-
+        raise HTTPException(status_code=500, detail=f"Error obteniendo usuarios: {str(e)}")
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from uuid import UUID
-from typing import List
-from app.database import supabase
-from app.models import Comment, CommentCreate
+from typing import List, Optional
+from postgrest.exceptions import APIError
+from app.database import db
+from app.models import Comment, CommentCreate, CommentList, CommentThread, CommentThreadList
+from app.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, next_cursor
+from app.profile_service import get_profiles
+from app.response_cache import conditional_response, is_anonymous, response_cache
 
 router = APIRouter(prefix="/api/comments", tags=["comments"])
 
+# Orden de los hilos (más antiguos primero); también define el contenido de los cursores
+THREAD_KEYSET = ("created_at", "id")
+
 
 async def enrich_comments_with_profiles(comments_data: List[dict]) -> List[dict]:
     """ Enriquece los comentarios con información del perfil del usuario (username y avatar_url)"""
@@ -18,10 +25,9 @@ async def enrich_comments_with_profiles(comments_data: List[dict]) -> List[dict]
     if not emails:
         return comments_data
     
-    # Obtener perfiles en una sola query
+    # Obtener perfiles (desde cache o en una sola query)
     try:
-        profiles_response = supabase.table("user_profiles").select("email, username, avatar_url").in_("email", emails).execute()
-        profiles_dict = {profile["email"]: profile for profile in profiles_response.data}
+        profiles_dict = await get_profiles(emails)
         
         # Enriquecer cada comentario con información del perfil
         for comment in comments_data:
@@ -38,22 +44,130 @@ async def enrich_comments_with_profiles(comments_data: List[dict]) -> List[dict]
 
 
 @router.get("/post/{post_id}", response_model=List[Comment])
-async def get_comments(post_id: UUID):
-    """Obtiene todos los comentarios de un post"""
+async def get_comments(request: Request, post_id: UUID):
+    """Obtiene todos los comentarios de un post (incluidas las respuestas) en una lista plana.
+
+    Para posts con muchos comentarios conviene /post/{post_id}/threads, que pagina por hilos.
+    """
     try:
-        response = supabase.table("comments") \
-            .select("*") \
-            .eq("post_id", str(post_id)) \
-            .order("created_at", desc=False) \
-            .execute()
+        cacheable = is_anonymous(request)
+        if cacheable:
+            cached = await response_cache.get(request)
+            if cached is not None:
+                return cached
+        
+        response = await db.execute(
+            db.table("comments")
+            .select("*")
+            .eq("post_id", str(post_id))
+            .order("created_at", desc=False)
+        )
         
         enriched_data = await enrich_comments_with_profiles(response.data)
-        comments = [Comment(**comment) for comment in enriched_data]
-        return comments
+        comments = CommentList.validate_python(enriched_data)
+        
+        if cacheable:
+            return await response_cache.put(request, comments, [f"comments:{post_id}"])
+        return conditional_response(request, comments, private=True)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo comentarios: {str(e)}")
 
 
+async def load_threads(
+    request: Request,
+    post_id: UUID,
+    parent_id: Optional[UUID],
+    limit: int,
+    replies: int,
+    cursor: Optional[str]
+):
+    """Carga una página de hilos con la función get_comment_threads (una sola consulta).
+
+    La página son las raíces del post (parent_id None) o las respuestas de
+    parent_id; cada comentario trae sus primeras `replies` respuestas.
+    """
+    cacheable = is_anonymous(request)
+    if cacheable:
+        cached = await response_cache.get(request)
+        if cached is not None:
+            return cached
+    
+    params = {
+        "p_post_id": str(post_id),
+        "p_parent_id": str(parent_id) if parent_id else None,
+        "p_limit": limit,
+        "p_replies": replies,
+    }
+    if cursor:
+        params["p_after_at"], params["p_after_id"] = decode_cursor(cursor, len(THREAD_KEYSET))
+    response = await db.execute(db.rpc("get_comment_threads", params))
+    rows = await enrich_comments_with_profiles(response.data or [])
+    
+    # Separar la página de las respuestas precargadas de cada comentario
+    page_parent = str(parent_id) if parent_id else None
+    page = [row for row in rows if row.get("parent_id") == page_parent]
+    children = {}
+    for row in rows:
+        if row.get("parent_id") != page_parent:
+            children.setdefault(row["parent_id"], []).append(row)
+    for row in page:
+        row["replies"] = children.get(row["id"], [])
+        # Sin respuestas precargadas no hace falta cursor: se empieza desde la primera
+        if row["replies"] and row.get("reply_count", 0) > len(row["replies"]):
+            last = row["replies"][-1]
+            row["replies_cursor"] = encode_cursor(*(last[column] for column in THREAD_KEYSET))
+    
+    threads = CommentThreadList.validate_python(page)
+    cursor_value = next_cursor(page, THREAD_KEYSET, limit)
+    headers = {NEXT_CURSOR_HEADER: cursor_value} if cursor_value else None
+    
+    if cacheable:
+        return await response_cache.put(request, threads, [f"comments:{post_id}"], headers)
+    return conditional_response(request, threads, headers, private=True)
+
+
+@router.get("/post/{post_id}/threads", response_model=List[CommentThread])
+async def get_comment_threads(
+    request: Request,
+    post_id: UUID,
+    limit: int = Query(20, ge=1, le=100),
+    replies: int = Query(3, ge=0, le=20),
+    cursor: Optional[str] = None
+):
+    """Obtiene los comentarios raíz de un post, más antiguos primero, con sus primeras respuestas.
+
+    El header X-Next-Cursor trae el cursor de la página siguiente de raíces.
+    """
+    try:
+        return await load_threads(request, post_id, None, limit, replies, cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo comentarios: {str(e)}")
+
+
+@router.get("/post/{post_id}/replies/{comment_id}", response_model=List[CommentThread])
+async def get_comment_replies(
+    request: Request,
+    post_id: UUID,
+    comment_id: UUID,
+    limit: int = Query(20, ge=1, le=100),
+    replies: int = Query(3, ge=0, le=20),
+    cursor: Optional[str] = None
+):
+    """Obtiene las respuestas a un comentario, cada una con sus primeras respuestas.
+
+    Para seguir un hilo se pasa como `cursor` el `replies_cursor` del comentario;
+    después, el header X-Next-Cursor trae el cursor de la página siguiente.
+    """
+    try:
+        return await load_threads(request, post_id, comment_id, limit, replies, cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo respuestas: {str(e)}")
+
+
 @router.post("/", response_model=Comment)
 async def create_comment(comment: CommentCreate):
     """Crea un nuevo comentario"""
@@ -63,12 +177,27 @@ async def create_comment(comment: CommentCreate):
             "user_email": comment.user_email,
             "content": comment.content
         }
+        if comment.parent_id:
+            comment_data["parent_id"] = str(comment.parent_id)
         
-        response = supabase.table("comments").insert(comment_data).execute()
+        try:
+            response = await db.execute(db.table("comments").insert(comment_data))
+        except APIError as e:
+            # 23503: el post no existe (FK de post_id) o, en una respuesta, el trigger
+            # rechazó un comentario padre inexistente o de otro post
+            if e.code == "23503":
+                if comment.parent_id:
+                    raise HTTPException(status_code=404, detail="Comentario padre no encontrado")
+                raise HTTPException(status_code=404, detail="Post no encontrado")
+            raise
         
         if not response.data:
             raise HTTPException(status_code=500, detail="Error creando comentario")
         
+        # El comentario cambia la lista y el contador del post
+        post_id = comment.post_id
+        await response_cache.invalidate(f"comments:{post_id}", f"post:{post_id}", "feed:counts")
+        
         return Comment(**response.data[0])
     except HTTPException:
         raise
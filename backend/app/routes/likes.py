@@ -1,58 +1,70 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from uuid import UUID
-from app.database import supabase
-from app.models import LikeCreate, LikeCount
+from app.database import db
+from app.models import LikeCreate, LikeCount, LikeResult
+from app.response_cache import conditional_response, is_anonymous, response_cache
 
 router = APIRouter(prefix="/api/likes", tags=["likes"])
 
 
-@router.post("/")
+@router.post("/", response_model=LikeResult)
 async def create_or_update_like(like: LikeCreate):
-    """Crea o actualiza un like/dislike en un post"""
+    """Crea o actualiza un like/dislike en un post y retorna los nuevos totales"""
     try:
-        # Intentar insertar o actualizar (upsert)
-        like_data = {
-            "post_id": str(like.post_id),
-            "user_email": like.user_email,
-            "is_like": like.is_like
-        }
+        # Upsert atómico en la base de datos: una sola sentencia y un solo round trip
+        response = await db.execute(
+            db.rpc("vote_post", {
+                "p_post_id": str(like.post_id),
+                "p_user_email": like.user_email,
+                "p_is_like": like.is_like
+            })
+        )
         
-        # Verificar si ya existe un like de este usuario para este post
-        existing = supabase.table("likes") \
-            .select("*") \
-            .eq("post_id", str(like.post_id)) \
-            .eq("user_email", like.user_email) \
-            .execute()
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Post no encontrado")
         
-        if existing.data:
-            # Actualizar
-            response = supabase.table("likes") \
-                .update({"is_like": like.is_like}) \
-                .eq("post_id", str(like.post_id)) \
-                .eq("user_email", like.user_email) \
-                .execute()
-        else:
-            # Insertar
-            response = supabase.table("likes").insert(like_data).execute()
+        counts = response.data[0]
+        post_id = like.post_id
+        await response_cache.invalidate(f"likes:{post_id}", f"post:{post_id}", "feed:counts")
         
-        return {"message": "Like actualizado correctamente"}
+        return LikeResult(
+            message="Like actualizado correctamente",
+            likes=counts["likes"],
+            dislikes=counts["dislikes"]
+        )
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error actualizando like: {str(e)}")
+        error_detail = str(e)
+        if "foreign key" in error_detail.lower():
+            raise HTTPException(status_code=404, detail="Post no encontrado")
+        raise HTTPException(status_code=500, detail=f"Error actualizando like: {error_detail}")
 
 
 @router.get("/post/{post_id}", response_model=LikeCount)
-async def get_like_count(post_id: UUID):
-    """Obtiene el conteo de likes y dislikes de un post"""
+async def get_like_count(request: Request, post_id: UUID):
+    """Obtiene el conteo de likes y dislikes de un post (contadores mantenidos por triggers)"""
     try:
-        response = supabase.table("likes") \
-            .select("*") \
-            .eq("post_id", str(post_id)) \
-            .execute()
+        cacheable = is_anonymous(request)
+        if cacheable:
+            cached = await response_cache.get(request)
+            if cached is not None:
+                return cached
+        
+        response = await db.execute(
+            db.table("posts")
+            .select("likes_count, dislikes_count")
+            .eq("id", str(post_id))
+        )
         
-        likes_count = sum(1 for like in response.data if like.get("is_like") is True)
-        dislikes_count = sum(1 for like in response.data if like.get("is_like") is False)
+        if response.data:
+            counts = response.data[0]
+            like_count = LikeCount(likes=counts["likes_count"], dislikes=counts["dislikes_count"])
+        else:
+            like_count = LikeCount(likes=0, dislikes=0)
         
-        return LikeCount(likes=likes_count, dislikes=dislikes_count)
+        if cacheable:
+            return await response_cache.put(request, like_count, [f"likes:{post_id}"])
+        return conditional_response(request, like_count, private=True)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo conteo de likes: {str(e)}")
-
@@ -1,11 +1,56 @@
-from fastapi import APIRouter, HTTPException, Query
-from app.database import supabase
-from app.models import Message, MessageCreate
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from app.cache import TTLCache
+from app.config import settings
+from app.database import db
+from app.models import Message, MessageCreate, MessageList
+from app.pagination import NEXT_CURSOR_HEADER, apply_keyset, decode_cursor, next_cursor
+from app.profile_service import get_profiles
+from app.realtime import format_sse, hub
+from app.response_cache import conditional_response
+from datetime import datetime
+from typing import List, Optional, Tuple
 from uuid import UUID
+import asyncio
 
 router = APIRouter(prefix="/api/messages", tags=["messages"])
 
+# Conteo de no leídos por email; se invalida en cada envío o lectura de este worker
+unread_cache = TTLCache(maxsize=settings.unread_cache_size, ttl=settings.unread_cache_ttl)
+
+CONVERSATIONS_KEYSET = ("last_message_at", "email")
+MESSAGES_KEYSET = ("created_at", "id")
+
+
+async def count_unread(user_email: str) -> int:
+    """Número de mensajes no leídos del usuario (contador mantenido por triggers)"""
+    count = unread_cache.get(user_email)
+    if count is None:
+        response = await db.execute(
+            db.table("user_unread_counts")
+            .select("unread_count")
+            .eq("user_email", user_email)
+        )
+        count = response.data[0]["unread_count"] if response.data else 0
+        unread_cache.set(user_email, count)
+    return count
+
+
+async def publish_unread_count(user_email: str) -> None:
+    """Envía el nuevo conteo de no leídos si el usuario tiene el canal en tiempo real abierto"""
+    if not hub.is_listening(user_email):
+        return
+    try:
+        await hub.publish(user_email, {"type": "unread_count", "unread_count": await count_unread(user_email)})
+    except Exception as e:
+        print(f"Error publicando conteo de no leídos: {str(e)}")
+
+
+def conversation_participants(email_1: str, email_2: str) -> Tuple[str, str]:
+    """Pareja ordenada que identifica una conversación (columnas participant_a y participant_b)"""
+    # Python compara por code points, igual que COLLATE "C" sobre UTF-8 en Postgres
+    return tuple(sorted((email_1, email_2)))
+
 
 async def enrich_messages_with_profiles(messages_data: List[dict]) -> List[dict]:
     """ Enriquece los mensajes con información del perfil de los usuarios"""
@@ -23,10 +68,9 @@ async def enrich_messages_with_profiles(messages_data: List[dict]) -> List[dict]
     if not emails:
         return messages_data
     
-    # Obtener perfiles en una sola query
+    # Obtener perfiles (desde cache o en una sola query)
     try:
-        profiles_response = supabase.table("user_profiles").select("email, username, avatar_url").in_("email", list(emails)).execute()
-        profiles_dict = {profile["email"]: profile for profile in profiles_response.data}
+        profiles_dict = await get_profiles(emails)
         
         # Enriquecer cada mensaje con información del perfil
         for msg in messages_data:
@@ -50,90 +94,106 @@ async def enrich_messages_with_profiles(messages_data: List[dict]) -> List[dict]
 
 
 @router.get("/conversations", response_model=List[dict])
-async def get_conversations(user_email: str = Query(...)):
-    """Obtiene la lista de conversaciones del usuario (usuarios con los que ha intercambiado mensajes)"""
+async def get_conversations(
+    request: Request,
+    user_email: str = Query(...),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Obtiene la lista de conversaciones del usuario (usuarios con los que ha intercambiado mensajes).
+
+    Cada conversación trae el último mensaje y sus no leídos, leídos en una
+    sola consulta de resúmenes mantenidos por triggers (el coste depende de la
+    página, no del historial). Ordenadas de la más reciente a la más antigua;
+    el header X-Next-Cursor trae el cursor de la página siguiente.
+    """
     try:
-        # Obtener mensajes donde el usuario es remitente o destinatario
-        # Hacemos dos queries y las combinamos
-        sent_response = supabase.table("messages") \
-            .select("sender_email, receiver_email, created_at") \
-            .eq("sender_email", user_email) \
-            .order("created_at", desc=True) \
-            .execute()
-        
-        received_response = supabase.table("messages") \
-            .select("sender_email, receiver_email, created_at") \
-            .eq("receiver_email", user_email) \
-            .order("created_at", desc=True) \
-            .execute()
-        
-        # Combinar resultados
-        all_messages = (sent_response.data or []) + (received_response.data or [])
-        # Ordenar por fecha descendente
-        all_messages.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-        
-        # Obtener usuarios únicos con los que ha conversado
-        conversations = {}
-        for msg in all_messages:
-            other_email = msg["receiver_email"] if msg["sender_email"] == user_email else msg["sender_email"]
-            if other_email not in conversations:
-                conversations[other_email] = {
-                    "email": other_email,
-                    "last_message_at": msg["created_at"]
-                }
+        params = {"p_user_email": user_email, "p_limit": limit}
+        if cursor:
+            params["p_before_at"], params["p_before_email"] = decode_cursor(cursor, len(CONVERSATIONS_KEYSET))
+        
+        result = await db.execute(db.rpc("get_conversations", params))
+        conversations = result.data or []
+        
+        cursor_value = next_cursor(conversations, CONVERSATIONS_KEYSET, limit)
+        headers = {NEXT_CURSOR_HEADER: cursor_value} if cursor_value else None
+        
+        if not conversations:
+            return []
         
         # Obtener perfiles de los usuarios
-        if conversations:
-            emails = list(conversations.keys())
-            profiles_response = supabase.table("user_profiles").select("email, username, avatar_url").in_("email", emails).execute()
-            profiles_dict = {profile["email"]: profile for profile in profiles_response.data}
-            
-            # Enriquecer conversaciones con información del perfil
-            result = []
-            for email, conv in conversations.items():
-                profile = profiles_dict.get(email, {})
-                result.append({
-                    "email": email,
-                    "username": profile.get("username"),
-                    "avatar_url": profile.get("avatar_url"),
-                    "last_message_at": conv["last_message_at"]
-                })
-            
-            return result
+        profiles_dict = await get_profiles(conv["email"] for conv in conversations)
+        
+        # Enriquecer conversaciones con información del perfil
+        for conv in conversations:
+            profile = profiles_dict.get(conv["email"], {})
+            conv["username"] = profile.get("username")
+            conv["avatar_url"] = profile.get("avatar_url")
         
-        return []
+        return conditional_response(request, conversations, headers, private=True)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo conversaciones: {str(e)}")
 
 
 @router.get("/conversation/{other_email}", response_model=List[Message])
-async def get_conversation(other_email: str, user_email: str = Query(...)):
-    """Obtiene todos los mensajes de una conversación entre dos usuarios"""
+async def get_conversation(
+    request: Request,
+    other_email: str,
+    user_email: str = Query(...),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None
+):
+    """Obtiene los mensajes de una conversación entre dos usuarios, en orden cronológico.
+
+    Sin parámetros retorna los `limit` mensajes más recientes; el header
+    X-Next-Cursor trae el cursor para pedir los anteriores. Con `since`
+    retorna los mensajes desde esa fecha (incluida) hacia adelante (refresco
+    incremental); si hay más de `limit`, X-Next-Cursor trae el cursor para
+    seguir avanzando, que se envía junto con el mismo `since`.
+    """
     try:
+        # Ambas direcciones (A→B y B→A) comparten la misma pareja ordenada,
+        # así que la conversación sale de una sola query sobre un índice
+        participant_a, participant_b = conversation_participants(user_email, other_email)
+        query = (
+            db.table("messages")
+            .select("*")
+            .eq("participant_a", participant_a)
+            .eq("participant_b", participant_b)
+        )
         
-        # Obtener mensajes donde ambos usuarios están involucrados
-        # Hacemos dos queries y las combinamos
-        sent_response = supabase.table("messages") \
-            .select("*") \
-            .eq("sender_email", user_email) \
-            .eq("receiver_email", other_email) \
-            .order("created_at", desc=False) \
-            .execute()
-        
-        received_response = supabase.table("messages") \
-            .select("*") \
-            .eq("sender_email", other_email) \
-            .eq("receiver_email", user_email) \
-            .order("created_at", desc=False) \
-            .execute()
-        
-        # Combinar y ordenar
-        all_messages = (sent_response.data or []) + (received_response.data or [])
-        all_messages.sort(key=lambda x: x.get("created_at", ""), reverse=False)
+        headers = {}
+        if since:
+            # Orden ascendente: el cursor apunta al último mensaje entregado. Sin
+            # cursor se usa gte para no perder mensajes con el mismo created_at que `since`
+            if cursor:
+                query = apply_keyset(query, MESSAGES_KEYSET, decode_cursor(cursor, len(MESSAGES_KEYSET)), desc=False)
+            else:
+                query = apply_keyset(query, MESSAGES_KEYSET, desc=False).gte("created_at", since.isoformat())
+            result = await db.execute(query.limit(limit))
+            all_messages = result.data or []
+            
+            cursor_value = next_cursor(all_messages, MESSAGES_KEYSET, limit)
+            if cursor_value:
+                headers[NEXT_CURSOR_HEADER] = cursor_value
+        else:
+            cursor_values = decode_cursor(cursor, len(MESSAGES_KEYSET)) if cursor else None
+            result = await db.execute(apply_keyset(query, MESSAGES_KEYSET, cursor_values).limit(limit))
+            all_messages = result.data or []
+            
+            cursor_value = next_cursor(all_messages, MESSAGES_KEYSET, limit)
+            if cursor_value:
+                headers[NEXT_CURSOR_HEADER] = cursor_value
+            
+            # La página se lee de más reciente a más antiguo; se retorna en orden cronológico
+            all_messages.reverse()
         
         enriched_data = await enrich_messages_with_profiles(all_messages)
-        messages = [Message(**msg) for msg in enriched_data]
-        return messages
+        messages = MessageList.validate_python(enriched_data)
+        return conditional_response(request, messages, headers, private=True)
     except HTTPException:
         raise
     except Exception as e:
@@ -154,13 +214,22 @@ async def send_message(message: MessageCreate, sender_email: str = Query(...)):
             "read": False
         }
         
-        response = supabase.table("messages").insert(message_data).execute()
+        response = await db.execute(db.table("messages").insert(message_data))
         
         if not response.data:
             raise HTTPException(status_code=500, detail="Error enviando mensaje")
         
         enriched_data = await enrich_messages_with_profiles([response.data[0]])
-        return Message(**enriched_data[0])
+        new_message = Message(**enriched_data[0])
+        unread_cache.invalidate(message.receiver_email)
+        
+        # Avisar a ambos participantes conectados (el emisor puede tener otras pestañas abiertas)
+        event = {"type": "message", "message": new_message.model_dump(mode="json")}
+        await hub.publish(message.receiver_email, event)
+        await hub.publish(sender_email, event)
+        await publish_unread_count(message.receiver_email)
+        
+        return new_message
     except HTTPException:
         raise
     except Exception as e:
@@ -171,22 +240,25 @@ async def send_message(message: MessageCreate, sender_email: str = Query(...)):
 async def mark_as_read(message_id: UUID, user_email: str = Query(...)):
     """Marca un mensaje como leído"""
     try:
-        # Verificar que el mensaje pertenece al usuario
-        response = supabase.table("messages") \
-            .select("*") \
-            .eq("id", str(message_id)) \
-            .eq("receiver_email", user_email) \
-            .single() \
-            .execute()
+        # Un solo UPDATE condicional: solo afecta al mensaje si el usuario es el destinatario
+        response = await db.execute(
+            db.table("messages")
+            .update({"read": True})
+            .eq("id", str(message_id))
+            .eq("receiver_email", user_email)
+        )
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Mensaje no encontrado")
+        unread_cache.invalidate(user_email)
         
-        # Marcar como leído
-        supabase.table("messages") \
-            .update({"read": True}) \
-            .eq("id", str(message_id)) \
-            .execute()
+        # Confirmación de lectura para el remitente y nuevo conteo para el lector
+        await hub.publish(response.data[0]["sender_email"], {
+            "type": "read",
+            "reader_email": user_email,
+            "message_ids": [str(message_id)],
+        })
+        await publish_unread_count(user_email)
         
         return {"message": "Mensaje marcado como leído"}
     except HTTPException:
@@ -195,17 +267,95 @@ async def mark_as_read(message_id: UUID, user_email: str = Query(...)):
         raise HTTPException(status_code=500, detail=f"Error marcando mensaje como leído: {str(e)}")
 
 
+@router.put("/conversation/{other_email}/read")
+async def mark_conversation_as_read(
+    other_email: str,
+    user_email: str = Query(...),
+    until: Optional[datetime] = None
+):
+    """Marca como leídos todos los mensajes recibidos de `other_email` (hasta `until`, si se indica).
+
+    Retorna cuántos mensajes se marcaron y el nuevo total de no leídos del usuario.
+    """
+    try:
+        query = (
+            db.table("messages")
+            .update({"read": True})
+            .eq("receiver_email", user_email)
+            .eq("sender_email", other_email)
+            .eq("read", False)
+        )
+        if until:
+            query = query.lte("created_at", until.isoformat())
+        response = await db.execute(query)
+        
+        marked_ids = [msg["id"] for msg in response.data or []]
+        if marked_ids:
+            unread_cache.invalidate(user_email)
+        unread_count = await count_unread(user_email)
+        
+        if marked_ids:
+            await hub.publish(other_email, {
+                "type": "read",
+                "reader_email": user_email,
+                "message_ids": marked_ids,
+            })
+            await hub.publish(user_email, {"type": "unread_count", "unread_count": unread_count})
+        
+        return {"marked_count": len(marked_ids), "unread_count": unread_count}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error marcando conversación como leída: {str(e)}")
+
+
 @router.get("/unread-count")
 async def get_unread_count(user_email: str = Query(...)):
     """Obtiene el número de mensajes no leídos del usuario"""
     try:
-        response = supabase.table("messages") \
-            .select("id", count="exact") \
-            .eq("receiver_email", user_email) \
-            .eq("read", False) \
-            .execute()
-        
-        return {"unread_count": response.count if hasattr(response, 'count') else 0}
+        return {"unread_count": await count_unread(user_email)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo conteo de no leídos: {str(e)}")
 
+
+@router.get("/stream")
+async def stream_events(request: Request, user_email: str = Query(...)):
+    """Canal de Server-Sent Events con los eventos del usuario en tiempo real.
+
+    Eventos: `message` (mensaje nuevo enviado o recibido), `read` (el
+    destinatario leyó mensajes enviados por el usuario) y `unread_count`
+    (nuevo total de no leídos; se envía también al conectar si se puede leer).
+    """
+    async def event_stream():
+        # La cola se registra al empezar el stream, así el finally siempre la
+        # libera (si el cliente se va antes, el generador nunca llega a correr)
+        queue = hub.connect(user_email)
+        try:
+            # Estado inicial para que el cliente no necesite consultar el conteo;
+            # si la base de datos falla se omite y el canal sigue abierto
+            try:
+                unread_count = await count_unread(user_email)
+            except Exception as e:
+                print(f"Error obteniendo conteo inicial de no leídos: {str(e)}")
+            else:
+                yield format_sse({"type": "unread_count", "unread_count": unread_count})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.realtime_keepalive)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # Comentario SSE para mantener viva la conexión a través de proxies
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield format_sse(event)
+        finally:
+            hub.disconnect(user_email, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,12 +1,47 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query
-from typing import Optional, List
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Request
+from typing import Optional, List, Union
 from uuid import UUID
-from app.database import supabase
-from app.models import Post
+from datetime import datetime, timedelta, timezone
+import os
+from app.config import settings
+from app.database import db
+from app.models import Post, PostList, PostPreview, PostPreviewList
+from app.pagination import NEXT_CURSOR_HEADER, apply_keyset, decode_cursor, next_cursor
+from app.profile_service import get_profiles, resolve_email
+from app.media import media_pipeline
+from app.response_cache import conditional_response, is_anonymous, response_cache
+from app.uploads import UploadedMedia, stream_upload
 import secrets
 
 router = APIRouter(prefix="/api/posts", tags=["posts"])
 
+# Orden del feed; también define el contenido del cursor
+FEED_KEYSET = ("created_at", "id")
+
+# Header con el total de posts de un usuario (get_user_posts con include_total=true)
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+# Columnas que necesita la vista de cuadrícula (fields=grid) y largo de su extracto
+GRID_COLUMNS = "id,content,image_url,video_url,media_variants,created_at"
+PREVIEW_LENGTH = 140
+
+# Órdenes del feed (`sort`) sobre columnas indexadas, con id como desempate
+FEED_SORTS = {
+    "new": FEED_KEYSET,
+    "hot": ("hot_score", "id"),
+    "top": ("score", "id"),
+    "controversial": ("controversy_score", "id"),
+}
+
+# Ventanas de tiempo (`t`) para los órdenes top y controversial
+FEED_WINDOWS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": timedelta(days=30),
+    "year": timedelta(days=365),
+}
+
 
 async def enrich_posts_with_profiles(posts_data: List[dict]) -> List[dict]:
     """ Enriquece los posts con información del perfil del usuario (username y avatar_url)"""
@@ -19,10 +54,9 @@ async def enrich_posts_with_profiles(posts_data: List[dict]) -> List[dict]:
     if not emails:
         return posts_data
     
-    # Obtener perfiles en una sola query
+    # Obtener perfiles (desde cache o en una sola query)
     try:
-        profiles_response = supabase.table("user_profiles").select("email, username, avatar_url").in_("email", emails).execute()
-        profiles_dict = {profile["email"]: profile for profile in profiles_response.data}
+        profiles_dict = await get_profiles(emails)
         
         # Enriquecer cada post con información del perfil
         for post in posts_data:
@@ -38,70 +72,84 @@ async def enrich_posts_with_profiles(posts_data: List[dict]) -> List[dict]:
     return posts_data
 
 
-async def upload_image_to_supabase(file: UploadFile, user_email: str) -> str:
-    """Sube una imagen a Supabase Storage y retorna la URL pública"""
+async def attach_post_counts(posts_data: List[dict], viewer_email: Optional[str] = None) -> List[dict]:
+    """Agrega likes, dislikes, comment_count y el voto del usuario a cada post.
+
+    Los totales salen de los contadores de la propia fila del post; solo el
+    voto de `viewer_email` requiere una query adicional para toda la página.
+    """
+    if not posts_data:
+        return posts_data
+    
+    votes = {}
+    if viewer_email:
+        post_ids = [str(post["id"]) for post in posts_data]
+        votes_response = await db.execute(
+            db.table("likes")
+            .select("post_id, is_like")
+            .eq("user_email", viewer_email)
+            .in_("post_id", post_ids)
+        )
+        votes = {vote["post_id"]: vote["is_like"] for vote in votes_response.data or []}
+    
+    for post in posts_data:
+        post["likes"] = post.get("likes_count", 0)
+        post["dislikes"] = post.get("dislikes_count", 0)
+        post["comment_count"] = post.get("comments_count", 0)
+        post["user_vote"] = votes.get(str(post["id"]))
+    
+    return posts_data
+
+
+def post_preview(post: dict) -> dict:
+    """Reduce un post a los campos de la cuadrícula del perfil"""
+    variants = post.get("media_variants") or {}
+    return {
+        "id": post["id"],
+        "preview": (post.get("content") or "")[:PREVIEW_LENGTH],
+        # La miniatura generada si ya existe; si no, la imagen original o la portada del video
+        "thumbnail": variants.get("thumbnail") or post.get("image_url") or variants.get("poster"),
+        "has_video": bool(post.get("video_url")),
+        "created_at": post["created_at"],
+    }
+
+
+async def upload_image_to_supabase(file: UploadFile, user_email: str) -> UploadedMedia:
+    """Sube una imagen a Supabase Storage y conserva una copia local para generar sus variantes"""
     try:
         # Generar nombre único para el archivo
         file_ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
         file_name = f"{secrets.token_urlsafe(16)}.{file_ext}"
         
-        # Leer contenido del archivo
-        contents = await file.read()
-        
-        # Subir a Supabase Storage
-        bucket = "post-images"
         # Sanitizar el email para usarlo como parte de la ruta
         safe_email = user_email.replace("@", "_at_").replace(".", "_")
         file_path = f"{safe_email}/{file_name}"
         
-        upload_response = supabase.storage.from_(bucket).upload(
-            file_path,
-            contents,
-            file_options={"content-type": file.content_type or "image/jpeg", "upsert": "true"}
+        # Subir a Supabase Storage por bloques, sin cargar el archivo en memoria
+        return await stream_upload(
+            file, file_path, file.content_type or "image/jpeg", settings.max_image_bytes, keep_local=True
         )
-        
-        # Verificar si hubo error en la subida
-        if hasattr(upload_response, 'error') and upload_response.error:
-            raise Exception(f"Error de Supabase Storage: {upload_response.error}")
-        
-        # Obtener URL pública
-        public_url_response = supabase.storage.from_(bucket).get_public_url(file_path)
-        return public_url_response
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error subiendo imagen: {str(e)}")
 
 
-async def upload_video_to_supabase(file: UploadFile, user_email: str) -> str:
-    """Sube un video a Supabase Storage y retorna la URL pública"""
+async def upload_video_to_supabase(file: UploadFile, user_email: str) -> UploadedMedia:
+    """Sube un video a Supabase Storage y conserva una copia local para extraer su portada"""
     try:
         # Generar nombre único para el archivo
         file_ext = file.filename.split(".")[-1] if "." in file.filename else "mp4"
         file_name = f"{secrets.token_urlsafe(16)}.{file_ext}"
         
-        # Leer contenido del archivo
-        contents = await file.read()
-        
-        # Subir a Supabase Storage (usamos el mismo bucket)
-        bucket = "post-images"
-        # Sanitizar el email para usarlo como parte de la ruta
+        # Sanitizar el email para usarlo como parte de la ruta (usamos el mismo bucket)
         safe_email = user_email.replace("@", "_at_").replace(".", "_")
         file_path = f"{safe_email}/videos/{file_name}"
         
-        upload_response = supabase.storage.from_(bucket).upload(
-            file_path,
-            contents,
-            file_options={"content-type": file.content_type or "video/mp4", "upsert": "true"}
+        # Subir a Supabase Storage por bloques, sin cargar el archivo en memoria
+        return await stream_upload(
+            file, file_path, file.content_type or "video/mp4", settings.max_video_bytes, keep_local=True
         )
-        
-        # Verificar si hubo error en la subida
-        if hasattr(upload_response, 'error') and upload_response.error:
-            raise Exception(f"Error de Supabase Storage: {upload_response.error}")
-        
-        # Obtener URL pública
-        public_url_response = supabase.storage.from_(bucket).get_public_url(file_path)
-        return public_url_response
     except HTTPException:
         raise
     except Exception as e:
@@ -109,70 +157,151 @@ async def upload_video_to_supabase(file: UploadFile, user_email: str) -> str:
 
 
 @router.get("/", response_model=List[Post])
-async def get_posts(page: int = 0, limit: int = 5):
-    """Obtiene posts paginados, ordenados por fecha descendente"""
+async def get_posts(
+    request: Request,
+    page: int = 0,
+    limit: int = Query(5, ge=1, le=100),
+    cursor: Optional[str] = None,
+    sort: str = Query("new", pattern="^(new|hot|top|controversial)$"),
+    t: str = Query("all", pattern="^(hour|day|week|month|year|all)$"),
+    include_counts: bool = False,
+    viewer_email: Optional[str] = None
+):
+    """Obtiene posts paginados, por defecto ordenados por fecha descendente.
+
+    `sort` elige el orden: new (cronológico), hot (votos con decaimiento por
+    antigüedad), top (likes - dislikes) o controversial. Para top y
+    controversial, `t` limita los posts a la última hora, día, semana, mes o año.
+    Con `cursor` (el valor del header X-Next-Cursor de la respuesta anterior)
+    la paginación es por keyset sobre (columna del orden, id), con coste
+    constante sin importar la profundidad; con una ventana `t` el coste crece
+    con los posts que caen en ella, porque el filtro por fecha y el orden por
+    puntuación no comparten índice. `page` se mantiene para clientes
+    antiguos. Con `include_counts=true` cada post trae sus likes, dislikes,
+    número de comentarios y el voto de `viewer_email`.
+    Las respuestas sin `viewer_email` se sirven desde el cache de respuestas.
+    """
     try:
-        offset = page * limit
-        response = supabase.table("posts") \
-            .select("*") \
-            .order("created_at", desc=True) \
-            .range(offset, offset + limit - 1) \
-            .execute()
+        cacheable = is_anonymous(request)
+        if cacheable:
+            cached = await response_cache.get(request)
+            if cached is not None:
+                return cached
         
-        enriched_data = await enrich_posts_with_profiles(response.data)
-        posts = [Post(**post) for post in enriched_data]
-        return posts
+        keyset = FEED_SORTS[sort]
+        query = db.table("posts").select("*")
+        if sort in ("top", "controversial") and t in FEED_WINDOWS:
+            query = query.gte("created_at", (datetime.now(timezone.utc) - FEED_WINDOWS[t]).isoformat())
+        if cursor:
+            query = apply_keyset(query, keyset, decode_cursor(cursor, len(keyset)))
+        else:
+            query = apply_keyset(query, keyset).offset(page * limit)
+        result = await db.execute(query.limit(limit))
+        
+        cursor_value = next_cursor(result.data, keyset, limit)
+        headers = {NEXT_CURSOR_HEADER: cursor_value} if cursor_value else None
+        
+        enriched_data = await enrich_posts_with_profiles(result.data)
+        if include_counts:
+            enriched_data = await attach_post_counts(enriched_data, viewer_email)
+        posts = PostList.validate_python(enriched_data)
+        
+        if cacheable:
+            # Las páginas con contadores u ordenadas por votos cambian también con cada voto o comentario
+            tags = ["feed"] if sort == "new" and not include_counts else ["feed", "feed:counts"]
+            return await response_cache.put(request, posts, tags, headers)
+        return conditional_response(request, posts, headers, private=True)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo posts: {str(e)}")
 
 
 @router.get("/{post_id}", response_model=Post)
-async def get_post(post_id: UUID):
+async def get_post(
+    request: Request,
+    post_id: UUID,
+    include_counts: bool = False,
+    viewer_email: Optional[str] = None
+):
     """Obtiene un post específico por ID"""
     try:
-        response = supabase.table("posts") \
-            .select("*") \
-            .eq("id", str(post_id)) \
-            .single() \
-            .execute()
+        cacheable = is_anonymous(request)
+        if cacheable:
+            cached = await response_cache.get(request)
+            if cached is not None:
+                return cached
+        
+        response = await db.execute(
+            db.table("posts")
+            .select("*")
+            .eq("id", str(post_id))
+            .single()
+        )
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Post no encontrado")
         
         enriched_data = await enrich_posts_with_profiles([response.data])
-        return Post(**enriched_data[0])
+        if include_counts:
+            enriched_data = await attach_post_counts(enriched_data, viewer_email)
+        post = Post(**enriched_data[0])
+        
+        if cacheable:
+            return await response_cache.put(request, post, [f"post:{post_id}"])
+        return conditional_response(request, post, private=True)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo post: {str(e)}")
 
 
-@router.get("/user/{identifier}", response_model=List[Post])
-async def get_user_posts(identifier: str):
-    """Obtiene todos los posts de un usuario específico por email o username"""
+@router.get("/user/{identifier}", response_model=Union[List[Post], List[PostPreview]])
+async def get_user_posts(
+    request: Request,
+    identifier: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: str = Query("full", pattern="^(full|grid)$"),
+    include_total: bool = False,
+    include_counts: bool = False,
+    viewer_email: Optional[str] = None
+):
+    """Obtiene los posts de un usuario por email o username, del más reciente al más antiguo.
+
+    Paginado por keyset sobre (created_at, id): el header X-Next-Cursor trae el
+    cursor de la página siguiente. Con `fields=grid` retorna solo id, extracto
+    del texto y miniatura, para la cuadrícula del perfil. Con `include_total=true`
+    el header X-Total-Count trae el total de posts del usuario (contador de user_stats).
+    """
     try:
         # Obtener el email del usuario (buscando por username o email)
-        # Intentar primero por username
-        profile_response = supabase.table("user_profiles").select("email").eq("username", identifier).execute()
-        
-        # Si no se encuentra por username, intentar por email
-        if not profile_response.data:
-            profile_response = supabase.table("user_profiles").select("email").eq("email", identifier).execute()
-        
-        if not profile_response.data:
+        email = await resolve_email(identifier)
+        if email is None:
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
         
-        email = profile_response.data[0]["email"]
+        columns = GRID_COLUMNS if fields == "grid" else "*"
+        query = db.table("posts").select(columns).eq("user_email", email)
+        cursor_values = decode_cursor(cursor, len(FEED_KEYSET)) if cursor else None
+        response = await db.execute(apply_keyset(query, FEED_KEYSET, cursor_values).limit(limit))
         
-        response = supabase.table("posts") \
-            .select("*") \
-            .eq("user_email", email) \
-            .order("created_at", desc=True) \
-            .execute()
+        headers = {}
+        cursor_value = next_cursor(response.data, FEED_KEYSET, limit)
+        if cursor_value:
+            headers[NEXT_CURSOR_HEADER] = cursor_value
+        if include_total:
+            stats_response = await db.execute(db.table("user_stats").select("total_posts").eq("email", email))
+            headers[TOTAL_COUNT_HEADER] = str(stats_response.data[0]["total_posts"] if stats_response.data else 0)
+        
+        if fields == "grid":
+            previews = PostPreviewList.validate_python([post_preview(post) for post in response.data])
+            return conditional_response(request, previews, headers)
         
         enriched_data = await enrich_posts_with_profiles(response.data)
-        posts = [Post(**post) for post in enriched_data]
-        return posts
+        if include_counts:
+            enriched_data = await attach_post_counts(enriched_data, viewer_email)
+        posts = PostList.validate_python(enriched_data)
+        return conditional_response(request, posts, headers, private=viewer_email is not None)
     except HTTPException:
         raise
     except Exception as e:
@@ -190,6 +319,7 @@ async def create_post(
     try:
         image_url = None
         video_url = None
+        uploaded = None
         
         # Verificar que no se suban imagen y video al mismo tiempo
         if image and video:
@@ -198,8 +328,12 @@ async def create_post(
         # Si hay imagen, subirla a Supabase Storage
         if image and image.filename:
             try:
-                image_url = await upload_image_to_supabase(image, user_email)
+                uploaded = await upload_image_to_supabase(image, user_email)
+                image_url = uploaded.url
             except HTTPException as e:
+                # Un archivo demasiado grande es un error del cliente, no se ignora
+                if e.status_code == 413:
+                    raise
                 # Si falla la subida de imagen, aún permitir crear el post sin imagen
                 print(f"Advertencia: No se pudo subir la imagen: {e.detail}")
                 # Continuar sin imagen en lugar de fallar completamente
@@ -207,21 +341,31 @@ async def create_post(
         # Si hay video, subirlo a Supabase Storage
         if video and video.filename:
             try:
-                video_url = await upload_video_to_supabase(video, user_email)
+                uploaded = await upload_video_to_supabase(video, user_email)
+                video_url = uploaded.url
             except HTTPException as e:
+                if e.status_code == 413:
+                    raise
                 # Si falla la subida de video, aún permitir crear el post sin video
                 print(f"Advertencia: No se pudo subir el video: {e.detail}")
                 # Continuar sin video en lugar de fallar completamente
         
+        # Solo queda "pending" si el pipeline va a generar variantes (un video sin
+        # ffmpeg se queda con el original y media_status vacío)
+        kind = "image" if image_url else "video"
+        process_media = uploaded is not None and media_pipeline.can_process(kind)
+        
         # Crear el post
         post_data = {
             "user_email": user_email,
             "content": content,
             "image_url": image_url,
-            "video_url": video_url
+            "video_url": video_url,
+            # Las variantes se generan en segundo plano; el post es visible ya
+            "media_status": "pending" if process_media else None
         }
         
-        response = supabase.table("posts").insert(post_data).execute()
+        response = await db.execute(db.table("posts").insert(post_data))
         
         if not response.data:
             error_detail = "Error creando post: respuesta vacía de Supabase"
@@ -234,6 +378,13 @@ async def create_post(
         if not post_dict.get("id"):
             raise HTTPException(status_code=500, detail="Error: el post creado no tiene ID")
         
+        await response_cache.invalidate("feed")
+        
+        if process_media:
+            # El pipeline pasa a encargarse de la copia local
+            media_pipeline.submit(post_dict["id"], uploaded.local_path, kind, uploaded.storage_path.rsplit(".", 1)[0])
+            uploaded = None
+        
         return Post(**post_dict)
     except HTTPException:
         raise
@@ -242,6 +393,10 @@ async def create_post(
         error_detail = f"Error creando post: {str(e)}"
         print(f"Error completo: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=error_detail)
+    finally:
+        # Si la copia local no pasó al pipeline (post no creado o media sin variantes), borrarla
+        if uploaded and uploaded.local_path:
+            os.remove(uploaded.local_path)
 
 
 @router.delete("/{post_id}")
@@ -249,18 +404,20 @@ async def delete_post(post_id: UUID, user_email: str = Query(...)):
     """Borra un post (solo si pertenece al usuario)"""
     try:
         # Verificar que el post pertenece al usuario
-        response = supabase.table("posts") \
-            .select("*") \
-            .eq("id", str(post_id)) \
-            .eq("user_email", user_email) \
-            .single() \
-            .execute()
+        response = await db.execute(
+            db.table("posts")
+            .select("*")
+            .eq("id", str(post_id))
+            .eq("user_email", user_email)
+            .single()
+        )
         
         if not response.data:
             raise HTTPException(status_code=404, detail="Post no encontrado o no tienes permisos")
         
         # Borrar el post (los likes y comentarios se borran en cascada)
-        supabase.table("posts").delete().eq("id", str(post_id)).execute()
+        await db.execute(db.table("posts").delete().eq("id", str(post_id)))
+        await response_cache.invalidate("feed", f"post:{post_id}", f"comments:{post_id}", f"likes:{post_id}")
         
         return {"message": "Post eliminado correctamente"}
     except HTTPException:
@@ -1,23 +1,22 @@
-from fastapi import APIRouter, HTTPException, Query
-from app.database import supabase
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.database import db
 from app.models import UserProfile, UserProfileCreate, UserProfileUpdate, UserStats
+from app.profile_service import find_profile, invalidate_profile, resolve_email
+from app.response_cache import conditional_response
 from typing import Optional
 
 router = APIRouter(prefix="/api/profiles", tags=["profiles"])
 
 
 @router.get("/{identifier}", response_model=UserProfile)
-async def get_profile(identifier: str):
+async def get_profile(request: Request, identifier: str):
     """Obtiene el perfil de un usuario por su email o username"""
     try:
-        # Intentar buscar por username primero (más común en URLs)
-        response = supabase.table("user_profiles").select("*").eq("username", identifier).execute()
-        if not response.data:
-            # Si no se encuentra por username, intentar por email
-            response = supabase.table("user_profiles").select("*").eq("email", identifier).execute()
-        if not response.data:
+        # Una sola query por username o email (el username tiene prioridad)
+        profile = await find_profile(identifier)
+        if profile is None:
             raise HTTPException(status_code=404, detail="Perfil no encontrado")
-        return UserProfile(**response.data[0])
+        return conditional_response(request, UserProfile(**profile))
     except HTTPException:
         raise
     except Exception as e:
@@ -28,9 +27,10 @@ async def get_profile(identifier: str):
 async def create_profile(profile: UserProfileCreate):
     """Crea un perfil de usuario"""
     try:
-        response = supabase.table("user_profiles").insert(profile.dict()).execute()
+        response = await db.execute(db.table("user_profiles").insert(profile.dict()))
         if not response.data:
             raise HTTPException(status_code=400, detail="Error creando perfil")
+        invalidate_profile(profile.email)
         return UserProfile(**response.data[0])
     except Exception as e:
         error_detail = str(e)
@@ -49,9 +49,18 @@ async def update_profile(email: str, profile_update: UserProfileUpdate):
         
         update_data["updated_at"] = "now()"
         
-        response = supabase.table("user_profiles").update(update_data).eq("email", email).execute()
+        # El username anterior se lee antes del cambio para invalidar su entrada
+        # del cache aunque el mapa email → username ya no la tenga
+        old_username = None
+        if "username" in update_data:
+            current = await db.execute(db.table("user_profiles").select("username").eq("email", email))
+            if current.data:
+                old_username = current.data[0].get("username")
+        
+        response = await db.execute(db.table("user_profiles").update(update_data).eq("email", email))
         if not response.data:
             raise HTTPException(status_code=404, detail="Perfil no encontrado")
+        invalidate_profile(email, old_username)
         return UserProfile(**response.data[0])
     except HTTPException:
         raise
@@ -63,46 +72,27 @@ async def update_profile(email: str, profile_update: UserProfileUpdate):
 
 
 @router.get("/{identifier}/stats", response_model=UserStats)
-async def get_user_stats(identifier: str):
+async def get_user_stats(request: Request, identifier: str):
     """Obtiene las estadísticas de un usuario por email o username"""
     try:
         # Obtener el email del usuario (buscando por username o email)
-        # Intentar primero por username
-        profile_response = supabase.table("user_profiles").select("email").eq("username", identifier).execute()
-        
-        # Si no se encuentra por username, intentar por email
-        if not profile_response.data:
-            profile_response = supabase.table("user_profiles").select("email").eq("email", identifier).execute()
-        
-        if not profile_response.data:
+        email = await resolve_email(identifier)
+        if email is None:
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
-        email = profile_response.data[0]["email"]
-        
-        # Obtener posts del usuario
-        posts_response = supabase.table("posts").select("id").eq("user_email", email).execute()
-        total_posts = len(posts_response.data) if posts_response.data else 0
-        post_ids = [post["id"] for post in posts_response.data] if posts_response.data else []
-        
-        # Obtener comentarios del usuario
-        comments_response = supabase.table("comments").select("id").eq("user_email", email).execute()
-        total_comments = len(comments_response.data) if comments_response.data else 0
-        
-        # Obtener likes y dislikes recibidos (en posts del usuario)
-        total_likes_received = 0
-        total_dislikes_received = 0
         
-        if post_ids:
-            likes_response = supabase.table("likes").select("is_like").in_("post_id", post_ids).execute()
-            if likes_response.data:
-                total_likes_received = sum(1 for like in likes_response.data if like.get("is_like") is True)
-                total_dislikes_received = sum(1 for like in likes_response.data if like.get("is_like") is False)
+        # Estadísticas precalculadas por triggers: una sola lectura por clave primaria
+        stats_response = await db.execute(db.table("user_stats").select("*").eq("email", email))
+        if stats_response.data:
+            stats = UserStats(**stats_response.data[0])
+        else:
+            stats = UserStats(
+                total_posts=0,
+                total_comments=0,
+                total_likes_received=0,
+                total_dislikes_received=0
+            )
         
-        return UserStats(
-            total_posts=total_posts,
-            total_comments=total_comments,
-            total_likes_received=total_likes_received,
-            total_dislikes_received=total_dislikes_received
-        )
+        return conditional_response(request, stats)
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import List, Optional
+from app.database import db
+from app.models import SearchResult, SearchResultList
+from app.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
+from app.profile_service import get_profiles
+from app.response_cache import conditional_response, is_anonymous, response_cache
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+# Orden de los resultados (más relevantes primero); también define el contenido del cursor
+SEARCH_KEYSET = ("rank", "created_at", "id")
+
+
+@router.get("", response_model=List[SearchResult])
+async def search(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    type: str = Query("all", pattern="^(all|posts|comments)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Busca texto en posts y comentarios, de los más relevantes a los menos relevantes.
+
+    `q` admite la sintaxis de un buscador web ("frase exacta", OR, -excluir).
+    Usa la función search_content sobre los índices GIN de texto completo; el
+    header X-Next-Cursor trae el cursor de la página siguiente.
+    """
+    try:
+        cacheable = is_anonymous(request)
+        if cacheable:
+            cached = await response_cache.get(request)
+            if cached is not None:
+                return cached
+
+        params = {"p_query": q, "p_type": type, "p_limit": limit}
+        if cursor:
+            params["p_before_rank"], params["p_before_at"], params["p_before_id"] = decode_cursor(cursor, len(SEARCH_KEYSET))
+        response = await db.execute(db.rpc("search_content", params))
+        results_data = response.data or []
+
+        # Enriquecer con el perfil del autor (desde cache o en una sola query)
+        profiles_dict = await get_profiles(result["user_email"] for result in results_data)
+        for result in results_data:
+            profile = profiles_dict.get(result["user_email"])
+            if profile:
+                result["username"] = profile.get("username")
+                result["avatar_url"] = profile.get("avatar_url")
+
+        results = SearchResultList.validate_python(results_data)
+        cursor_value = next_cursor(results_data, SEARCH_KEYSET, limit)
+        headers = {NEXT_CURSOR_HEADER: cursor_value} if cursor_value else None
+
+        # Sin tags: los resultados se renuevan al expirar el TTL del cache
+        if cacheable:
+            return await response_cache.put(request, results, [], headers)
+        return conditional_response(request, results, headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error buscando: {str(e)}")
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import os
+import tempfile
+from typing import BinaryIO, NamedTuple, Optional
+from anyio import to_thread
+from fastapi import HTTPException, UploadFile
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+from app.database import db
+
+BUCKET = "post-images"
+# Etiqueta de las subidas en las métricas de llamadas a Supabase
+STORAGE_LABEL = f"storage:{BUCKET}"
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+BODY_TOO_LARGE = "El cuerpo de la petición es demasiado grande"
+
+# Límite de subidas simultáneas hacia Storage por worker
+upload_slots = asyncio.Semaphore(settings.max_concurrent_uploads)
+
+
+class UploadedMedia(NamedTuple):
+    url: str
+    storage_path: str
+    local_path: Optional[str]  # copia temporal en disco, solo con keep_local=True
+
+
+def file_too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"El archivo supera el tamaño máximo permitido ({max_bytes // (1024 * 1024)} MB)"
+    )
+
+
+class UploadSizeLimitMiddleware:
+    """Rechaza cuerpos de petición más grandes que `max_bytes` mientras se reciben.
+
+    Si llega Content-Length se rechaza antes de leer nada; si no (chunked) se
+    cuentan los bytes a medida que llegan y se corta al superar el límite.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await send({
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [(b"content-type", b"application/json")],
+            })
+            await send({
+                "type": "http.response.body",
+                "body": json.dumps({"detail": BODY_TOO_LARGE}).encode(),
+            })
+            return
+        
+        received = 0
+        
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=BODY_TOO_LARGE)
+            return message
+        
+        await self.app(scope, limited_receive, send)
+
+
+def _copy_limited(source: BinaryIO, destination: BinaryIO, max_bytes: int) -> int:
+    """Copia por bloques de CHUNK_SIZE cortando si se supera max_bytes"""
+    total = 0
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            return total
+        total += len(chunk)
+        if total > max_bytes:
+            raise file_too_large(max_bytes)
+        destination.write(chunk)
+
+
+async def spool_upload(file: UploadFile, max_bytes: int) -> str:
+    """Vuelca el archivo subido a un archivo temporal en disco y retorna su ruta.
+
+    La memoria usada es de un bloque a la vez, sin importar el tamaño del archivo.
+    """
+    await file.seek(0)
+    fd, path = tempfile.mkstemp(prefix="upload-")
+    try:
+        with os.fdopen(fd, "wb") as destination:
+            await to_thread.run_sync(_copy_limited, file.file, destination, max_bytes)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def upload_from_disk(local_path: str, storage_path: str, content_type: str):
+    """Sube un archivo local a Storage (bloqueante, usar con `db.run`)"""
+    # Un BufferedReader hace que httpx envíe el multipart por bloques desde disco
+    with open(local_path, "rb") as source:
+        return db.storage.from_(BUCKET).upload(
+            storage_path,
+            source,
+            file_options={"content-type": content_type, "upsert": "true"}
+        )
+
+
+async def stream_upload(
+    file: UploadFile,
+    storage_path: str,
+    content_type: str,
+    max_bytes: int,
+    keep_local: bool = False
+) -> UploadedMedia:
+    """Sube un archivo a Supabase Storage por streaming.
+
+    Con `keep_local` se conserva la copia temporal en disco, que queda a
+    cargo de quien llama (por ejemplo, para el procesado de media).
+    """
+    async with upload_slots:
+        local_path = await spool_upload(file, max_bytes)
+        try:
+            upload_response = await db.run(
+                upload_from_disk, local_path, storage_path, content_type, label=STORAGE_LABEL, method="UPLOAD"
+            )
+        except BaseException:
+            os.remove(local_path)
+            raise
+    
+    if not keep_local:
+        os.remove(local_path)
+        local_path = None
+    
+    # Verificar si hubo error en la subida
+    if hasattr(upload_response, 'error') and upload_response.error:
+        if local_path:
+            os.remove(local_path)
+        raise Exception(f"Error de Supabase Storage: {upload_response.error}")
+    
+    return UploadedMedia(db.storage.from_(BUCKET).get_public_url(storage_path), storage_path, local_path)
@@ -0,0 +1,106 @@
+"""Throughput de la API según la concurrencia, contra un PostgREST local con latencia fija.
+
+Lanza peticiones concurrentes a GET /api/comments/post/{id} (con Authorization
+para saltar el cache de respuestas, así cada petición llega a la base de datos)
+y reporta peticiones por segundo y latencias. Con el pool de hilos de
+`Database` el throughput crece con la concurrencia hasta DB_MAX_CONCURRENCY;
+con --blocking cada query bloquea el event loop (como antes de user-001) y el
+throughput queda plano en ~1/delay.
+
+    cd backend
+    python -m bench.load_concurrency
+    python -m bench.load_concurrency --blocking
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from bench.stub import PostgrestStub
+
+POST_ID = str(uuid.uuid4())
+
+
+def comment_rows(count: int) -> list:
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "post_id": POST_ID,
+            "user_email": f"user{i}@example.com",
+            "content": f"Comentario {i}",
+            "created_at": "2024-01-01T00:00:00+00:00",
+        }
+        for i in range(count)
+    ]
+
+
+async def run_level(client, concurrency: int, total: int) -> dict:
+    latencies = []
+    pending = iter(range(total))
+
+    async def worker():
+        for _ in pending:
+            start = time.perf_counter()
+            response = await client.get(f"/api/comments/post/{POST_ID}", headers={"Authorization": "Bearer bench"})
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"Respuesta inesperada {response.status_code}: {response.text}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+async def main(args) -> None:
+    import httpx
+    from app import database
+    from app.config import settings
+    from app.main import app
+
+    stub = PostgrestStub(port=args.port, delay=args.delay).start()
+    # Nunca apuntar a la base real aunque exista backend/.env
+    settings.supabase_url = stub.url
+    settings.supabase_service_key = "bench.bench.bench"
+    stub.routes[("GET", "/rest/v1/comments")] = comment_rows(args.rows)
+    stub.routes[("GET", "/rest/v1/user_profiles")] = []
+
+    if args.blocking:
+        class InlineThread:
+            @staticmethod
+            async def run_sync(fn, *fn_args, limiter=None):
+                return fn(*fn_args)
+
+        database.to_thread = InlineThread
+
+    mode = "bloqueante" if args.blocking else "pool de hilos"
+    print(f"Modo {mode}, latencia del stub {args.delay * 1000:.0f} ms, DB_MAX_CONCURRENCY={settings.db_max_concurrency}")
+    print(f"{'concurrencia':>12} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=None) as client:
+        for concurrency in args.concurrency:
+            result = await run_level(client, concurrency, max(concurrency * args.requests, args.requests))
+            print(f"{concurrency:>12} {result['rps']:>8.1f} {result['p50'] * 1000:>8.1f} {result['p99'] * 1000:>8.1f}")
+    stub.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 10, 20, 40, 80])
+    parser.add_argument("--requests", type=int, default=10, help="peticiones por cliente concurrente")
+    parser.add_argument("--delay", type=float, default=0.2, help="latencia del stub en segundos")
+    parser.add_argument("--rows", type=int, default=20, help="comentarios por respuesta")
+    parser.add_argument("--port", type=int, default=54329)
+    parser.add_argument("--blocking", action="store_true", help="ejecutar las queries en el event loop")
+    args = parser.parse_args()
+    # La configuración exige estas variables al importar la app
+    os.environ.setdefault("SUPABASE_URL", f"http://127.0.0.1:{args.port}")
+    os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench.bench.bench")
+    asyncio.run(main(args))
@@ -0,0 +1,135 @@
+"""Coste por fila de serializar páginas de Post, Comment y Message, antes y ahora.
+
+"antes" es lo que hacían los endpoints de listas: un modelo por fila
+(`[Post(**row) for row in rows]`) y después el camino de `response_model` de
+FastAPI (volcar los modelos, validarlos otra vez, `jsonable_encoder` y
+`json.dumps`). "ahora" es una sola validación con el TypeAdapter de la lista y
+`render_json` (pydantic-core). Las filas imitan lo que devuelve PostgREST ya
+enriquecido con los perfiles. No necesita red ni Supabase.
+
+    cd backend
+    python -m bench.serialization
+    python -m bench.serialization --rows 1000 10000 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Any, Callable, List
+
+
+def post_rows(count: int) -> List[dict]:
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_email": f"user{i % 500}@example.com",
+            "content": f"Post de benchmark {i} " + "texto " * 20,
+            "image_url": f"https://example.supabase.co/storage/v1/object/public/post-images/u{i}/a.jpg" if i % 3 == 0 else None,
+            "video_url": None,
+            "created_at": "2024-01-01T12:00:00.123456+00:00",
+            "username": f"user{i % 500}",
+            "avatar_url": f"https://example.supabase.co/storage/v1/object/public/avatars/u{i % 500}.jpg",
+            "media_status": "ready" if i % 3 == 0 else None,
+            "media_variants": {"thumbnail": "t.webp", "feed": "f.webp", "full": "x.webp"} if i % 3 == 0 else None,
+            "likes": i % 97,
+            "dislikes": i % 13,
+            "comment_count": i % 29,
+            "user_vote": None,
+        }
+        for i in range(count)
+    ]
+
+
+def comment_rows(count: int) -> List[dict]:
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "post_id": str(uuid.uuid4()),
+            "user_email": f"user{i % 500}@example.com",
+            "content": f"Comentario {i} " + "texto " * 10,
+            "created_at": "2024-01-01T12:00:00.123456+00:00",
+            "parent_id": None,
+            "depth": 0,
+            "reply_count": i % 5,
+            "username": f"user{i % 500}",
+            "avatar_url": None,
+        }
+        for i in range(count)
+    ]
+
+
+def message_rows(count: int) -> List[dict]:
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "sender_email": "ana@example.com" if i % 2 else "bob@example.com",
+            "receiver_email": "bob@example.com" if i % 2 else "ana@example.com",
+            "content": f"Mensaje {i}",
+            "read": True,
+            "created_at": "2024-01-01T12:00:00.123456+00:00",
+            "sender_username": "ana" if i % 2 else "bob",
+            "sender_avatar_url": None,
+            "receiver_username": "bob" if i % 2 else "ana",
+            "receiver_avatar_url": None,
+        }
+        for i in range(count)
+    ]
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> float:
+    """Mejor tiempo de `repeat` ejecuciones, en segundos"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(args) -> None:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from app.models import Comment, CommentList, Message, MessageList, Post, PostList
+    from app.response_cache import render_json
+
+    cases = [
+        ("Post", Post, PostList, post_rows),
+        ("Comment", Comment, CommentList, comment_rows),
+        ("Message", Message, MessageList, message_rows),
+    ]
+
+    # serialize_response es async; un solo loop para no medir su creación
+    loop = asyncio.new_event_loop()
+    print(f"{'modelo':>8} {'filas':>7} {'antes µs/fila':>14} {'ahora µs/fila':>14} {'mejora':>7}")
+    for name, model, adapter, make_rows in cases:
+        field = create_response_field(name=f"Response_{name}", type_=List[model])
+        for count in args.rows:
+            rows = make_rows(count)
+
+            def before():
+                items = [model(**row) for row in rows]
+                content = loop.run_until_complete(serialize_response(field=field, response_content=items))
+                json.dumps(jsonable_encoder(content)).encode()
+
+            def after():
+                render_json(adapter.validate_python(rows))
+
+            old = timed(before, args.repeat) / count * 1e6
+            new = timed(after, args.repeat) / count * 1e6
+            print(f"{name:>8} {count:>7} {old:>14.2f} {new:>14.2f} {old / new:>6.1f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5, help="ejecuciones por caso (se toma la mejor)")
+    args = parser.parse_args()
+    # La configuración exige estas variables al importar la app
+    os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+    os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench.bench.bench")
+    main(args)
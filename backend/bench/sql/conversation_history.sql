@@ -0,0 +1,86 @@
+-- Benchmark: abrir una conversación de 100.000 mensajes, antes vs ahora
+--
+--   psql "$DATABASE_URL" -f bench/sql/conversation_history.sql
+--   psql "$DATABASE_URL" -v thread=500000 -v page_size=50 -f bench/sql/conversation_history.sql
+--
+-- Siembra `thread` mensajes entre dos usuarios (en ambas direcciones) y
+-- `noise` mensajes de uno de ellos con otras personas, dentro de una
+-- transacción que se deshace al final. "antes" son las dos queries que hacía
+-- get_conversation (A→B y B→A completas, que luego se unían y ordenaban en
+-- Python); el resto son las queries de una página que genera ahora sobre
+-- participant_a/participant_b: la más reciente, una página a mitad del hilo
+-- (con cursor) y el refresco con `since`.
+
+\if :{?thread}
+\else
+    \set thread 100000
+\endif
+\if :{?noise}
+\else
+    \set noise 100000
+\endif
+\if :{?page_size}
+\else
+    \set page_size 50
+\endif
+
+BEGIN;
+
+\ir helpers.sql
+
+-- Sembrar sin los triggers de no leídos y de resúmenes (una escritura extra por mensaje)
+ALTER TABLE messages DISABLE TRIGGER USER;
+
+INSERT INTO messages (sender_email, receiver_email, content, read, created_at)
+SELECT CASE WHEN g % 2 = 0 THEN 'alice@bench.test' ELSE 'bob@bench.test' END,
+       CASE WHEN g % 2 = 0 THEN 'bob@bench.test' ELSE 'alice@bench.test' END,
+       'Mensaje ' || g,
+       TRUE,
+       NOW() - make_interval(secs => :thread - g)
+FROM generate_series(1, :thread) AS g;
+
+INSERT INTO messages (sender_email, receiver_email, content, read, created_at)
+SELECT 'alice@bench.test', 'friend' || (g % 500) || '@bench.test', 'Otro mensaje ' || g, TRUE,
+       NOW() - make_interval(secs => g)
+FROM generate_series(1, :noise) AS g;
+
+ALTER TABLE messages ENABLE TRIGGER USER;
+
+ANALYZE messages;
+
+-- Cursor de la página a mitad del hilo y fecha del refresco (últimos 10 mensajes)
+SELECT created_at AS middle_at, id AS middle_id
+FROM messages
+WHERE participant_a = 'alice@bench.test' AND participant_b = 'bob@bench.test'
+ORDER BY created_at DESC, id DESC
+OFFSET :thread / 2 LIMIT 1
+\gset
+SELECT created_at AS since_at
+FROM messages
+WHERE participant_a = 'alice@bench.test' AND participant_b = 'bob@bench.test'
+ORDER BY created_at DESC, id DESC
+OFFSET 9 LIMIT 1
+\gset
+
+SELECT q.consulta,
+       pg_temp.bench_ms(q.sql, 3) AS ms,
+       pg_size_pretty(pg_temp.bench_bytes(q.sql)) AS json
+FROM (VALUES
+    (1, 'antes: A→B completa',
+     'SELECT * FROM messages WHERE sender_email = ''alice@bench.test'' AND receiver_email = ''bob@bench.test'' ORDER BY created_at'),
+    (2, 'antes: B→A completa',
+     'SELECT * FROM messages WHERE sender_email = ''bob@bench.test'' AND receiver_email = ''alice@bench.test'' ORDER BY created_at'),
+    (3, 'ahora: página más reciente',
+     format('SELECT * FROM messages WHERE participant_a = ''alice@bench.test'' AND participant_b = ''bob@bench.test'' '
+            'ORDER BY created_at DESC, id DESC LIMIT %s', :page_size)),
+    (4, 'ahora: página a mitad del hilo',
+     format('SELECT * FROM messages WHERE participant_a = ''alice@bench.test'' AND participant_b = ''bob@bench.test'' '
+            'AND created_at <= %1$L AND (created_at < %1$L OR (created_at = %1$L AND id < %2$L)) '
+            'ORDER BY created_at DESC, id DESC LIMIT %3$s', :'middle_at', :'middle_id', :page_size)),
+    (5, 'ahora: refresco con since',
+     format('SELECT * FROM messages WHERE participant_a = ''alice@bench.test'' AND participant_b = ''bob@bench.test'' '
+            'AND created_at >= %L ORDER BY created_at, id LIMIT %s', :'since_at', :page_size))
+) AS q(orden, consulta, sql)
+ORDER BY q.orden;
+
+ROLLBACK;
@@ -0,0 +1,63 @@
+-- Benchmark: página 1 vs página 10.000 del feed, con offset y con cursor (keyset)
+--
+--   psql "$DATABASE_URL" -f bench/sql/feed_pages.sql
+--   psql "$DATABASE_URL" -v rows=500000 -v page_size=20 -f bench/sql/feed_pages.sql
+--
+-- Siembra `rows` posts dentro de una transacción que se deshace al final.
+-- Cada fila compara la misma profundidad pedida con ?page=N (OFFSET) y con
+-- el cursor de esa página, usando las mismas queries que genera PostgREST.
+-- "keyset_sin_cota_ms" es el filtro OR sin la cota `created_at <= x`: muestra
+-- por qué apply_keyset la agrega.
+
+\if :{?rows}
+\else
+    \set rows 250000
+\endif
+\if :{?page_size}
+\else
+    \set page_size 20
+\endif
+
+BEGIN;
+
+\ir helpers.sql
+
+INSERT INTO posts (user_email, content, created_at)
+SELECT 'bench' || (g % 1000) || '@example.com',
+       'Post de benchmark ' || g,
+       NOW() - make_interval(secs => g)
+FROM generate_series(1, :rows) AS g;
+
+ANALYZE posts;
+
+SELECT d.page + 1 AS pagina,
+       pg_temp.bench_ms(format(
+           'SELECT * FROM posts ORDER BY created_at DESC, id DESC LIMIT %s OFFSET %s',
+           :page_size, d.page * :page_size
+       )) AS offset_ms,
+       pg_temp.bench_ms(CASE WHEN d.page = 0 THEN
+           format('SELECT * FROM posts ORDER BY created_at DESC, id DESC LIMIT %s', :page_size)
+       ELSE format(
+           'SELECT * FROM posts WHERE created_at <= %1$L AND (created_at < %1$L OR (created_at = %1$L AND id < %2$L)) '
+           'ORDER BY created_at DESC, id DESC LIMIT %3$s',
+           c.created_at, c.id, :page_size
+       ) END) AS keyset_ms,
+       pg_temp.bench_ms(CASE WHEN d.page = 0 THEN
+           format('SELECT * FROM posts ORDER BY created_at DESC, id DESC LIMIT %s', :page_size)
+       ELSE format(
+           'SELECT * FROM posts WHERE (created_at < %1$L OR (created_at = %1$L AND id < %2$L)) '
+           'ORDER BY created_at DESC, id DESC LIMIT %3$s',
+           c.created_at, c.id, :page_size
+       ) END) AS keyset_sin_cota_ms
+FROM (VALUES (0), (10), (100), (1000), (9999)) AS d(page)
+-- Última fila de la página anterior: el valor que lleva el cursor
+LEFT JOIN LATERAL (
+    SELECT p.created_at, p.id
+    FROM posts p
+    ORDER BY p.created_at DESC, p.id DESC
+    OFFSET GREATEST(d.page * :page_size - 1, 0)
+    LIMIT 1
+) c ON d.page > 0
+ORDER BY d.page;
+
+ROLLBACK;
@@ -0,0 +1,33 @@
+-- Funciones auxiliares de los benchmarks SQL. Son temporales (pg_temp):
+-- desaparecen al cerrar la sesión de psql.
+
+-- Tiempo medio en milisegundos de ejecutar `p_sql` `p_runs` veces, después de
+-- una ejecución de calentamiento que deja las páginas en el cache de Postgres
+CREATE OR REPLACE FUNCTION pg_temp.bench_ms(p_sql TEXT, p_runs INTEGER DEFAULT 10)
+RETURNS NUMERIC
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    started TIMESTAMP WITH TIME ZONE;
+BEGIN
+    EXECUTE p_sql;
+    started := clock_timestamp();
+    FOR i IN 1..p_runs LOOP
+        EXECUTE p_sql;
+    END LOOP;
+    RETURN round((extract(epoch FROM clock_timestamp() - started) * 1000 / p_runs)::numeric, 3);
+END;
+$$;
+
+-- Bytes del JSON que PostgREST devolvería para `p_sql` (un array con una fila por objeto)
+CREATE OR REPLACE FUNCTION pg_temp.bench_bytes(p_sql TEXT)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    total BIGINT;
+BEGIN
+    EXECUTE format('SELECT COALESCE(length(json_agg(r)::text), 2) FROM (%s) r', p_sql) INTO total;
+    RETURN total;
+END;
+$$;
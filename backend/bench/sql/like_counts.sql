@@ -0,0 +1,56 @@
+-- Benchmark: conteo de likes descargando los votos (antes) vs contadores en posts (ahora)
+--
+--   psql "$DATABASE_URL" -f bench/sql/like_counts.sql
+--
+-- Crea tres posts con 10, 10.000 y 1.000.000 de votos dentro de una transacción
+-- que se deshace al final. "antes" es la query que hacía get_like_count
+-- (todas las filas de likes del post, contadas luego en Python) y "ahora" la
+-- lectura de likes_count/dislikes_count. Se reportan el tiempo en Postgres y
+-- los bytes de JSON que viajan hasta la API.
+
+BEGIN;
+
+\ir helpers.sql
+
+CREATE TEMP TABLE bench_posts ON COMMIT DROP AS
+SELECT v AS votes, gen_random_uuid() AS post_id
+FROM (VALUES (10), (10000), (1000000)) AS t(v);
+
+INSERT INTO posts (id, user_email, content)
+SELECT post_id, 'bench@example.com', 'Post con ' || votes || ' votos'
+FROM bench_posts;
+
+-- Sembrar sin el trigger de contadores (un UPDATE de posts por voto) y
+-- calcular los contadores al final con una sola pasada
+ALTER TABLE likes DISABLE TRIGGER trg_likes_post_counters;
+
+INSERT INTO likes (post_id, user_email, is_like)
+SELECT b.post_id, 'voter' || g || '@example.com', g % 3 <> 0
+FROM bench_posts b, generate_series(1, b.votes) AS g;
+
+ALTER TABLE likes ENABLE TRIGGER trg_likes_post_counters;
+
+UPDATE posts p
+SET likes_count = c.likes, dislikes_count = c.dislikes
+FROM (
+    SELECT post_id,
+           COUNT(*) FILTER (WHERE is_like) AS likes,
+           COUNT(*) FILTER (WHERE NOT is_like) AS dislikes
+    FROM likes
+    WHERE post_id IN (SELECT post_id FROM bench_posts)
+    GROUP BY post_id
+) c
+WHERE p.id = c.post_id;
+
+ANALYZE likes;
+ANALYZE posts;
+
+SELECT b.votes AS votos,
+       pg_temp.bench_ms(format('SELECT * FROM likes WHERE post_id = %L', b.post_id), 3) AS antes_ms,
+       pg_size_pretty(pg_temp.bench_bytes(format('SELECT * FROM likes WHERE post_id = %L', b.post_id))) AS antes_json,
+       pg_temp.bench_ms(format('SELECT likes_count, dislikes_count FROM posts WHERE id = %L', b.post_id)) AS ahora_ms,
+       pg_size_pretty(pg_temp.bench_bytes(format('SELECT likes_count, dislikes_count FROM posts WHERE id = %L', b.post_id))) AS ahora_json
+FROM bench_posts b
+ORDER BY b.votes;
+
+ROLLBACK;
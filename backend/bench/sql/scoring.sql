@@ -0,0 +1,113 @@
+-- Benchmark: puntuaciones de los feeds hot, top y controversial sobre 1.000.000 de posts
+--
+--   psql "$DATABASE_URL" -f bench/sql/scoring.sql
+--   psql "$DATABASE_URL" -v rows=200000 -v page_size=20 -f bench/sql/scoring.sql
+--
+-- Siembra `rows` posts con votos y fechas sintéticos (un año) dentro de una
+-- transacción que se deshace al final, y mide:
+--   1. El INSERT de los posts con el trigger que calcula las puntuaciones, y
+--      el UPDATE que las recalcula todas (lo que hace la migración): psql
+--      muestra el tiempo de cada uno con \timing.
+--   2. El coste por voto: un UPDATE de likes_count, que dispara el trigger y
+--      actualiza los índices de las puntuaciones.
+--   3. Páginas 1, 101 y 1001 de cada orden con el cursor que genera la API,
+--      frente a calcular hot al leer (ordenar todos los posts en cada página).
+--      Con ventana (`t`) el coste depende de los posts que caen en ella.
+
+\if :{?rows}
+\else
+    \set rows 1000000
+\endif
+\if :{?page_size}
+\else
+    \set page_size 20
+\endif
+
+BEGIN;
+
+\ir helpers.sql
+
+-- Query de la API para la página `p_page` de un orden: la primera sin cursor y
+-- el resto con el cursor de la última fila de la página anterior (NULL si la
+-- ventana no llega a esa página)
+CREATE OR REPLACE FUNCTION pg_temp.page_sql(p_column TEXT, p_window INTERVAL, p_page INTEGER, p_page_size INTEGER)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    window_filter TEXT := CASE WHEN p_window IS NULL THEN 'TRUE'
+        ELSE format('created_at >= NOW() - %L::interval', p_window) END;
+    order_by TEXT := format('ORDER BY %I DESC, id DESC', p_column);
+    cursor_value TEXT;
+    cursor_id UUID;
+BEGIN
+    IF p_page = 0 THEN
+        RETURN format('SELECT * FROM posts WHERE %s %s LIMIT %s', window_filter, order_by, p_page_size);
+    END IF;
+    EXECUTE format('SELECT %I::text, id FROM posts WHERE %s %s OFFSET %s LIMIT 1',
+                   p_column, window_filter, order_by, p_page * p_page_size - 1)
+        INTO cursor_value, cursor_id;
+    IF cursor_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+    RETURN format(
+        'SELECT * FROM posts WHERE %1$s AND %2$I <= %3$L AND (%2$I < %3$L OR (%2$I = %3$L AND id < %4$L)) %5$s LIMIT %6$s',
+        window_filter, p_column, cursor_value, cursor_id, order_by, p_page_size
+    );
+END;
+$$;
+
+-- Sembrar sin el trigger de estadísticas por usuario (un upsert por post);
+-- el de puntuaciones sí corre, es lo que se mide
+ALTER TABLE posts DISABLE TRIGGER trg_posts_user_stats;
+
+\timing on
+INSERT INTO posts (user_email, content, created_at, likes_count, dislikes_count)
+SELECT 'bench' || (g % 1000) || '@example.com',
+       'Post de benchmark ' || g,
+       NOW() - make_interval(secs => (random() * 365 * 24 * 3600)::INTEGER),
+       floor(power(random(), 4) * 5000)::INTEGER,
+       floor(power(random(), 4) * 2000)::INTEGER
+FROM generate_series(1, :rows) AS g;
+
+UPDATE posts
+SET score = likes_count - dislikes_count,
+    hot_score = post_hot_score(likes_count, dislikes_count, created_at),
+    controversy_score = post_controversy_score(likes_count, dislikes_count);
+\timing off
+
+ALTER TABLE posts ENABLE TRIGGER trg_posts_user_stats;
+
+ANALYZE posts;
+
+SELECT id AS voted_post_id FROM posts ORDER BY hot_score DESC, id DESC LIMIT 1
+\gset
+
+SELECT pg_temp.bench_ms(format('UPDATE posts SET likes_count = likes_count + 1 WHERE id = %L', :'voted_post_id'), 100)
+    AS voto_ms;
+
+SELECT r.orden, r.pagina, r.ms
+FROM (
+    SELECT s.n, s.orden, d.page + 1 AS pagina, pg_temp.bench_ms(q.sql) AS ms
+    FROM (VALUES
+        (1, 'new', 'created_at', NULL::INTERVAL),
+        (2, 'hot', 'hot_score', NULL),
+        (3, 'top', 'score', NULL),
+        (4, 'top t=day', 'score', '1 day'),
+        (5, 'top t=year', 'score', '365 days'),
+        (6, 'controversial', 'controversy_score', NULL),
+        (7, 'controversial t=week', 'controversy_score', '7 days')
+    ) AS s(n, orden, col, ventana)
+    CROSS JOIN (VALUES (0), (100), (1000)) AS d(page)
+    CROSS JOIN LATERAL (SELECT pg_temp.page_sql(s.col, s.ventana, d.page, :page_size) AS sql) q
+    WHERE q.sql IS NOT NULL
+    UNION ALL
+    SELECT 8, 'hot calculado al leer', 1,
+           pg_temp.bench_ms(format(
+               'SELECT * FROM posts ORDER BY post_hot_score(likes_count, dislikes_count, created_at) DESC, id DESC LIMIT %s',
+               :page_size
+           ), 3)
+) r
+ORDER BY r.n, r.pagina;
+
+ROLLBACK;
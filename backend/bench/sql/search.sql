@@ -0,0 +1,120 @@
+-- Benchmark: búsqueda de texto completo sobre un corpus de 1.000.000 de filas
+--
+--   psql "$DATABASE_URL" -f bench/sql/search.sql
+--   psql "$DATABASE_URL" -v rows=200000 -v page_size=20 -f bench/sql/search.sql
+--
+-- Siembra `rows` textos (mitad posts, mitad comentarios) dentro de una
+-- transacción que se deshace al final. Las palabras salen de un vocabulario
+-- sintético de 8.000 palabras con una distribución sesgada, como el lenguaje
+-- real: unas pocas aparecen en casi todos los textos y la mayoría en pocos.
+-- Cada fila mide search_content (lo que llama /api/search) con un tipo de
+-- consulta, frente a buscar con ILIKE sin índice, y cuántas filas coinciden:
+-- el coste de la primera página crece con las coincidencias, porque todas se
+-- puntúan antes de ordenarlas.
+
+\if :{?rows}
+\else
+    \set rows 1000000
+\endif
+\if :{?page_size}
+\else
+    \set page_size 20
+\endif
+
+BEGIN;
+
+\ir helpers.sql
+
+-- Palabra n del vocabulario: tres sílabas, 20^3 = 8.000 palabras distintas
+CREATE OR REPLACE FUNCTION pg_temp.bench_word(n INTEGER)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT s[1 + n % 20] || s[1 + (n / 20) % 20] || s[1 + (n / 400) % 20]
+    FROM (SELECT ARRAY['ca', 'me', 'ti', 'lo', 'ru', 'sa', 'pe', 'di', 'no', 'ba',
+                       'fre', 'gu', 'la', 'mo', 'ne', 'ri', 'to', 'va', 'zo', 'che'] AS s) v;
+$$;
+
+-- Texto de `words` palabras; power(random(), 3) concentra los índices bajos
+CREATE OR REPLACE FUNCTION pg_temp.bench_text(words INTEGER)
+RETURNS TEXT
+LANGUAGE sql
+VOLATILE
+AS $$
+    SELECT string_agg(pg_temp.bench_word((power(random(), 3) * 8000)::INTEGER), ' ')
+    FROM generate_series(1, words);
+$$;
+
+-- Sembrar sin los triggers de contadores, estadísticas y rutas de hilos
+-- (los índices GIN sí se mantienen: son parte de lo que cuesta escribir)
+ALTER TABLE posts DISABLE TRIGGER USER;
+ALTER TABLE comments DISABLE TRIGGER USER;
+
+\timing on
+CREATE TEMP TABLE bench_posts (n BIGINT PRIMARY KEY, id UUID) ON COMMIT DROP;
+
+WITH inserted AS (
+    INSERT INTO posts (user_email, content, created_at)
+    SELECT 'bench' || (g % 1000) || '@example.com',
+           pg_temp.bench_text(8 + g % 25),
+           NOW() - make_interval(secs => g)
+    FROM generate_series(1, :rows / 2) AS g
+    RETURNING id
+)
+INSERT INTO bench_posts SELECT row_number() OVER (), id FROM inserted;
+
+INSERT INTO comments (post_id, user_email, content, created_at)
+SELECT b.id, 'bench' || (g % 1000) || '@example.com', pg_temp.bench_text(4 + g % 15), NOW() - make_interval(secs => g)
+FROM generate_series(1, :rows - :rows / 2) AS g
+JOIN bench_posts b ON b.n = 1 + g % (:rows / 2);
+\timing off
+
+ALTER TABLE posts ENABLE TRIGGER USER;
+ALTER TABLE comments ENABLE TRIGGER USER;
+
+ANALYZE posts;
+ANALYZE comments;
+
+-- Palabra más frecuente (índice 0), una intermedia y una rara
+SELECT pg_temp.bench_word(0) AS common_word,
+       pg_temp.bench_word(100) AS mid_word,
+       pg_temp.bench_word(7000) AS rare_word
+\gset
+
+-- Cursor de la página 51 de la palabra frecuente (última fila de la página 50)
+SELECT rank AS cursor_rank, created_at AS cursor_at, id AS cursor_id
+FROM search_content(:'common_word', 'all', 50 * :page_size)
+ORDER BY rank, created_at, id
+LIMIT 1
+\gset
+
+SELECT q.consulta,
+       (SELECT COUNT(*) FROM posts WHERE search_document(content) @@ websearch_to_tsquery('spanish', q.terms))
+     + (SELECT COUNT(*) FROM comments WHERE search_document(content) @@ websearch_to_tsquery('spanish', q.terms))
+           AS coincidencias,
+       pg_temp.bench_ms(q.sql, 3) AS ms
+FROM (VALUES
+    (1, 'palabra rara', :'rare_word',
+     format('SELECT * FROM search_content(%L, %L, %s)', :'rare_word', 'all', :page_size)),
+    (2, 'palabra intermedia', :'mid_word',
+     format('SELECT * FROM search_content(%L, %L, %s)', :'mid_word', 'all', :page_size)),
+    (3, 'palabra frecuente', :'common_word',
+     format('SELECT * FROM search_content(%L, %L, %s)', :'common_word', 'all', :page_size)),
+    (4, 'palabra frecuente, página 51', :'common_word',
+     format('SELECT * FROM search_content(%L, %L, %s, %L, %L, %L)', :'common_word', 'all', :page_size,
+            :'cursor_rank', :'cursor_at', :'cursor_id')),
+    (5, 'palabra frecuente, solo posts', :'common_word',
+     format('SELECT * FROM search_content(%L, %L, %s)', :'common_word', 'posts', :page_size)),
+    (6, 'dos palabras (AND)', :'mid_word' || ' ' || :'common_word',
+     format('SELECT * FROM search_content(%L, %L, %s)', :'mid_word' || ' ' || :'common_word', 'all', :page_size)),
+    (7, 'frase exacta', '"' || :'common_word' || ' ' || :'mid_word' || '"',
+     format('SELECT * FROM search_content(%L, %L, %s)', '"' || :'common_word' || ' ' || :'mid_word' || '"', 'all', :page_size)),
+    (8, 'palabra intermedia con ILIKE (sin índice)', :'mid_word',
+     format('SELECT * FROM (SELECT id, content, created_at FROM posts WHERE content ILIKE %1$L '
+            'UNION ALL SELECT id, content, created_at FROM comments WHERE content ILIKE %1$L) m '
+            'ORDER BY created_at DESC LIMIT %2$s', '%' || :'mid_word' || '%', :page_size))
+) AS q(orden, consulta, terms, sql)
+ORDER BY q.orden;
+
+ROLLBACK;
@@ -0,0 +1,69 @@
+"""Servidor HTTP local que imita a PostgREST para los benchmarks.
+
+Responde a cualquier ruta con la respuesta registrada para su prefijo
+(`routes[("GET", "/rest/v1/comments")] = rows`) después de `delay` segundos,
+simulando la latencia de red hasta Supabase. Cada petición corre en su propio
+hilo, así el stub nunca es el cuello de botella.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Tuple, Union
+
+Route = Tuple[str, str]
+Body = Union[Any, Callable[[str, bytes], Any]]
+
+
+class PostgrestStub:
+    def __init__(self, port: int = 54321, delay: float = 0.0):
+        self.port = port
+        self.delay = delay
+        self.routes: Dict[Route, Body] = {}
+        self.requests = 0
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "PostgrestStub":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def handle_any(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                stub.requests += 1
+                if stub.delay:
+                    time.sleep(stub.delay)
+                data = stub.respond(self.command, self.path, body)
+                out = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = do_HEAD = handle_any
+
+        ThreadingHTTPServer.request_queue_size = 1024
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def respond(self, method: str, path: str, body: bytes) -> Any:
+        for (route_method, prefix), data in self.routes.items():
+            if route_method == method and path.startswith(prefix):
+                return data(path, body) if callable(data) else data
+        return []
@@ -0,0 +1,68 @@
+import os
+
+# La configuración exige estas variables al importar la app
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.test")
+os.environ.setdefault("SUPABASE_KEY", "test.test.test")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test.test.test")
+
+import threading
+from typing import Any, Callable, Dict, List, Tuple, Union
+import httpx
+import pytest
+from postgrest.utils import SyncClient
+from app.config import settings
+from app.database import db
+
+# Nunca apuntar a la base real aunque exista backend/.env
+settings.supabase_url = "http://postgrest.test"
+settings.supabase_service_key = "test.test.test"
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiter():
+    # El limiter de anyio queda ligado al event loop donde se creó; cada test usa uno nuevo
+    db._limiter = None
+    yield
+    db._limiter = None
+
+
+class FakePostgrest:
+    """PostgREST en memoria detrás del cliente real de Supabase.
+
+    Las queries pasan por `db.execute`, el pool de hilos y postgrest-py como en
+    producción; solo el transporte HTTP se reemplaza. Cada ruta responde con
+    datos fijos o con una función que recibe la petición (desde el hilo del pool).
+    """
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], Union[Any, Callable[[httpx.Request], Any]]] = {}
+        self.requests: List[httpx.Request] = []
+        self._lock = threading.Lock()
+
+    def route(self, method: str, path: str, response: Any) -> None:
+        self.routes[(method, "/rest/v1" + path)] = response
+
+    def calls(self, method: str, path: str) -> List[httpx.Request]:
+        return [r for r in self.requests if r.method == method and r.url.path == "/rest/v1" + path]
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.requests.append(request)
+        for (method, prefix), response in self.routes.items():
+            if request.method == method and request.url.path.startswith(prefix):
+                data = response(request) if callable(response) else response
+                return data if isinstance(data, httpx.Response) else httpx.Response(200, json=data)
+        return httpx.Response(200, json=[])
+
+
+@pytest.fixture
+def postgrest(monkeypatch):
+    fake = FakePostgrest()
+    db._open()
+    session = db._postgrest.session
+    monkeypatch.setattr(db._postgrest, "session", SyncClient(
+        base_url=session.base_url,
+        headers=session.headers,
+        transport=httpx.MockTransport(fake.handle),
+    ))
+    return fake
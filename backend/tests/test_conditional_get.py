@@ -0,0 +1,127 @@
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.profile_service import identifier_cache, profile_cache
+from app.response_cache import InMemoryCacheBackend, response_cache
+
+POST_ID = str(uuid.uuid4())
+CREATED_AT = "2024-01-01T00:00:00+00:00"
+
+
+def post_row(content: str = "Hola") -> dict:
+    return {"id": POST_ID, "user_email": "ana@example.com", "content": content, "created_at": CREATED_AT,
+            "likes_count": 0, "dislikes_count": 0, "comments_count": 0}
+
+
+def comment_row(content: str) -> dict:
+    return {"id": str(uuid.uuid4()), "post_id": POST_ID, "user_email": "bob@example.com",
+            "content": content, "created_at": CREATED_AT}
+
+
+def profile_row(username: str) -> dict:
+    return {"email": "ana@example.com", "username": username, "avatar_url": None,
+            "onboarding_completed": True, "created_at": CREATED_AT, "updated_at": CREATED_AT}
+
+
+@pytest.fixture
+def client(postgrest, monkeypatch):
+    # Cache de respuestas y de perfiles vacíos en cada test
+    monkeypatch.setattr(response_cache, "backend", InMemoryCacheBackend(settings.response_cache_size, response_cache.ttl))
+    profile_cache.clear()
+    identifier_cache.clear()
+    with TestClient(app) as client:
+        yield client
+
+
+def revalidate(client: TestClient, url: str) -> str:
+    """Primera lectura (200 con ETag) y revalidación con If-None-Match (304 sin cuerpo)"""
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    second = client.get(url, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+    return etag
+
+
+def test_feed_revalidates_until_a_new_post(client, postgrest):
+    posts = [post_row()]
+    postgrest.route("GET", "/posts", lambda request: posts)
+    postgrest.route("POST", "/posts", lambda request: [posts[0]])
+
+    etag = revalidate(client, "/api/posts/")
+
+    posts.insert(0, {**post_row("Nuevo"), "id": str(uuid.uuid4())})
+    # Sin escrituras el feed sigue saliendo del cache con el mismo ETag
+    assert client.get("/api/posts/", headers={"If-None-Match": etag}).status_code == 304
+
+    assert client.post("/api/posts/", data={"content": "Nuevo", "user_email": "ana@example.com"}).status_code == 200
+
+    response = client.get("/api/posts/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()) == 2
+
+
+def test_comments_revalidate_until_a_new_comment(client, postgrest):
+    comments = [comment_row("Primero")]
+    postgrest.route("GET", "/comments", lambda request: comments)
+    postgrest.route("POST", "/comments", lambda request: [comments[-1]])
+
+    url = f"/api/comments/post/{POST_ID}"
+    etag = revalidate(client, url)
+
+    comments.append(comment_row("Segundo"))
+    payload = {"post_id": POST_ID, "user_email": "bob@example.com", "content": "Segundo"}
+    assert client.post("/api/comments/", json=payload).status_code == 200
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [c["content"] for c in response.json()] == ["Primero", "Segundo"]
+
+
+def test_like_count_revalidates_until_a_vote(client, postgrest):
+    counts = {"likes_count": 0, "dislikes_count": 0}
+
+    def vote(request):
+        counts["likes_count"] += 1
+        return [{"likes": counts["likes_count"], "dislikes": counts["dislikes_count"]}]
+
+    postgrest.route("GET", "/posts", lambda request: [dict(counts)])
+    postgrest.route("POST", "/rpc/vote_post", vote)
+
+    url = f"/api/likes/post/{POST_ID}"
+    etag = revalidate(client, url)
+
+    payload = {"post_id": POST_ID, "user_email": "bob@example.com", "is_like": True}
+    assert client.post("/api/likes/", json=payload).status_code == 200
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json() == {"likes": 1, "dislikes": 0}
+
+
+def test_profile_revalidates_until_an_update(client, postgrest):
+    profile = profile_row("ana")
+
+    def update(request):
+        profile.update(profile_row("ana_nueva"))
+        return [profile]
+
+    postgrest.route("GET", "/user_profiles", lambda request: [profile])
+    postgrest.route("PATCH", "/user_profiles", update)
+
+    etag = revalidate(client, "/api/profiles/ana@example.com")
+
+    assert client.put("/api/profiles/ana@example.com", json={"username": "ana_nueva"}).status_code == 200
+
+    response = client.get("/api/profiles/ana@example.com", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["username"] == "ana_nueva"
@@ -0,0 +1,53 @@
+import time
+import anyio
+from app.database import db
+from app.metrics import metrics
+
+
+def test_peak_in_flight_counts_queries_running_at_once():
+    concurrency = min(40, db.max_concurrency)
+    db.peak_in_flight = 0
+
+    async def burst():
+        async with anyio.create_task_group() as tg:
+            for _ in range(concurrency):
+                tg.start_soon(db.run, time.sleep, 0.05)
+
+    anyio.run(burst)
+
+    stats = db.pool_stats()
+    assert stats["peak_in_flight"] == concurrency
+    assert stats["in_flight"] == 0
+
+
+def test_peak_in_flight_never_exceeds_pool_size():
+    db.peak_in_flight = 0
+
+    async def burst():
+        async with anyio.create_task_group() as tg:
+            for _ in range(db.max_concurrency * 2):
+                tg.start_soon(db.run, time.sleep, 0.01)
+
+    anyio.run(burst)
+
+    assert db.peak_in_flight == db.max_concurrency
+
+
+def recorded_calls(table: str, method: str) -> float:
+    return metrics.db_calls._values.get((table, method), 0)
+
+
+def test_run_records_calls_under_their_label(postgrest):
+    postgrest.route("GET", "/posts", [])
+    before_uploads = recorded_calls("storage:post-images", "UPLOAD")
+    before_reads = recorded_calls("posts", "GET")
+
+    async def calls():
+        await db.run(time.sleep, 0, label="storage:post-images", method="UPLOAD")
+        await db.execute(db.table("posts").select("*"))
+
+    anyio.run(calls)
+
+    assert recorded_calls("storage:post-images", "UPLOAD") == before_uploads + 1
+    # Las queries pasan por el pool de hilos pero se registran una sola vez, con su tabla
+    assert recorded_calls("posts", "GET") == before_reads + 1
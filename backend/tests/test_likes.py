@@ -0,0 +1,73 @@
+import json
+import threading
+import time
+import uuid
+import anyio
+import httpx
+from app.database import db
+from app.main import app
+
+POST_ID = str(uuid.uuid4())
+
+
+def vote_post_rpc():
+    """vote_post() en memoria: upsert por (post_id, user_email) y totales del post"""
+    votes = {}
+    lock = threading.Lock()
+
+    def handle(request: httpx.Request):
+        params = json.loads(request.content)
+        time.sleep(0.002)  # que las llamadas se solapen en el pool de hilos
+        with lock:
+            if params["p_post_id"] != POST_ID:
+                return []
+            votes[(params["p_post_id"], params["p_user_email"])] = params["p_is_like"]
+            likes = sum(1 for is_like in votes.values() if is_like)
+            return [{"likes": likes, "dislikes": len(votes) - likes}]
+
+    return handle, votes
+
+
+def cast_votes(count: int, post_id: str = POST_ID) -> list:
+    async def run():
+        responses = []
+
+        async def vote(i):
+            payload = {"post_id": post_id, "user_email": "voter@example.com", "is_like": i % 2 == 0}
+            responses.append(await client.post("/api/likes/", json=payload))
+
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            async with anyio.create_task_group() as tg:
+                for i in range(count):
+                    tg.start_soon(vote, i)
+        return responses
+
+    return anyio.run(run)
+
+
+def test_parallel_votes_from_one_user_never_fail(postgrest):
+    handle, votes = vote_post_rpc()
+    postgrest.route("POST", "/rpc/vote_post", handle)
+    db.peak_in_flight = 0
+
+    responses = cast_votes(300)
+
+    assert [r.status_code for r in responses if r.status_code != 200] == []
+    # Un solo voto por usuario, sea cual sea el orden en que llegaron
+    for response in responses:
+        body = response.json()
+        assert body["likes"] + body["dislikes"] == 1
+    assert len(votes) == 1
+    # Los totales vienen del mismo RPC: ni SELECT previo ni GET de conteo después
+    assert len(postgrest.calls("POST", "/rpc/vote_post")) == 300
+    assert len(postgrest.requests) == 300
+    assert db.peak_in_flight > 1
+
+
+def test_vote_on_missing_post_is_404(postgrest):
+    handle, _ = vote_post_rpc()
+    postgrest.route("POST", "/rpc/vote_post", handle)
+
+    responses = cast_votes(1, post_id=str(uuid.uuid4()))
+
+    assert responses[0].status_code == 404
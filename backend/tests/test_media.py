@@ -0,0 +1,35 @@
+import anyio
+from app.media import media_pipeline
+from app.response_cache import response_cache
+
+
+def test_fail_stale_marks_only_old_pending_posts(postgrest, monkeypatch):
+    postgrest.route("PATCH", "/posts", [{"id": "p1"}, {"id": "p2"}])
+    invalidated = []
+
+    async def invalidate(*tags):
+        invalidated.extend(tags)
+
+    monkeypatch.setattr(response_cache, "invalidate", invalidate)
+
+    marked = anyio.run(media_pipeline.fail_stale)
+
+    assert marked == 2
+    [request] = postgrest.calls("PATCH", "/posts")
+    assert request.url.params["media_status"] == "eq.pending"
+    assert request.url.params["created_at"].startswith("lt.")
+    assert request.read() == b'{"media_status": "failed"}'
+    assert invalidated == ["feed", "post:p1", "post:p2"]
+
+
+def test_fail_stale_without_orphans_touches_nothing(postgrest, monkeypatch):
+    postgrest.route("PATCH", "/posts", [])
+    invalidated = []
+
+    async def invalidate(*tags):
+        invalidated.extend(tags)
+
+    monkeypatch.setattr(response_cache, "invalidate", invalidate)
+
+    assert anyio.run(media_pipeline.fail_stale) == 0
+    assert invalidated == []
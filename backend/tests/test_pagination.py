@@ -0,0 +1,32 @@
+from app.database import db
+from app.pagination import apply_keyset, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("2024-01-01T00:00:00+00:00", "abc")
+    assert decode_cursor(cursor, 2) == ["2024-01-01T00:00:00+00:00", "abc"]
+
+
+def test_keyset_bounds_the_leading_column():
+    query = apply_keyset(db.table("posts").select("*"), ("created_at", "id"), ["2024-01-01T00:00:00+00:00", "abc"])
+
+    assert query.params["order"] == "created_at.desc,id.desc"
+    assert query.params["or"] == (
+        '(created_at.lt."2024-01-01T00:00:00+00:00",'
+        'and(created_at.eq."2024-01-01T00:00:00+00:00",id.lt."abc"))'
+    )
+    # Sin esta cota Postgres no puede empezar el recorrido del índice en el cursor
+    assert query.params["created_at"] == "lte.2024-01-01T00:00:00+00:00"
+
+
+def test_ascending_keyset_bounds_from_below():
+    query = apply_keyset(db.table("messages").select("*"), ("created_at", "id"), ["2024-01-01", "abc"], desc=False)
+
+    assert query.params["created_at"] == "gte.2024-01-01"
+
+
+def test_first_page_has_no_filters():
+    query = apply_keyset(db.table("posts").select("*"), ("created_at", "id"))
+
+    assert "or" not in query.params
+    assert "created_at" not in query.params
@@ -0,0 +1,45 @@
+import anyio
+import httpx
+from app.main import app
+from app.profile_service import identifier_cache, profile_cache, resolve_email
+
+CREATED_AT = "2024-01-01T00:00:00+00:00"
+
+
+def test_username_change_forgets_old_username_even_if_reverse_entry_was_evicted(postgrest):
+    profile = {"email": "ana@example.com", "username": "ana", "avatar_url": None,
+               "onboarding_completed": True, "created_at": CREATED_AT, "updated_at": CREATED_AT}
+
+    def lookup(request: httpx.Request):
+        # find_profile busca con or=(username.eq."x",email.eq."x"); el update lee por email=eq.x
+        if "or" in request.url.params:
+            matches = f'username.eq."{profile["username"]}"' in request.url.params["or"]
+            matches = matches or f'email.eq."{profile["email"]}"' in request.url.params["or"]
+        else:
+            matches = request.url.params["email"] == f"eq.{profile['email']}"
+        return [profile] if matches else []
+
+    def update(request: httpx.Request):
+        profile["username"] = "ana_nueva"
+        return [profile]
+
+    postgrest.route("GET", "/user_profiles", lookup)
+    postgrest.route("PATCH", "/user_profiles", update)
+    profile_cache.clear()
+    identifier_cache.clear()
+
+    async def scenario():
+        assert await resolve_email("ana") == "ana@example.com"
+        # El LRU descarta la entrada email → username pero conserva ana → email
+        identifier_cache.invalidate(("username", "ana@example.com"))
+
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.put("/api/profiles/ana@example.com", json={"username": "ana_nueva"})
+        assert response.status_code == 200
+
+        return await resolve_email("ana"), await resolve_email("ana_nueva")
+
+    old, new = anyio.run(scenario)
+
+    assert old is None
+    assert new == "ana@example.com"
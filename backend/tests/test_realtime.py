@@ -0,0 +1,58 @@
+import anyio
+import httpx
+from app.realtime import hub
+from app.routes import messages
+
+
+class ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def test_stream_registers_queue_only_while_streaming(postgrest):
+    postgrest.route("GET", "/user_unread_counts", [{"unread_count": 3}])
+    messages.unread_cache.clear()
+
+    async def scenario():
+        response = await messages.stream_events(ConnectedRequest(), user_email="ana@example.com")
+        # Sin consumir el stream no queda ninguna cola registrada
+        assert not hub.is_listening("ana@example.com")
+
+        stream = response.body_iterator
+        first = await stream.__anext__()
+        assert hub.is_listening("ana@example.com")
+        await stream.aclose()
+        return first
+
+    first = anyio.run(scenario)
+
+    assert first.startswith("event: unread_count\n")
+    assert '"unread_count": 3' in first
+    assert not hub.is_listening("ana@example.com")
+
+
+def test_stream_survives_failed_initial_count(postgrest):
+    postgrest.route("GET", "/user_unread_counts", lambda request: httpx.Response(500, json={"message": "caída"}))
+    messages.unread_cache.clear()
+
+    async def scenario():
+        response = await messages.stream_events(ConnectedRequest(), user_email="ana@example.com")
+        stream = response.body_iterator
+        received = []
+        with anyio.fail_after(5):
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(receive_first, stream, received)
+                # El conteo inicial se omite: el primer evento es el publicado
+                while not hub.is_listening("ana@example.com"):
+                    await anyio.sleep(0.01)
+                await hub.deliver("ana@example.com", {"type": "read", "reader_email": "bob@example.com"})
+        await stream.aclose()
+        return received[0]
+
+    async def receive_first(stream, received):
+        received.append(await stream.__anext__())
+
+    first = anyio.run(scenario)
+
+    assert first.startswith("event: read\n")
+    assert not hub.is_listening("ana@example.com")
@@ -0,0 +1,169 @@
+import io
+import os
+import resource
+import tempfile
+import tracemalloc
+import anyio
+import httpx
+import pytest
+from fastapi import HTTPException, UploadFile
+from postgrest.utils import SyncClient
+from app import uploads
+from app.config import settings
+from app.database import db
+from app.main import app
+
+GB = 1024 * 1024 * 1024
+MB = 1024 * 1024
+# Margen de memoria para una subida en curso: unos pocos bloques, no el archivo
+MEMORY_BUDGET = 16 * MB
+
+
+class SyntheticFile(io.RawIOBase):
+    """Archivo de `size` bytes generado al leerlo: nunca existe entero en memoria ni en disco"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.position = 0
+        self.largest_read = 0
+
+    def readable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self.position = offset
+        return offset
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            raise AssertionError("se intentó leer el archivo entero")
+        n = min(n, self.size - self.position)
+        self.largest_read = max(self.largest_read, n)
+        self.position += n
+        return b"\0" * n
+
+
+class StreamingStorage(httpx.BaseTransport):
+    """Storage que consume el cuerpo de cada subida por bloques sin guardarlo"""
+
+    def __init__(self):
+        self.received = 0
+        self.largest_chunk = 0
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        for chunk in request.stream:
+            self.received += len(chunk)
+            self.largest_chunk = max(self.largest_chunk, len(chunk))
+        return httpx.Response(200, json={"Key": request.url.path})
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    transport = StreamingStorage()
+    bucket_api = db.storage
+    session = bucket_api._client
+    monkeypatch.setattr(bucket_api, "_client", SyncClient(
+        base_url=session.base_url,
+        headers=session.headers,
+        transport=transport,
+    ))
+    return transport
+
+
+def spooled_files() -> set:
+    return {name for name in os.listdir(tempfile.gettempdir()) if name.startswith("upload-")}
+
+
+def test_stream_upload_keeps_memory_bounded(storage):
+    source = SyntheticFile(256 * MB)
+    before = spooled_files()
+
+    async def upload():
+        return await uploads.stream_upload(UploadFile(source, filename="video.mp4"), "u/video.mp4", "video/mp4", 300 * MB)
+
+    tracemalloc.start()
+    try:
+        uploaded = anyio.run(upload)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert storage.received > 256 * MB
+    assert source.largest_read == uploads.CHUNK_SIZE
+    assert storage.largest_chunk <= uploads.CHUNK_SIZE
+    assert peak < MEMORY_BUDGET
+    assert uploaded.local_path is None
+    assert spooled_files() == before
+
+
+def test_stream_upload_stops_reading_past_the_limit(storage):
+    source = SyntheticFile(4 * GB)
+    before = spooled_files()
+
+    async def upload():
+        await uploads.stream_upload(UploadFile(source, filename="video.mp4"), "u/video.mp4", "video/mp4", 8 * MB)
+
+    with pytest.raises(HTTPException) as error:
+        anyio.run(upload)
+
+    assert error.value.status_code == 413
+    # Se corta en el primer bloque que supera el límite, sin leer el resto de los 4 GB
+    assert source.position <= 8 * MB + uploads.CHUNK_SIZE
+    assert storage.received == 0
+    assert spooled_files() == before
+
+
+def multipart_video(total: int, counter: dict):
+    """Cuerpo multipart con un video de `total` bytes, generado por bloques de 1 MB"""
+    async def body():
+        yield (
+            b"--bench\r\n"
+            b'Content-Disposition: form-data; name="video"; filename="video.mp4"\r\n'
+            b"Content-Type: video/mp4\r\n\r\n"
+        )
+        while counter["sent"] < total:
+            counter["sent"] += MB
+            yield b"\0" * MB
+
+    return body()
+
+
+def post_video(headers: dict, counter: dict, total: int) -> httpx.Response:
+    async def run():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            return await client.post(
+                "/api/posts/",
+                content=multipart_video(total, counter),
+                headers={
+                    "Origin": "http://localhost:3000",
+                    "Content-Type": "multipart/form-data; boundary=bench",
+                    **headers,
+                },
+            )
+
+    return anyio.run(run)
+
+
+def test_oversized_content_length_is_rejected_before_reading():
+    counter = {"sent": 0}
+
+    response = post_video({"Content-Length": str(4 * GB)}, counter, 4 * GB)
+
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == "http://localhost:3000"
+    assert counter["sent"] == 0
+
+
+def test_oversized_chunked_body_is_cut_while_streaming():
+    counter = {"sent": 0}
+    limit = settings.max_video_bytes + MB
+
+    # tracemalloc haría muy lento el parser multipart: se mide el pico de RSS del proceso (KB en Linux)
+    peak_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    response = post_video({}, counter, 4 * GB)
+    peak_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 - peak_before
+
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == "http://localhost:3000"
+    assert counter["sent"] <= limit + 2 * MB
+    assert peak_growth < MEMORY_BUDGET
@@ -5,14 +5,17 @@
 import { useState, useEffect } from 'react'
 import { useRouter } from 'next/navigation'
 import { supabase } from '@/lib/supabase'
-import { getPosts, Post, getProfile } from '@/lib/api'
+import { getPosts, Post, getProfile, FeedSort } from '@/lib/api'
 import PostCard from '@/components/PostCard'
 
 export default function Home() {
   const [posts, setPosts] = useState<Post[]>([])
   const [page, setPage] = useState(0)
+  // Cursor con el que se pidió cada página visitada (la primera no lleva)
+  const [cursors, setCursors] = useState<(string | undefined)[]>([undefined])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [sort, setSort] = useState<FeedSort>('new')
   const [loading, setLoading] = useState(true)
-  const [hasMore, setHasMore] = useState(true)
   const [checkingAuth, setCheckingAuth] = useState(true)
   const [currentUserEmail, setCurrentUserEmail] = useState<string | null>(null)
   const router = useRouter()
@@ -50,14 +53,15 @@ export default function Home() {
     if (!checkingAuth) {
       loadPosts(0)
     }
-  }, [checkingAuth])
+  }, [checkingAuth, sort])
 
-  const loadPosts = async (pageNum: number) => {
+  const loadPosts = async (pageNum: number, cursor?: string) => {
     setLoading(true)
     try {
-      const newPosts = await getPosts(pageNum)
-      setPosts(newPosts)
-      setHasMore(newPosts.length === 5)
+      const result = await getPosts(sort, cursor)
+      setPosts(result.posts)
+      setNextCursor(result.nextCursor)
+      setCursors((current) => [...current.slice(0, pageNum), cursor])
       setPage(pageNum)
     } catch (error) {
       console.error('Error cargando posts:', error)
@@ -68,13 +72,13 @@ export default function Home() {
 
   const handlePrevious = () => {
     if (page > 0) {
-      loadPosts(page - 1)
+      loadPosts(page - 1, cursors[page - 1])
     }
   }
 
   const handleNext = () => {
-    if (hasMore) {
-      loadPosts(page + 1)
+    if (nextCursor) {
+      loadPosts(page + 1, nextCursor)
     }
   }
 
@@ -88,7 +92,19 @@ export default function Home() {
 
   return (
     <div>
-      <h1 className="text-3xl font-bold text-white mb-6">Publicaciones</h1>
+      <div className="flex items-center justify-between mb-6">
+        <h1 className="text-3xl font-bold text-white">Publicaciones</h1>
+        <select
+          value={sort}
+          onChange={(e) => setSort(e.target.value as FeedSort)}
+          className="bg-gray-800 text-white px-3 py-2 rounded"
+        >
+          <option value="new">Nuevos</option>
+          <option value="hot">Populares</option>
+          <option value="top">Más votados</option>
+          <option value="controversial">Polémicos</option>
+        </select>
+      </div>
       
       {posts.length === 0 ? (
         <p className="text-gray-400 text-center py-8">No hay publicaciones</p>
@@ -109,7 +125,7 @@ export default function Home() {
             <span className="text-gray-400">Página {page + 1}</span>
             <button
               onClick={handleNext}
-              disabled={!hasMore || loading}
+              disabled={!nextCursor || loading}
               className="bg-gray-800 hover:bg-gray-700 text-white px-4 py-2 rounded disabled:opacity-50 disabled:cursor-not-allowed"
             >
               Siguiente →
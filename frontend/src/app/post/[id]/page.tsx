@@ -6,8 +6,8 @@ import { useState, useEffect } from 'react'
 import { useParams, useRouter } from 'next/navigation'
 import Image from 'next/image'
 import { supabase } from '@/lib/supabase'
-import { getPost, getComments, createComment, getLikeCount, createLike, LikeCount, Comment } from '@/lib/api'
-import CommentCard from '@/components/CommentCard'
+import { getPost, getCommentThreads, createComment, getLikeCount, createLike, LikeCount, CommentThread as CommentThreadData } from '@/lib/api'
+import CommentThread from '@/components/CommentThread'
 import ImageModal from '@/components/ImageModal'
 
 export default function PostPage() {
@@ -16,7 +16,9 @@ export default function PostPage() {
   const router = useRouter()
   
   const [post, setPost] = useState<any>(null)
-  const [comments, setComments] = useState<Comment[]>([])
+  const [comments, setComments] = useState<CommentThreadData[]>([])
+  const [commentsCursor, setCommentsCursor] = useState<string | null>(null)
+  const [loadingComments, setLoadingComments] = useState(false)
   const [likeCount, setLikeCount] = useState<LikeCount>({ likes: 0, dislikes: 0 })
   const [commentContent, setCommentContent] = useState('')
   const [userEmail, setUserEmail] = useState<string | null>(null)
@@ -39,11 +41,12 @@ export default function PostPage() {
     try {
       const [postData, commentsData, likesData] = await Promise.all([
         getPost(postId),
-        getComments(postId),
+        getCommentThreads(postId),
         getLikeCount(postId)
       ])
       setPost(postData)
-      setComments(commentsData)
+      setComments(commentsData.comments)
+      setCommentsCursor(commentsData.nextCursor)
       setLikeCount(likesData)
     } catch (error) {
       console.error('Error cargando datos:', error)
@@ -52,6 +55,20 @@ export default function PostPage() {
     }
   }
 
+  const loadMoreComments = async () => {
+    if (!commentsCursor) return
+    setLoadingComments(true)
+    try {
+      const page = await getCommentThreads(postId, commentsCursor)
+      setComments((current) => [...current, ...page.comments])
+      setCommentsCursor(page.nextCursor)
+    } catch (error) {
+      console.error('Error cargando comentarios:', error)
+    } finally {
+      setLoadingComments(false)
+    }
+  }
+
   const handleSubmitComment = async (e: React.FormEvent) => {
     e.preventDefault()
     if (!commentContent.trim() || !userEmail) {
@@ -81,8 +98,7 @@ export default function PostPage() {
     }
 
     try {
-      await createLike(postId, userEmail, isLike)
-      const likesData = await getLikeCount(postId)
+      const likesData = await createLike(postId, userEmail, isLike)
       setLikeCount(likesData)
     } catch (error) {
       console.error('Error actualizando like:', error)
@@ -125,7 +141,7 @@ export default function PostPage() {
           <>
             <div className="mb-4 cursor-pointer" onClick={() => setIsImageModalOpen(true)}>
               <Image
-                src={post.image_url}
+                src={post.media_variants?.feed ?? post.image_url}
                 alt="Post image"
                 width={600}
                 height={400}
@@ -133,7 +149,7 @@ export default function PostPage() {
               />
             </div>
             <ImageModal
-              imageUrl={post.image_url}
+              imageUrl={post.media_variants?.full ?? post.image_url}
               isOpen={isImageModalOpen}
               onClose={() => setIsImageModalOpen(false)}
             />
@@ -144,6 +160,8 @@ export default function PostPage() {
           <div className="mb-4">
             <video
               src={post.video_url}
+              poster={post.media_variants?.poster ?? undefined}
+              preload="metadata"
               controls
               className="rounded-lg max-w-full h-auto"
               style={{ maxHeight: '600px' }}
@@ -197,9 +215,21 @@ export default function PostPage() {
         <p className="text-gray-400 text-center py-8">No hay comentarios</p>
       ) : (
         comments.map((comment) => (
-          <CommentCard key={comment.id} comment={comment} />
+          <CommentThread key={comment.id} postId={postId} comment={comment} userEmail={userEmail} />
         ))
       )}
+
+      {commentsCursor && (
+        <div className="flex justify-center mt-6">
+          <button
+            onClick={loadMoreComments}
+            disabled={loadingComments}
+            className="bg-gray-800 hover:bg-gray-700 text-white px-4 py-2 rounded disabled:opacity-50 disabled:cursor-not-allowed"
+          >
+            {loadingComments ? 'Cargando...' : 'Cargar más comentarios'}
+          </button>
+        </div>
+      )}
     </div>
   )
 }
@@ -13,6 +13,8 @@ export default function ProfilePage() {
   const [userEmail, setUserEmail] = useState<string | null>(null)
   const [userProfile, setUserProfile] = useState<UserProfile | null>(null)
   const [posts, setPosts] = useState<Post[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [loading, setLoading] = useState(true)
   const [editingProfile, setEditingProfile] = useState(false)
   const [editUsername, setEditUsername] = useState('')
@@ -74,8 +76,9 @@ export default function ProfilePage() {
     if (!userEmail) return
     setLoading(true)
     try {
-      const userPosts = await getUserPosts(userEmail)
-      setPosts(userPosts)
+      const page = await getUserPosts(userEmail)
+      setPosts(page.posts)
+      setNextCursor(page.nextCursor)
     } catch (error) {
       console.error('Error cargando posts:', error)
     } finally {
@@ -83,11 +86,25 @@ export default function ProfilePage() {
     }
   }
 
+  const loadMorePosts = async () => {
+    if (!userEmail || !nextCursor) return
+    setLoadingMore(true)
+    try {
+      const page = await getUserPosts(userEmail, nextCursor)
+      setPosts((current) => [...current, ...page.posts])
+      setNextCursor(page.nextCursor)
+    } catch (error) {
+      console.error('Error cargando posts:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleDelete = async (postId: string) => {
     if (!userEmail) return
     try {
       await deletePost(postId, userEmail)
-      await loadPosts()
+      setPosts((current) => current.filter((post) => post.id !== postId))
     } catch (error) {
       console.error('Error eliminando post:', error)
       alert('Error al eliminar la publicación')
@@ -351,6 +368,18 @@ export default function ProfilePage() {
           />
         ))
       )}
+
+      {nextCursor && (
+        <div className="flex justify-center mt-6">
+          <button
+            onClick={loadMorePosts}
+            disabled={loadingMore}
+            className="bg-gray-800 hover:bg-gray-700 text-white px-4 py-2 rounded disabled:opacity-50 disabled:cursor-not-allowed"
+          >
+            {loadingMore ? 'Cargando...' : 'Cargar más'}
+          </button>
+        </div>
+      )}
       </div>
 
       {userStats && (
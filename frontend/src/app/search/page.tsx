@@ -0,0 +1,105 @@
+'use client'
+
+import { useState } from 'react'
+import Link from 'next/link'
+import { searchContent, SearchResult, SearchType } from '@/lib/api'
+
+export default function SearchPage() {
+  const [query, setQuery] = useState('')
+  const [type, setType] = useState<SearchType>('all')
+  const [results, setResults] = useState<SearchResult[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [searched, setSearched] = useState(false)
+  const [loading, setLoading] = useState(false)
+
+  const handleSearch = async (e: React.FormEvent) => {
+    e.preventDefault()
+    if (!query.trim()) return
+    setLoading(true)
+    try {
+      const page = await searchContent(query.trim(), type)
+      setResults(page.results)
+      setNextCursor(page.nextCursor)
+      setSearched(true)
+    } catch (error) {
+      console.error('Error buscando:', error)
+    } finally {
+      setLoading(false)
+    }
+  }
+
+  const loadMore = async () => {
+    if (!nextCursor) return
+    setLoading(true)
+    try {
+      const page = await searchContent(query.trim(), type, nextCursor)
+      setResults((current) => [...current, ...page.results])
+      setNextCursor(page.nextCursor)
+    } catch (error) {
+      console.error('Error buscando:', error)
+    } finally {
+      setLoading(false)
+    }
+  }
+
+  return (
+    <div className="max-w-4xl">
+      <h1 className="text-3xl font-bold text-white mb-6">Buscar</h1>
+
+      <form onSubmit={handleSearch} className="flex gap-2 mb-6">
+        <input
+          value={query}
+          onChange={(e) => setQuery(e.target.value)}
+          placeholder="Buscar en publicaciones y comentarios..."
+          maxLength={200}
+          className="flex-1 bg-gray-800 text-white border border-gray-700 rounded px-4 py-2 focus:outline-none focus:ring-2 focus:ring-blue-500"
+        />
+        <select
+          value={type}
+          onChange={(e) => setType(e.target.value as SearchType)}
+          className="bg-gray-800 text-white border border-gray-700 rounded px-3 py-2 focus:outline-none focus:ring-2 focus:ring-blue-500"
+        >
+          <option value="all">Todo</option>
+          <option value="posts">Publicaciones</option>
+          <option value="comments">Comentarios</option>
+        </select>
+        <button
+          type="submit"
+          disabled={loading || !query.trim()}
+          className="bg-blue-600 hover:bg-blue-700 text-white px-6 py-2 rounded transition disabled:opacity-50"
+        >
+          Buscar
+        </button>
+      </form>
+
+      {searched && results.length === 0 ? (
+        <p className="text-gray-400 text-center py-8">No hay resultados</p>
+      ) : (
+        results.map((result) => (
+          <Link
+            key={`${result.type}-${result.id}`}
+            href={`/post/${result.post_id}`}
+            className="block bg-gray-800 border border-gray-700 rounded-lg p-4 mb-3 hover:border-gray-600 transition"
+          >
+            <p className="text-gray-400 text-sm mb-2">
+              {result.type === 'post' ? 'Publicación' : 'Comentario'} de {result.username || result.user_email}
+            </p>
+            <p className="text-white whitespace-pre-wrap line-clamp-3">{result.content}</p>
+          </Link>
+        ))
+      )}
+
+      {nextCursor && (
+        <div className="flex justify-center mt-6">
+          <button
+            onClick={loadMore}
+            disabled={loading}
+            className="bg-gray-800 hover:bg-gray-700 text-white px-4 py-2 rounded disabled:opacity-50 disabled:cursor-not-allowed"
+          >
+            {loading ? 'Cargando...' : 'Cargar más'}
+          </button>
+        </div>
+      )}
+    </div>
+  )
+}
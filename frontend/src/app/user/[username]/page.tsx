@@ -12,6 +12,8 @@ export default function UserPage() {
   const params = useParams()
   const username = decodeURIComponent(params.username as string)
   const [posts, setPosts] = useState<Post[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [loading, setLoading] = useState(true)
   const [currentUserEmail, setCurrentUserEmail] = useState<string | null>(null)
   const [userProfile, setUserProfile] = useState<UserProfile | null>(null)
@@ -58,8 +60,9 @@ export default function UserPage() {
     if (!userProfile) return
     setLoading(true)
     try {
-      const userPosts = await getUserPosts(username)
-      setPosts(userPosts)
+      const page = await getUserPosts(username)
+      setPosts(page.posts)
+      setNextCursor(page.nextCursor)
     } catch (error) {
       console.error('Error cargando posts:', error)
     } finally {
@@ -67,6 +70,20 @@ export default function UserPage() {
     }
   }
 
+  const loadMorePosts = async () => {
+    if (!userProfile || !nextCursor) return
+    setLoadingMore(true)
+    try {
+      const page = await getUserPosts(username, nextCursor)
+      setPosts((current) => [...current, ...page.posts])
+      setNextCursor(page.nextCursor)
+    } catch (error) {
+      console.error('Error cargando posts:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   if (loading) {
     return <div className="text-white text-center">Cargando...</div>
   }
@@ -108,6 +125,18 @@ export default function UserPage() {
             <PostCard key={post.id} post={post} currentUserEmail={currentUserEmail || undefined} />
           ))
         )}
+
+        {nextCursor && (
+          <div className="flex justify-center mt-6">
+            <button
+              onClick={loadMorePosts}
+              disabled={loadingMore}
+              className="bg-gray-800 hover:bg-gray-700 text-white px-4 py-2 rounded disabled:opacity-50 disabled:cursor-not-allowed"
+            >
+              {loadingMore ? 'Cargando...' : 'Cargar más'}
+            </button>
+          </div>
+        )}
       </div>
 
       {userStats && (
@@ -3,14 +3,18 @@
 import { useState, useEffect, useRef } from 'react'
 import Image from 'next/image'
 import { supabase } from '@/lib/supabase'
-import { getUsers, User, getConversations, Conversation, getConversation, sendMessage, Message, getUnreadCount, markMessageAsRead, getProfile } from '@/lib/api'
+import UserDirectory from '@/components/UserDirectory'
+import { User, getConversations, Conversation, getConversation, sendMessage, Message, getUnreadCount, markMessageAsRead, markConversationAsRead, getProfile, openMessageStream } from '@/lib/api'
 
 export default function ChatWidget() {
   const [isOpen, setIsOpen] = useState(false)
-  const [users, setUsers] = useState<User[]>([])
   const [conversations, setConversations] = useState<Conversation[]>([])
+  const [conversationsCursor, setConversationsCursor] = useState<string | null>(null)
+  const [loadingConversations, setLoadingConversations] = useState(false)
   const [selectedUser, setSelectedUser] = useState<User | null>(null)
   const [messages, setMessages] = useState<Message[]>([])
+  const [olderCursor, setOlderCursor] = useState<string | null>(null)
+  const [loadingOlder, setLoadingOlder] = useState(false)
   const [messageContent, setMessageContent] = useState('')
   const [currentUserEmail, setCurrentUserEmail] = useState<string | null>(null)
   const [unreadCount, setUnreadCount] = useState(0)
@@ -21,9 +25,13 @@ export default function ChatWidget() {
   const messagesEndRef = useRef<HTMLDivElement>(null)
   const chatContainerRef = useRef<HTMLDivElement>(null)
   const userDropdownRef = useRef<HTMLDivElement>(null)
-  // Refs para mantener valores actualizados en los callbacks de Realtime
+  // Refs para mantener valores actualizados en los callbacks del canal de eventos
   const selectedUserRef = useRef<User | null>(null)
   const currentUserEmailRef = useRef<string | null>(null)
+  // True cuando ya se cargó la primera página de conversaciones (los refrescos no tocan el cursor)
+  const conversationsLoadedRef = useRef(false)
+  // Al anteponer mensajes anteriores se conserva la posición del scroll en vez de bajar al final
+  const keepScrollRef = useRef<number | null>(null)
 
   useEffect(() => {
     console.log('[ChatWidget] Componente montado, verificando usuario...')
@@ -41,7 +49,6 @@ export default function ChatWidget() {
 
   useEffect(() => {
     if (currentUserEmail) {
-      loadUsers()
       loadConversations()
       loadUnreadCount()
     }
@@ -54,6 +61,12 @@ export default function ChatWidget() {
   }, [selectedUser, currentUserEmail])
 
   useEffect(() => {
+    const container = chatContainerRef.current
+    if (keepScrollRef.current !== null && container) {
+      container.scrollTop = container.scrollHeight - keepScrollRef.current
+      keepScrollRef.current = null
+      return
+    }
     scrollToBottom()
   }, [messages])
 
@@ -94,27 +107,38 @@ export default function ChatWidget() {
     }
   }
 
-  const loadUsers = async () => {
+  const loadConversations = async () => {
     if (!currentUserEmail) return
     try {
-      const usersList = await getUsers()
-      // Filtrar el usuario actual
-      const filteredUsers = (usersList || []).filter(user => user.email !== currentUserEmail)
-      setUsers(filteredUsers)
+      const page = await getConversations(currentUserEmail)
+      // Refrescar la primera página sin perder las anteriores ya cargadas
+      setConversations((current) => {
+        const fresh = new Set(page.items.map((conv) => conv.email))
+        return [...page.items, ...current.filter((conv) => !fresh.has(conv.email))]
+      })
+      if (!conversationsLoadedRef.current) {
+        conversationsLoadedRef.current = true
+        setConversationsCursor(page.nextCursor)
+      }
     } catch (error) {
-      console.error('Error cargando usuarios:', error)
-      // En caso de error, establecer lista vacía
-      setUsers([])
+      console.error('Error cargando conversaciones:', error)
     }
   }
 
-  const loadConversations = async () => {
-    if (!currentUserEmail) return
+  const loadMoreConversations = async () => {
+    if (!currentUserEmail || !conversationsCursor) return
+    setLoadingConversations(true)
     try {
-      const convs = await getConversations(currentUserEmail)
-      setConversations(convs)
+      const page = await getConversations(currentUserEmail, conversationsCursor)
+      setConversations((current) => {
+        const loaded = new Set(current.map((conv) => conv.email))
+        return [...current, ...page.items.filter((conv) => !loaded.has(conv.email))]
+      })
+      setConversationsCursor(page.nextCursor)
     } catch (error) {
       console.error('Error cargando conversaciones:', error)
+    } finally {
+      setLoadingConversations(false)
     }
   }
 
@@ -122,20 +146,21 @@ export default function ChatWidget() {
     if (!selectedUser || !currentUserEmail) return
     setLoading(true)
     try {
-      const msgs = await getConversation(currentUserEmail, selectedUser.email)
+      const page = await getConversation(currentUserEmail, selectedUser.email)
+      const msgs = page.items
       setMessages(msgs)
+      setOlderCursor(page.nextCursor)
       
-      // Marcar mensajes no leídos como leídos
+      // Marcar como leídos, en una sola petición, los mensajes recibidos hasta el último cargado
       const unreadMessages = msgs.filter(msg => !msg.read && msg.receiver_email === currentUserEmail)
-      for (const msg of unreadMessages) {
+      if (unreadMessages.length > 0) {
         try {
-          await markMessageAsRead(msg.id, currentUserEmail)
+          const lastUnread = unreadMessages[unreadMessages.length - 1]
+          setUnreadCount(await markConversationAsRead(currentUserEmail, selectedUser.email, lastUnread.created_at))
         } catch (error) {
-          console.error('Error marcando mensaje como leído:', error)
+          console.error('Error marcando mensajes como leídos:', error)
         }
       }
-      
-      loadUnreadCount()
     } catch (error) {
       console.error('Error cargando mensajes:', error)
     } finally {
@@ -143,6 +168,25 @@ export default function ChatWidget() {
     }
   }
 
+  const loadOlderMessages = async () => {
+    if (!selectedUser || !currentUserEmail || !olderCursor) return
+    setLoadingOlder(true)
+    try {
+      const page = await getConversation(currentUserEmail, selectedUser.email, { cursor: olderCursor })
+      const container = chatContainerRef.current
+      keepScrollRef.current = container ? container.scrollHeight - container.scrollTop : null
+      setMessages((current) => {
+        const loaded = new Set(current.map((msg) => msg.id))
+        return [...page.items.filter((msg) => !loaded.has(msg.id)), ...current]
+      })
+      setOlderCursor(page.nextCursor)
+    } catch (error) {
+      console.error('Error cargando mensajes anteriores:', error)
+    } finally {
+      setLoadingOlder(false)
+    }
+  }
+
   const loadUnreadCount = async () => {
     if (!currentUserEmail) return
     try {
@@ -170,7 +214,10 @@ export default function ChatWidget() {
 
   // Función para agregar un nuevo mensaje al estado
   const addMessageToState = async (messageData: any) => {
-    const enrichedMessage = await enrichMessageWithProfile(messageData)
+    addEnrichedMessageToState(await enrichMessageWithProfile(messageData))
+  }
+
+  const addEnrichedMessageToState = (enrichedMessage: Message) => {
     setMessages((prevMessages) => {
       // Evitar duplicados
       if (prevMessages.some(msg => msg.id === enrichedMessage.id)) {
@@ -184,37 +231,29 @@ export default function ChatWidget() {
     })
   }
 
-  // Suscripción de Realtime con cleanup correcto
+  // Canal de eventos en tiempo real del backend, con cleanup correcto
   useEffect(() => {
     if (!currentUserEmailRef.current) return
 
     const userEmail = currentUserEmailRef.current
-    console.log('[ChatWidget] Configurando suscripción Realtime para:', userEmail)
-
-    // Crear un canal único para este usuario
-    const channelName = `messages-${userEmail.replace(/[^a-zA-Z0-9]/g, '_')}`
-    const channel = supabase
-      .channel(channelName)
-      .on(
-        'postgres_changes',
-        {
-          event: 'INSERT',
-          schema: 'public',
-          table: 'messages',
-          filter: `receiver_email=eq.${userEmail}`,
-        },
-        async (payload) => {
-          console.log('[ChatWidget] Mensaje recibido vía Realtime:', payload.new)
-          const newMessage = payload.new
-          
-          // Actualizar conteo de no leídos
-          loadUnreadCount()
-          
+    console.log('[ChatWidget] Abriendo canal de eventos para:', userEmail)
+
+    const source = openMessageStream(userEmail, async (event) => {
+      if (event.type === 'unread_count') {
+        setUnreadCount(event.unread_count)
+      } else if (event.type === 'read') {
+        // El destinatario leyó mensajes que enviamos
+        setMessages((prevMessages) => prevMessages.map(msg =>
+          event.message_ids.includes(msg.id) ? { ...msg, read: true } : msg
+        ))
+      } else if (event.type === 'message') {
+        const newMessage = event.message
+        const currentSelectedUser = selectedUserRef.current
+        if (newMessage.receiver_email === userEmail) {
           // Verificar si estamos viendo la conversación con el remitente
-          const currentSelectedUser = selectedUserRef.current
           if (currentSelectedUser && newMessage.sender_email === currentSelectedUser.email) {
-            // Si estamos viendo esta conversación, agregar el mensaje directamente
-            await addMessageToState(newMessage)
+            // El mensaje llega ya enriquecido con el perfil del remitente
+            addEnrichedMessageToState(newMessage)
             
             // Marcar como leído
             try {
@@ -226,47 +265,21 @@ export default function ChatWidget() {
             // Si no, solo actualizar conversaciones
             loadConversations()
           }
+        } else if (currentSelectedUser && newMessage.receiver_email === currentSelectedUser.email) {
+          // Mensaje enviado por nosotros (quizás desde otra pestaña)
+          addEnrichedMessageToState(newMessage)
         }
-      )
-      .on(
-        'postgres_changes',
-        {
-          event: 'INSERT',
-          schema: 'public',
-          table: 'messages',
-          filter: `sender_email=eq.${userEmail}`,
-        },
-        async (payload) => {
-          console.log('[ChatWidget] Mensaje enviado vía Realtime:', payload.new)
-          const newMessage = payload.new
-          
-          // Verificar si estamos viendo la conversación con el destinatario
-          const currentSelectedUser = selectedUserRef.current
-          if (currentSelectedUser && newMessage.receiver_email === currentSelectedUser.email) {
-            // Si estamos viendo esta conversación, agregar el mensaje directamente
-            await addMessageToState(newMessage)
-          }
-        }
-      )
-      .subscribe((status, err) => {
-        console.log('[ChatWidget] Estado de suscripción:', status)
-        if (status === 'SUBSCRIBED') {
-          console.log('[ChatWidget] Suscripción Realtime activa correctamente')
-        } else if (status === 'CHANNEL_ERROR') {
-          console.error('[ChatWidget] Error en el canal de Realtime:', err)
-        } else if (status === 'TIMED_OUT') {
-          console.error('[ChatWidget] Timeout en la suscripción Realtime')
-        } else if (status === 'CLOSED') {
-          console.warn('[ChatWidget] Canal de Realtime cerrado')
-        }
-      })
+      }
+    })
+
+    source.onerror = () => {
+      console.warn('[ChatWidget] Canal de eventos interrumpido, reconectando...')
+    }
 
-    // Cleanup: remover el canal cuando el componente se desmonte o cambien las dependencias
+    // Cleanup: cerrar el canal cuando el componente se desmonte o cambien las dependencias
     return () => {
-      console.log('[ChatWidget] Limpiando suscripción Realtime')
-      if (channel) {
-        supabase.removeChannel(channel)
-      }
+      console.log('[ChatWidget] Cerrando canal de eventos')
+      source.close()
     }
   }, [currentUserEmail]) // Solo recrear cuando cambie currentUserEmail
 
@@ -278,7 +291,7 @@ export default function ChatWidget() {
     try {
       const newMessage = await sendMessage(currentUserEmail, selectedUser.email, messageContent.trim())
       setMessageContent('')
-      // El mensaje se agregará automáticamente vía Realtime, pero lo agregamos también aquí
+      // El mensaje se agregará automáticamente por el canal de eventos, pero lo agregamos también aquí
       // para evitar retrasos en la UI
       await addMessageToState(newMessage)
     } catch (error: any) {
@@ -401,38 +414,7 @@ export default function ChatWidget() {
 
             {isUserDropdownOpen && (
               <div className="absolute z-50 left-4 right-4 mt-1 bg-gray-800 border border-gray-700 rounded shadow-lg max-h-64 overflow-y-auto">
-                {users.length === 0 ? (
-                  <div className="px-4 py-3 text-gray-400 text-sm">No hay usuarios</div>
-                ) : (
-                  users.map((user) => {
-                    const displayName = user.username || user.email
-                    return (
-                      <button
-                        key={user.email}
-                        onClick={() => handleUserSelect(user)}
-                        className="w-full px-4 py-3 flex items-center gap-3 hover:bg-gray-700 transition text-left"
-                      >
-                        {user.avatar_url ? (
-                          <div className="relative w-8 h-8 rounded-full overflow-hidden flex-shrink-0">
-                            <Image
-                              src={user.avatar_url}
-                              alt={displayName || 'Usuario'}
-                              fill
-                              className="object-cover"
-                            />
-                          </div>
-                        ) : (
-                          <div className="w-8 h-8 rounded-full bg-gray-600 flex items-center justify-center flex-shrink-0">
-                            <span className="text-gray-300 text-sm font-semibold">
-                              {(displayName || 'U')[0].toUpperCase()}
-                            </span>
-                          </div>
-                        )}
-                        <span className="text-white font-medium flex-1">{displayName}</span>
-                      </button>
-                    )
-                  })
-                )}
+                <UserDirectory onSelect={handleUserSelect} excludeEmail={currentUserEmail} />
               </div>
             )}
           </div>
@@ -450,7 +432,17 @@ export default function ChatWidget() {
                   No hay mensajes. ¡Envía el primero!
                 </div>
               ) : (
-                messages.map((message) => {
+                <>
+                {olderCursor && (
+                  <button
+                    onClick={loadOlderMessages}
+                    disabled={loadingOlder}
+                    className="w-full text-blue-400 hover:text-blue-300 text-sm py-1 disabled:opacity-50"
+                  >
+                    {loadingOlder ? 'Cargando...' : 'Cargar anteriores'}
+                  </button>
+                )}
+                {messages.map((message) => {
                   const isOwn = message.sender_email === currentUserEmail
                   // Siempre mostrar el avatar y nombre del remitente (quien envió el mensaje)
                   const displayName = message.sender_username || message.sender_email
@@ -493,12 +485,61 @@ export default function ChatWidget() {
                       </div>
                     </div>
                   )
-                })
+                })}
+                </>
               )
-            ) : (
+            ) : conversations.length === 0 ? (
               <div className="text-gray-400 text-center py-8">
                 Selecciona un usuario para comenzar a chatear
               </div>
+            ) : (
+              <>
+                {conversations.map((conv) => {
+                  const displayName = conv.username || conv.email
+                  return (
+                    <button
+                      key={conv.email}
+                      onClick={() => handleUserSelect({ email: conv.email, username: conv.username, avatar_url: conv.avatar_url })}
+                      className="w-full flex items-center gap-3 rounded px-2 py-2 hover:bg-gray-700 transition text-left"
+                    >
+                      {conv.avatar_url ? (
+                        <div className="relative w-8 h-8 rounded-full overflow-hidden flex-shrink-0">
+                          <Image
+                            src={conv.avatar_url}
+                            alt={displayName || 'Usuario'}
+                            fill
+                            className="object-cover"
+                          />
+                        </div>
+                      ) : (
+                        <div className="w-8 h-8 rounded-full bg-gray-600 flex items-center justify-center flex-shrink-0">
+                          <span className="text-gray-300 text-xs font-semibold">
+                            {(displayName || 'U')[0].toUpperCase()}
+                          </span>
+                        </div>
+                      )}
+                      <div className="flex-1 min-w-0">
+                        <p className="text-white text-sm font-medium truncate">{displayName}</p>
+                        {conv.last_message && (
+                          <p className="text-gray-400 text-xs truncate">{conv.last_message}</p>
+                        )}
+                      </div>
+                      {!!conv.unread_count && (
+                        <span className="bg-blue-600 text-white text-xs rounded-full px-2 py-0.5">{conv.unread_count}</span>
+                      )}
+                    </button>
+                  )
+                })}
+                {conversationsCursor && (
+                  <button
+                    onClick={loadMoreConversations}
+                    disabled={loadingConversations}
+                    className="w-full text-blue-400 hover:text-blue-300 text-sm py-2 disabled:opacity-50"
+                  >
+                    {loadingConversations ? 'Cargando...' : 'Cargar más conversaciones'}
+                  </button>
+                )}
+              </>
             )}
             <div ref={messagesEndRef} />
           </div>
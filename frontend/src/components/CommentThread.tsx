@@ -0,0 +1,111 @@
+'use client'
+
+import { useState } from 'react'
+import { Comment, CommentThread as CommentThreadData, createComment, getCommentReplies } from '@/lib/api'
+import CommentCard from '@/components/CommentCard'
+
+interface CommentThreadProps {
+  postId: string
+  comment: Comment | CommentThreadData
+  userEmail: string | null
+}
+
+export default function CommentThread({ postId, comment, userEmail }: CommentThreadProps) {
+  const preloaded = 'replies' in comment ? comment : null
+  const [replies, setReplies] = useState<Comment[]>(preloaded?.replies || [])
+  const [repliesCursor, setRepliesCursor] = useState<string | null>(preloaded?.replies_cursor || null)
+  const [replyCount, setReplyCount] = useState(comment.reply_count || 0)
+  const [loadingReplies, setLoadingReplies] = useState(false)
+  const [replying, setReplying] = useState(false)
+  const [replyContent, setReplyContent] = useState('')
+  const [submitting, setSubmitting] = useState(false)
+
+  const loadMoreReplies = async () => {
+    setLoadingReplies(true)
+    try {
+      // Sin cursor se empieza desde la primera respuesta
+      const page = await getCommentReplies(postId, comment.id, repliesCursor || undefined)
+      setReplies((current) => {
+        const loaded = new Set(current.map((reply) => reply.id))
+        return [...current, ...page.comments.filter((reply) => !loaded.has(reply.id))]
+      })
+      setRepliesCursor(page.nextCursor)
+    } catch (error) {
+      console.error('Error cargando respuestas:', error)
+    } finally {
+      setLoadingReplies(false)
+    }
+  }
+
+  const handleSubmitReply = async (e: React.FormEvent) => {
+    e.preventDefault()
+    if (!replyContent.trim() || !userEmail) return
+
+    setSubmitting(true)
+    try {
+      const reply = await createComment(postId, userEmail, replyContent, comment.id)
+      // Solo se agrega al final si ya están cargadas todas las anteriores
+      if (replies.length >= replyCount) {
+        setReplies((current) => [...current, reply])
+      }
+      setReplyCount((count) => count + 1)
+      setReplyContent('')
+      setReplying(false)
+    } catch (error) {
+      console.error('Error creando respuesta:', error)
+      alert('Error al crear la respuesta')
+    } finally {
+      setSubmitting(false)
+    }
+  }
+
+  return (
+    <div>
+      <CommentCard comment={comment} />
+
+      <div className="ml-4 -mt-2 mb-3 flex gap-4 text-sm">
+        {userEmail && (
+          <button onClick={() => setReplying(!replying)} className="text-gray-400 hover:text-white">
+            Responder
+          </button>
+        )}
+      </div>
+
+      {replying && (
+        <form onSubmit={handleSubmitReply} className="ml-6 mb-3">
+          <textarea
+            value={replyContent}
+            onChange={(e) => setReplyContent(e.target.value)}
+            placeholder="Escribe tu respuesta..."
+            className="w-full bg-gray-900 text-white border border-gray-700 rounded px-4 py-2 mb-2 focus:outline-none focus:ring-2 focus:ring-blue-500 resize-none"
+            rows={2}
+          />
+          <button
+            type="submit"
+            disabled={submitting || !replyContent.trim()}
+            className="bg-blue-600 hover:bg-blue-700 text-white px-4 py-1 rounded transition disabled:opacity-50"
+          >
+            {submitting ? 'Publicando...' : 'Responder'}
+          </button>
+        </form>
+      )}
+
+      {(replies.length > 0 || replyCount > 0) && (
+        <div className="ml-6 pl-4 border-l border-gray-700">
+          {replies.map((reply) => (
+            <CommentThread key={reply.id} postId={postId} comment={reply} userEmail={userEmail} />
+          ))}
+          {replies.length < replyCount && (
+            <button
+              onClick={loadMoreReplies}
+              disabled={loadingReplies}
+              className="text-blue-400 hover:text-blue-300 text-sm mb-3 disabled:opacity-50"
+            >
+              {loadingReplies ? 'Cargando...' : `Ver más respuestas (${replyCount - replies.length})`}
+            </button>
+          )}
+        </div>
+      )}
+    </div>
+  )
+}
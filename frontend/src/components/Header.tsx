@@ -4,12 +4,12 @@ import { useState, useEffect } from 'react'
 import Link from 'next/link'
 import Image from 'next/image'
 import { useRouter, usePathname } from 'next/navigation'
-import { getUsers, User, getProfile, UserProfile } from '@/lib/api'
+import { User, getProfile, UserProfile } from '@/lib/api'
 import { supabase } from '@/lib/supabase'
+import UserDirectory from '@/components/UserDirectory'
 
 export default function Header() {
-  const [users, setUsers] = useState<User[]>([])
-  const [selectedUser, setSelectedUser] = useState('')
+  const [selectedUser, setSelectedUser] = useState<User | null>(null)
   const [userEmail, setUserEmail] = useState<string | null>(null)
   const [userProfile, setUserProfile] = useState<UserProfile | null>(null)
   const [isDropdownOpen, setIsDropdownOpen] = useState(false)
@@ -18,9 +18,6 @@ export default function Header() {
 
   useEffect(() => {
     checkUser()
-    if (pathname !== '/login' && pathname !== '/onboarding') {
-      loadUsers()
-    }
   }, [pathname])
 
   const checkUser = async () => {
@@ -40,24 +37,10 @@ export default function Header() {
     }
   }
 
-  const loadUsers = async () => {
-    try {
-      const usersList = await getUsers()
-      setUsers(usersList || [])
-    } catch (error) {
-      console.error('Error cargando usuarios:', error)
-      // En caso de error, establecer lista vacía para evitar problemas
-      setUsers([])
-    }
-  }
-
-  const handleUserSelect = (email: string) => {
-    setSelectedUser(email)
+  const handleUserSelect = (user: User) => {
+    setSelectedUser(user)
     setIsDropdownOpen(false)
-    // Obtener el username del usuario seleccionado
-    const selected = users.find(u => u.email === email)
-    const identifier = selected?.username || email
-    router.push(`/user/${encodeURIComponent(identifier)}`)
+    router.push(`/user/${encodeURIComponent(user.username || user.email)}`)
   }
 
   useEffect(() => {
@@ -102,12 +85,7 @@ export default function Header() {
             className="w-full bg-gray-800 text-white border border-gray-700 rounded px-4 py-2 focus:outline-none focus:ring-2 focus:ring-blue-500 flex items-center gap-3 hover:bg-gray-750"
           >
             <span className="flex-1 text-left">
-              {selectedUser
-                ? (() => {
-                    const selected = users.find(u => u.email === selectedUser)
-                    return selected?.username || selected?.email || 'Seleccionar usuario...'
-                  })()
-                : 'Seleccionar usuario...'}
+              {selectedUser ? selectedUser.username || selectedUser.email : 'Seleccionar usuario...'}
             </span>
             <span className={`transform transition-transform ${isDropdownOpen ? 'rotate-180' : ''}`}>
               ▼
@@ -116,38 +94,7 @@ export default function Header() {
 
           {isDropdownOpen && (
             <div className="absolute z-50 w-full mt-1 bg-gray-800 border border-gray-700 rounded shadow-lg max-h-96 overflow-y-auto">
-              {users.length === 0 ? (
-                <div className="px-4 py-3 text-gray-400 text-sm">No hay usuarios</div>
-              ) : (
-                users.map((user) => {
-                  const displayName = user.username || user.email
-                  return (
-                    <button
-                      key={user.email}
-                      onClick={() => handleUserSelect(user.email)}
-                      className="w-full px-4 py-3 flex items-center gap-3 hover:bg-gray-700 transition text-left"
-                    >
-                      {user.avatar_url ? (
-                        <div className="relative w-8 h-8 rounded-full overflow-hidden flex-shrink-0">
-                          <Image
-                            src={user.avatar_url}
-                            alt={displayName || 'Usuario'}
-                            fill
-                            className="object-cover"
-                          />
-                        </div>
-                      ) : (
-                        <div className="w-8 h-8 rounded-full bg-gray-600 flex items-center justify-center flex-shrink-0">
-                          <span className="text-gray-300 text-sm font-semibold">
-                            {(displayName || 'U')[0].toUpperCase()}
-                          </span>
-                        </div>
-                      )}
-                      <span className="text-white font-medium flex-1">{displayName}</span>
-                    </button>
-                  )
-                })
-              )}
+              <UserDirectory onSelect={handleUserSelect} />
             </div>
           )}
         </div>
@@ -177,6 +124,12 @@ export default function Header() {
               </span>
             </div>
           )}
+          <Link
+            href="/search"
+            className="bg-gray-800 hover:bg-gray-700 text-white px-4 py-2 rounded transition"
+          >
+            Buscar
+          </Link>
           {userEmail && (
             <Link
               href="/profile"
@@ -15,14 +15,19 @@ interface PostCardProps {
 }
 
 export default function PostCard({ post, currentUserEmail, showDelete = false, onDelete }: PostCardProps) {
-  const [likeCount, setLikeCount] = useState<LikeCount>({ likes: 0, dislikes: 0 })
+  const [likeCount, setLikeCount] = useState<LikeCount>({ likes: post.likes ?? 0, dislikes: post.dislikes ?? 0 })
   const [loading, setLoading] = useState(false)
   const [isImageModalOpen, setIsImageModalOpen] = useState(false)
   const router = useRouter()
 
   useEffect(() => {
-    loadLikeCount()
-  }, [post.id])
+    // El feed ya trae los conteos embebidos; solo pedirlos si faltan
+    if (post.likes == null || post.dislikes == null) {
+      loadLikeCount()
+    } else {
+      setLikeCount({ likes: post.likes, dislikes: post.dislikes })
+    }
+  }, [post.id, post.likes, post.dislikes])
 
   const loadLikeCount = async () => {
     try {
@@ -41,8 +46,8 @@ export default function PostCard({ post, currentUserEmail, showDelete = false, o
     
     setLoading(true)
     try {
-      await createLike(post.id, currentUserEmail, isLike)
-      await loadLikeCount()
+      const count = await createLike(post.id, currentUserEmail, isLike)
+      setLikeCount(count)
     } catch (error) {
       console.error('Error actualizando like:', error)
     } finally {
@@ -94,7 +99,7 @@ export default function PostCard({ post, currentUserEmail, showDelete = false, o
       {post.image_url && (
         <div className="mb-4 cursor-pointer" onClick={() => setIsImageModalOpen(true)}>
           <Image
-            src={post.image_url}
+            src={post.media_variants?.feed ?? post.image_url}
             alt="Post image"
             width={600}
             height={400}
@@ -105,7 +110,7 @@ export default function PostCard({ post, currentUserEmail, showDelete = false, o
 
       {post.image_url && (
         <ImageModal
-          imageUrl={post.image_url}
+          imageUrl={post.media_variants?.full ?? post.image_url}
           isOpen={isImageModalOpen}
           onClose={() => setIsImageModalOpen(false)}
         />
@@ -115,6 +120,8 @@ export default function PostCard({ post, currentUserEmail, showDelete = false, o
         <div className="mb-4">
           <video
             src={post.video_url}
+            poster={post.media_variants?.poster ?? undefined}
+            preload="metadata"
             controls
             className="rounded-lg max-w-full h-auto"
             style={{ maxHeight: '600px' }}
@@ -0,0 +1,121 @@
+'use client'
+
+import { useState, useEffect } from 'react'
+import Image from 'next/image'
+import { getUsers, User } from '@/lib/api'
+
+interface UserDirectoryProps {
+  onSelect: (user: User) => void
+  excludeEmail?: string | null
+}
+
+// Espera antes de buscar mientras se escribe
+const SEARCH_DELAY_MS = 300
+
+// Lista del directorio de usuarios con búsqueda por username y "cargar más"
+export default function UserDirectory({ onSelect, excludeEmail }: UserDirectoryProps) {
+  const [query, setQuery] = useState('')
+  const [users, setUsers] = useState<User[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loading, setLoading] = useState(false)
+
+  useEffect(() => {
+    let cancelled = false
+    const timer = setTimeout(async () => {
+      setLoading(true)
+      try {
+        const page = await getUsers(query.trim() || undefined)
+        if (cancelled) return
+        setUsers(page.items)
+        setNextCursor(page.nextCursor)
+      } catch (error) {
+        console.error('Error cargando usuarios:', error)
+        if (!cancelled) {
+          setUsers([])
+          setNextCursor(null)
+        }
+      } finally {
+        if (!cancelled) setLoading(false)
+      }
+    }, query ? SEARCH_DELAY_MS : 0)
+
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+    }
+  }, [query])
+
+  const loadMore = async () => {
+    if (!nextCursor) return
+    setLoading(true)
+    try {
+      const page = await getUsers(query.trim() || undefined, nextCursor)
+      setUsers((current) => [...current, ...page.items])
+      setNextCursor(page.nextCursor)
+    } catch (error) {
+      console.error('Error cargando usuarios:', error)
+    } finally {
+      setLoading(false)
+    }
+  }
+
+  const visibleUsers = excludeEmail ? users.filter((user) => user.email !== excludeEmail) : users
+
+  return (
+    <div>
+      <div className="p-2 border-b border-gray-700">
+        <input
+          value={query}
+          onChange={(e) => setQuery(e.target.value)}
+          placeholder="Buscar usuario..."
+          maxLength={100}
+          autoFocus
+          className="w-full bg-gray-900 text-white border border-gray-700 rounded px-3 py-2 text-sm focus:outline-none focus:ring-2 focus:ring-blue-500"
+        />
+      </div>
+
+      {visibleUsers.length === 0 ? (
+        <div className="px-4 py-3 text-gray-400 text-sm">{loading ? 'Cargando...' : 'No hay usuarios'}</div>
+      ) : (
+        visibleUsers.map((user) => {
+          const displayName = user.username || user.email
+          return (
+            <button
+              key={user.email}
+              onClick={() => onSelect(user)}
+              className="w-full px-4 py-3 flex items-center gap-3 hover:bg-gray-700 transition text-left"
+            >
+              {user.avatar_url ? (
+                <div className="relative w-8 h-8 rounded-full overflow-hidden flex-shrink-0">
+                  <Image
+                    src={user.avatar_url}
+                    alt={displayName || 'Usuario'}
+                    fill
+                    className="object-cover"
+                  />
+                </div>
+              ) : (
+                <div className="w-8 h-8 rounded-full bg-gray-600 flex items-center justify-center flex-shrink-0">
+                  <span className="text-gray-300 text-sm font-semibold">
+                    {(displayName || 'U')[0].toUpperCase()}
+                  </span>
+                </div>
+              )}
+              <span className="text-white font-medium flex-1">{displayName}</span>
+            </button>
+          )
+        })
+      )}
+
+      {nextCursor && (
+        <button
+          onClick={loadMore}
+          disabled={loading}
+          className="w-full text-blue-400 hover:text-blue-300 text-sm py-2 disabled:opacity-50"
+        >
+          {loading ? 'Cargando...' : 'Cargar más'}
+        </button>
+      )}
+    </div>
+  )
+}
@@ -6,6 +6,13 @@ const getApiUrl = () => {
 
 const API_URL = getApiUrl()
 
+export interface MediaVariants {
+  thumbnail?: string | null
+  feed?: string | null
+  full?: string | null
+  poster?: string | null
+}
+
 export interface Post {
   id: string
   user_email: string
@@ -15,6 +22,14 @@ export interface Post {
   created_at: string
   username?: string | null
   avatar_url?: string | null
+  // Variantes generadas en segundo plano (media_status: pending, ready o failed)
+  media_status?: string | null
+  media_variants?: MediaVariants | null
+  // Presentes cuando se piden con include_counts=true
+  likes?: number | null
+  dislikes?: number | null
+  comment_count?: number | null
+  user_vote?: boolean | null
 }
 
 export interface Comment {
@@ -23,10 +38,25 @@ export interface Comment {
   user_email: string
   content: string
   created_at: string
+  parent_id?: string | null
+  depth?: number
+  reply_count?: number
   username?: string | null
   avatar_url?: string | null
 }
 
+// Comentario con sus primeras respuestas; si reply_count es mayor que
+// replies.length, replies_cursor continúa desde la última cargada
+export interface CommentThread extends Comment {
+  replies: Comment[]
+  replies_cursor?: string | null
+}
+
+export interface CommentThreadPage {
+  comments: CommentThread[]
+  nextCursor: string | null
+}
+
 export interface LikeCount {
   likes: number
   dislikes: number
@@ -47,11 +77,7 @@ export interface UserProfile {
   updated_at: string
 }
 
-export async function getPosts(page: number = 0): Promise<Post[]> {
-  const response = await fetch(`${API_URL}/api/posts/?page=${page}&limit=5`)
-  if (!response.ok) throw new Error('Error obteniendo posts')
-  return response.json()
-}
+export type FeedSort = 'new' | 'hot' | 'top' | 'controversial'
 
 export async function getPost(postId: string): Promise<Post> {
   const response = await fetch(`${API_URL}/api/posts/${postId}`)
@@ -59,10 +85,27 @@ export async function getPost(postId: string): Promise<Post> {
   return response.json()
 }
 
-export async function getUserPosts(identifier: string): Promise<Post[]> {
-  const response = await fetch(`${API_URL}/api/posts/user/${encodeURIComponent(identifier)}`)
+export interface PostPage {
+  posts: Post[]
+  nextCursor: string | null
+}
+
+// Una página del feed; `cursor` es el `nextCursor` de la página anterior (null cuando no hay más)
+export async function getPosts(sort: FeedSort = 'new', cursor?: string, limit: number = 5): Promise<PostPage> {
+  const params = new URLSearchParams({ limit: String(limit), sort, include_counts: 'true' })
+  if (cursor) params.set('cursor', cursor)
+  const response = await fetch(`${API_URL}/api/posts/?${params}`)
+  if (!response.ok) throw new Error('Error obteniendo posts')
+  return { posts: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') }
+}
+
+// Una página de posts del usuario; `nextCursor` es null cuando no hay más
+export async function getUserPosts(identifier: string, cursor?: string, limit: number = 20): Promise<PostPage> {
+  const params = new URLSearchParams({ include_counts: 'true', limit: String(limit) })
+  if (cursor) params.set('cursor', cursor)
+  const response = await fetch(`${API_URL}/api/posts/user/${encodeURIComponent(identifier)}?${params}`)
   if (!response.ok) throw new Error('Error obteniendo posts del usuario')
-  return response.json()
+  return { posts: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') }
 }
 
 export async function createPost(
@@ -114,10 +157,29 @@ export async function getComments(postId: string): Promise<Comment[]> {
   return response.json()
 }
 
+async function fetchCommentThreads(url: string, cursor?: string): Promise<CommentThreadPage> {
+  const params = new URLSearchParams()
+  if (cursor) params.set('cursor', cursor)
+  const response = await fetch(`${url}?${params}`)
+  if (!response.ok) throw new Error('Error obteniendo comentarios')
+  return { comments: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') }
+}
+
+// Comentarios raíz de un post, cada uno con sus primeras respuestas
+export function getCommentThreads(postId: string, cursor?: string): Promise<CommentThreadPage> {
+  return fetchCommentThreads(`${API_URL}/api/comments/post/${postId}/threads`, cursor)
+}
+
+// Respuestas a un comentario (sin cursor, desde la primera)
+export function getCommentReplies(postId: string, commentId: string, cursor?: string): Promise<CommentThreadPage> {
+  return fetchCommentThreads(`${API_URL}/api/comments/post/${postId}/replies/${commentId}`, cursor)
+}
+
 export async function createComment(
   postId: string,
   userEmail: string,
-  content: string
+  content: string,
+  parentId?: string
 ): Promise<Comment> {
   const response = await fetch(`${API_URL}/api/comments/`, {
     method: 'POST',
@@ -128,6 +190,7 @@ export async function createComment(
       post_id: postId,
       user_email: userEmail,
       content,
+      parent_id: parentId,
     }),
   })
   if (!response.ok) throw new Error('Error creando comentario')
@@ -144,7 +207,7 @@ export async function createLike(
   postId: string,
   userEmail: string,
   isLike: boolean
-): Promise<void> {
+): Promise<LikeCount> {
   const response = await fetch(`${API_URL}/api/likes/`, {
     method: 'POST',
     headers: {
@@ -157,19 +220,59 @@ export async function createLike(
     }),
   })
   if (!response.ok) throw new Error('Error actualizando like')
+  // La respuesta ya trae los totales actualizados del post
+  const data = await response.json()
+  return { likes: data.likes, dislikes: data.dislikes }
 }
 
-export async function getUsers(): Promise<User[]> {
-  const response = await fetch(`${API_URL}/api/auth/users`)
+export interface UserPage {
+  items: User[]
+  nextCursor: string | null
+}
+
+// Directorio de usuarios en orden alfabético: `query` busca por username y
+// `nextCursor` trae la página siguiente
+export async function getUsers(query?: string, cursor?: string, limit: number = 50): Promise<UserPage> {
+  const params = new URLSearchParams({ limit: String(limit) })
+  if (query) params.set('q', query)
+  if (cursor) params.set('cursor', cursor)
+  const response = await fetch(`${API_URL}/api/auth/users?${params}`)
   if (!response.ok) {
-    // Si es 404 o el servidor no responde, devolver array vacío en lugar de error
+    // Si es 404 o el servidor no responde, devolver lista vacía en lugar de error
     if (response.status === 404) {
       console.warn('Endpoint de usuarios no encontrado, devolviendo lista vacía')
-      return []
+      return { items: [], nextCursor: null }
     }
     throw new Error(`Error obteniendo usuarios: ${response.status} ${response.statusText}`)
   }
-  return response.json()
+  return { items: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') }
+}
+
+export interface SearchResult {
+  type: 'post' | 'comment'
+  id: string
+  post_id: string
+  user_email: string
+  content: string
+  created_at: string
+  rank: number
+  username?: string | null
+  avatar_url?: string | null
+}
+
+export type SearchType = 'all' | 'posts' | 'comments'
+
+// Búsqueda de texto en posts y comentarios, de los más relevantes a los menos
+export async function searchContent(
+  query: string,
+  type: SearchType = 'all',
+  cursor?: string
+): Promise<{ results: SearchResult[]; nextCursor: string | null }> {
+  const params = new URLSearchParams({ q: query, type })
+  if (cursor) params.set('cursor', cursor)
+  const response = await fetch(`${API_URL}/api/search?${params}`)
+  if (!response.ok) throw new Error('Error buscando')
+  return { results: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') }
 }
 
 export async function getProfile(identifier: string): Promise<UserProfile> {
@@ -236,18 +339,59 @@ export interface Conversation {
   username?: string | null
   avatar_url?: string | null
   last_message_at: string
+  last_message?: string | null
+  last_sender_email?: string | null
+  unread_count?: number
+}
+
+export interface ConversationPage {
+  items: Conversation[]
+  nextCursor: string | null
 }
 
-export async function getConversations(userEmail: string): Promise<Conversation[]> {
-  const response = await fetch(`${API_URL}/api/messages/conversations?user_email=${encodeURIComponent(userEmail)}`)
+// Conversaciones de la más reciente a la más antigua; `nextCursor` trae la página siguiente
+export async function getConversations(userEmail: string, cursor?: string): Promise<ConversationPage> {
+  const params = new URLSearchParams({ user_email: userEmail })
+  if (cursor) params.set('cursor', cursor)
+  const response = await fetch(`${API_URL}/api/messages/conversations?${params}`)
   if (!response.ok) throw new Error('Error obteniendo conversaciones')
-  return response.json()
+  return { items: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') }
+}
+
+// Eventos del canal en tiempo real de mensajes (Server-Sent Events)
+export type MessageStreamEvent =
+  | { type: 'message'; message: Message }
+  | { type: 'read'; reader_email: string; message_ids: string[] }
+  | { type: 'unread_count'; unread_count: number }
+
+export function openMessageStream(userEmail: string, onEvent: (event: MessageStreamEvent) => void): EventSource {
+  // EventSource se reconecta solo si se corta la conexión
+  const source = new EventSource(`${API_URL}/api/messages/stream?user_email=${encodeURIComponent(userEmail)}`)
+  for (const type of ['message', 'read', 'unread_count']) {
+    source.addEventListener(type, (event) => onEvent(JSON.parse((event as MessageEvent).data)))
+  }
+  return source
+}
+
+export interface MessagePage {
+  items: Message[]
+  nextCursor: string | null
 }
 
-export async function getConversation(userEmail: string, otherEmail: string): Promise<Message[]> {
-  const response = await fetch(`${API_URL}/api/messages/conversation/${encodeURIComponent(otherEmail)}?user_email=${encodeURIComponent(userEmail)}`)
+// Sin opciones retorna los mensajes más recientes y `nextCursor` trae los anteriores.
+// Con `since` trae los mensajes desde esa fecha y `nextCursor` (junto con el mismo `since`) los siguientes
+export async function getConversation(
+  userEmail: string,
+  otherEmail: string,
+  options: { limit?: number; cursor?: string; since?: string } = {}
+): Promise<MessagePage> {
+  const params = new URLSearchParams({ user_email: userEmail })
+  if (options.limit) params.set('limit', String(options.limit))
+  if (options.cursor) params.set('cursor', options.cursor)
+  if (options.since) params.set('since', options.since)
+  const response = await fetch(`${API_URL}/api/messages/conversation/${encodeURIComponent(otherEmail)}?${params}`)
   if (!response.ok) throw new Error('Error obteniendo conversación')
-  return response.json()
+  return { items: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') }
 }
 
 export async function sendMessage(senderEmail: string, receiverEmail: string, content: string): Promise<Message> {
@@ -282,6 +426,18 @@ export async function markMessageAsRead(messageId: string, userEmail: string): P
   if (!response.ok) throw new Error('Error marcando mensaje como leído')
 }
 
+// Marca como leídos los mensajes recibidos de otro usuario y retorna el nuevo total de no leídos
+export async function markConversationAsRead(userEmail: string, otherEmail: string, until?: string): Promise<number> {
+  const params = new URLSearchParams({ user_email: userEmail })
+  if (until) params.set('until', until)
+  const response = await fetch(`${API_URL}/api/messages/conversation/${encodeURIComponent(otherEmail)}/read?${params}`, {
+    method: 'PUT',
+  })
+  if (!response.ok) throw new Error('Error marcando conversación como leída')
+  const data = await response.json()
+  return data.unread_count
+}
+
 export async function getUnreadCount(userEmail: string): Promise<number> {
   const response = await fetch(`${API_URL}/api/messages/unread-count?user_email=${encodeURIComponent(userEmail)}`)
   if (!response.ok) throw new Error('Error obteniendo conteo de no leídos')
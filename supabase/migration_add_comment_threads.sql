@@ -0,0 +1,130 @@
+-- Migración: Comentarios anidados (respuestas) con carga paginada por hilo
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+-- parent_id apunta al comentario al que se responde (NULL = comentario raíz).
+-- path es la ruta materializada de ids desde la raíz ("raiz/hijo/nieto") y
+-- depth su profundidad; reply_count cuenta las respuestas directas
+ALTER TABLE comments ADD COLUMN IF NOT EXISTS parent_id UUID REFERENCES comments(id) ON DELETE CASCADE;
+ALTER TABLE comments ADD COLUMN IF NOT EXISTS path TEXT;
+ALTER TABLE comments ADD COLUMN IF NOT EXISTS depth INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE comments ADD COLUMN IF NOT EXISTS reply_count INTEGER NOT NULL DEFAULT 0;
+
+-- Los comentarios existentes quedan como raíces
+UPDATE comments SET path = id::text WHERE path IS NULL;
+
+-- Raíces de un post y respuestas de un comentario, ya ordenadas por (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_comments_roots ON comments(post_id, created_at, id) WHERE parent_id IS NULL;
+CREATE INDEX IF NOT EXISTS idx_comments_parent ON comments(parent_id, created_at, id) WHERE parent_id IS NOT NULL;
+
+-- Calcula path y depth al insertar, y verifica que el padre sea del mismo post
+CREATE OR REPLACE FUNCTION set_comment_path()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    parent comments%ROWTYPE;
+BEGIN
+    IF NEW.parent_id IS NULL THEN
+        NEW.path := NEW.id::text;
+        NEW.depth := 0;
+    ELSE
+        SELECT * INTO parent FROM comments WHERE id = NEW.parent_id;
+        IF NOT FOUND OR parent.post_id <> NEW.post_id THEN
+            RAISE EXCEPTION 'El comentario padre no existe en este post'
+                USING ERRCODE = 'foreign_key_violation';
+        END IF;
+        NEW.path := parent.path || '/' || NEW.id::text;
+        NEW.depth := parent.depth + 1;
+    END IF;
+    NEW.reply_count := 0;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_comments_path ON comments;
+CREATE TRIGGER trg_comments_path
+    BEFORE INSERT ON comments
+    FOR EACH ROW EXECUTE FUNCTION set_comment_path();
+
+-- Mantiene reply_count del comentario padre
+CREATE OR REPLACE FUNCTION update_comment_reply_count()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        IF NEW.parent_id IS NOT NULL THEN
+            UPDATE comments SET reply_count = reply_count + 1 WHERE id = NEW.parent_id;
+        END IF;
+    ELSIF OLD.parent_id IS NOT NULL THEN
+        -- Si el padre se borró en la misma cascada el UPDATE no encuentra la fila
+        UPDATE comments SET reply_count = reply_count - 1 WHERE id = OLD.parent_id;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_comments_reply_count ON comments;
+CREATE TRIGGER trg_comments_reply_count
+    AFTER INSERT OR DELETE ON comments
+    FOR EACH ROW EXECUTE FUNCTION update_comment_reply_count();
+
+-- Una página de hilos en una sola consulta: hasta p_limit comentarios (las
+-- raíces del post, o las respuestas de p_parent_id) posteriores al cursor
+-- (p_after_at, p_after_id), cada uno con sus primeras p_replies respuestas.
+-- Ambas partes se resuelven con idx_comments_roots / idx_comments_parent,
+-- sin importar el tamaño total del hilo
+CREATE OR REPLACE FUNCTION get_comment_threads(
+    p_post_id UUID,
+    p_parent_id UUID DEFAULT NULL,
+    p_limit INTEGER DEFAULT 20,
+    p_replies INTEGER DEFAULT 3,
+    p_after_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_after_id UUID DEFAULT NULL
+)
+RETURNS SETOF comments
+LANGUAGE sql
+STABLE
+AS $$
+    WITH page AS (
+        (
+            SELECT c.*
+            FROM comments c
+            WHERE p_parent_id IS NULL
+              AND c.post_id = p_post_id
+              AND c.parent_id IS NULL
+              AND (c.created_at, c.id) > (COALESCE(p_after_at, '-infinity'), COALESCE(p_after_id, '00000000-0000-0000-0000-000000000000'))
+            ORDER BY c.created_at, c.id
+            LIMIT p_limit
+        )
+        UNION ALL
+        (
+            SELECT c.*
+            FROM comments c
+            WHERE c.parent_id = p_parent_id
+              AND c.post_id = p_post_id
+              AND (c.created_at, c.id) > (COALESCE(p_after_at, '-infinity'), COALESCE(p_after_id, '00000000-0000-0000-0000-000000000000'))
+            ORDER BY c.created_at, c.id
+            LIMIT p_limit
+        )
+    )
+    SELECT t.*
+    FROM (
+        SELECT * FROM page
+        UNION ALL
+        SELECT r.*
+        FROM page
+        CROSS JOIN LATERAL (
+            SELECT c.*
+            FROM comments c
+            WHERE c.parent_id = page.id
+            ORDER BY c.created_at, c.id
+            LIMIT p_replies
+        ) r
+    ) t
+    ORDER BY t.created_at, t.id;
+$$;
@@ -0,0 +1,14 @@
+-- Migración: Clave canónica de conversación en messages
+-- Requiere migration_add_messages.sql
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+-- Los dos participantes ordenados (A→B y B→A dan la misma pareja), para leer
+-- una conversación completa con un solo índice y ya ordenada por fecha.
+-- COLLATE "C" compara por bytes, igual que el backend al ordenar los emails.
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS participant_a TEXT
+    GENERATED ALWAYS AS (LEAST(sender_email COLLATE "C", receiver_email COLLATE "C")) STORED;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS participant_b TEXT
+    GENERATED ALWAYS AS (GREATEST(sender_email COLLATE "C", receiver_email COLLATE "C")) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_messages_participants
+    ON messages(participant_a, participant_b, created_at DESC, id DESC);
@@ -0,0 +1,56 @@
+-- Migración: Lista de conversaciones en una sola consulta
+-- Requiere migration_add_messages.sql
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+-- Índices para leer los mensajes de un usuario ya ordenados por fecha
+-- (como remitente y como destinatario) y contar sus no leídos por remitente
+CREATE INDEX IF NOT EXISTS idx_messages_sender_created_at ON messages(sender_email, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_messages_receiver_created_at ON messages(receiver_email, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_messages_unread ON messages(receiver_email, sender_email) WHERE read = FALSE;
+
+-- Último mensaje con cada interlocutor (DISTINCT ON) junto con los no leídos
+-- de esa conversación, paginado por keyset sobre (last_message_at, email)
+CREATE OR REPLACE FUNCTION get_conversations(
+    p_user_email TEXT,
+    p_limit INTEGER DEFAULT 20,
+    p_before_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_before_email TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    email TEXT,
+    last_message_id UUID,
+    last_message TEXT,
+    last_sender_email TEXT,
+    last_message_at TIMESTAMP WITH TIME ZONE,
+    unread_count BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH user_messages AS (
+        SELECT m.receiver_email AS partner, m.id, m.content, m.sender_email, m.created_at
+        FROM messages m
+        WHERE m.sender_email = p_user_email
+        UNION ALL
+        SELECT m.sender_email AS partner, m.id, m.content, m.sender_email, m.created_at
+        FROM messages m
+        WHERE m.receiver_email = p_user_email
+    ),
+    latest AS (
+        SELECT DISTINCT ON (partner) partner, id, content, sender_email, created_at
+        FROM user_messages
+        ORDER BY partner, created_at DESC, id DESC
+    ),
+    unread AS (
+        SELECT m.sender_email AS partner, COUNT(*) AS unread_count
+        FROM messages m
+        WHERE m.receiver_email = p_user_email AND m.read = FALSE
+        GROUP BY m.sender_email
+    )
+    SELECT l.partner, l.id, LEFT(l.content, 140), l.sender_email, l.created_at, COALESCE(u.unread_count, 0)
+    FROM latest l
+    LEFT JOIN unread u ON u.partner = l.partner
+    WHERE p_before_at IS NULL OR (l.created_at, l.partner) < (p_before_at, p_before_email)
+    ORDER BY l.created_at DESC, l.partner DESC
+    LIMIT p_limit;
+$$;
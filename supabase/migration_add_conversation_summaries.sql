@@ -0,0 +1,146 @@
+-- Migración: Resumen por conversación para listar conversaciones sin recorrer el historial
+-- Requiere migration_add_conversation_key.sql y migration_add_unread_counters.sql
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+-- Una fila por usuario e interlocutor con el último mensaje entre ambos (cada
+-- pareja tiene dos filas, una para cada lado). get_conversations lee una
+-- página de este índice en lugar de ordenar todos los mensajes del usuario
+-- con DISTINCT ON, así que su coste depende del tamaño de la página y no del
+-- historial.
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    user_email TEXT NOT NULL,
+    partner_email TEXT NOT NULL,
+    last_message_id UUID NOT NULL,
+    last_message TEXT NOT NULL,
+    last_sender_email TEXT NOT NULL,
+    last_message_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (user_email, partner_email)
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversation_summaries_recent
+    ON conversation_summaries(user_email, last_message_at DESC, partner_email DESC);
+
+-- Solo el backend (service key) accede a los resúmenes
+ALTER TABLE conversation_summaries ENABLE ROW LEVEL SECURITY;
+
+-- Guarda `p_message` como último mensaje de `p_user_email` con `p_partner_email`
+-- si es más reciente que el actual. La condición del upsert se evalúa con la
+-- fila bloqueada, así que dos envíos concurrentes dejan siempre el más nuevo.
+CREATE OR REPLACE FUNCTION upsert_conversation_summary(p_user_email TEXT, p_partner_email TEXT, p_message messages)
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    INSERT INTO conversation_summaries
+        (user_email, partner_email, last_message_id, last_message, last_sender_email, last_message_at)
+    VALUES
+        (p_user_email, p_partner_email, p_message.id, LEFT(p_message.content, 140),
+         p_message.sender_email, p_message.created_at)
+    ON CONFLICT (user_email, partner_email) DO UPDATE SET
+        last_message_id = EXCLUDED.last_message_id,
+        last_message = EXCLUDED.last_message,
+        last_sender_email = EXCLUDED.last_sender_email,
+        last_message_at = EXCLUDED.last_message_at
+    WHERE (conversation_summaries.last_message_at, conversation_summaries.last_message_id)
+        < (EXCLUDED.last_message_at, EXCLUDED.last_message_id);
+$$;
+
+-- Trigger de mensajes: un envío actualiza los dos lados de la conversación.
+-- Al borrar el último mensaje se busca el anterior con idx_messages_participants
+-- (una lectura de índice), o se borran los resúmenes si no queda ninguno.
+CREATE OR REPLACE FUNCTION update_conversation_summaries()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    previous messages;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        IF NEW.created_at IS NULL THEN
+            RETURN NULL;
+        END IF;
+        PERFORM upsert_conversation_summary(NEW.sender_email, NEW.receiver_email, NEW);
+        -- Los mensajes a uno mismo tienen un solo lado
+        IF NEW.receiver_email <> NEW.sender_email THEN
+            PERFORM upsert_conversation_summary(NEW.receiver_email, NEW.sender_email, NEW);
+        END IF;
+        RETURN NULL;
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM conversation_summaries
+        WHERE user_email = OLD.sender_email AND partner_email = OLD.receiver_email
+          AND last_message_id = OLD.id
+    ) THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT * INTO previous
+    FROM messages m
+    WHERE m.participant_a = OLD.participant_a AND m.participant_b = OLD.participant_b
+    ORDER BY m.created_at DESC, m.id DESC
+    LIMIT 1;
+
+    DELETE FROM conversation_summaries
+    WHERE (user_email = OLD.sender_email AND partner_email = OLD.receiver_email)
+       OR (user_email = OLD.receiver_email AND partner_email = OLD.sender_email);
+
+    IF previous.id IS NOT NULL THEN
+        PERFORM upsert_conversation_summary(previous.sender_email, previous.receiver_email, previous);
+        IF previous.receiver_email <> previous.sender_email THEN
+            PERFORM upsert_conversation_summary(previous.receiver_email, previous.sender_email, previous);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_messages_conversation_summaries ON messages;
+CREATE TRIGGER trg_messages_conversation_summaries
+    AFTER INSERT OR DELETE ON messages
+    FOR EACH ROW EXECUTE FUNCTION update_conversation_summaries();
+
+-- Inicializar los resúmenes con los mensajes existentes (una sola vez)
+INSERT INTO conversation_summaries
+    (user_email, partner_email, last_message_id, last_message, last_sender_email, last_message_at)
+SELECT DISTINCT ON (side.user_email, side.partner_email)
+       side.user_email, side.partner_email, m.id, LEFT(m.content, 140), m.sender_email, m.created_at
+FROM messages m
+CROSS JOIN LATERAL (
+    VALUES (m.sender_email, m.receiver_email), (m.receiver_email, m.sender_email)
+) AS side(user_email, partner_email)
+WHERE m.created_at IS NOT NULL
+ORDER BY side.user_email, side.partner_email, m.created_at DESC, m.id DESC
+ON CONFLICT (user_email, partner_email) DO NOTHING;
+
+-- La lista de conversaciones lee una página del resumen (por keyset sobre
+-- (last_message_at, email)) y los no leídos de sus contadores
+CREATE OR REPLACE FUNCTION get_conversations(
+    p_user_email TEXT,
+    p_limit INTEGER DEFAULT 20,
+    p_before_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_before_email TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    email TEXT,
+    last_message_id UUID,
+    last_message TEXT,
+    last_sender_email TEXT,
+    last_message_at TIMESTAMP WITH TIME ZONE,
+    unread_count BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT c.partner_email, c.last_message_id, c.last_message, c.last_sender_email, c.last_message_at,
+           COALESCE(u.unread_count, 0)::BIGINT
+    FROM conversation_summaries c
+    LEFT JOIN message_unread_counts u ON u.receiver_email = p_user_email AND u.sender_email = c.partner_email
+    WHERE c.user_email = p_user_email
+      AND (p_before_at IS NULL OR (c.last_message_at, c.partner_email) < (p_before_at, p_before_email))
+    ORDER BY c.last_message_at DESC, c.partner_email DESC
+    LIMIT p_limit;
+$$;
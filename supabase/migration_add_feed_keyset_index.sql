@@ -0,0 +1,7 @@
+-- Migración: Índice para paginación por cursor (keyset) del feed
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+-- El feed se ordena por (created_at DESC, id DESC) y cada página filtra
+-- (created_at, id) < cursor, así que este índice permite leer solo las filas
+-- de la página sin recorrer las anteriores
+CREATE INDEX IF NOT EXISTS idx_posts_created_at_id ON posts(created_at DESC, id DESC);
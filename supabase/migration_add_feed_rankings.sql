@@ -0,0 +1,68 @@
+-- Migración: Puntuaciones precalculadas para los feeds hot, top y controversial
+-- Requiere migration_add_post_counters.sql
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+-- score = likes - dislikes; hot_score decae con la antigüedad del post
+-- (fórmula de Reddit); controversy_score premia muchos votos repartidos.
+-- Se guardan en columnas indexadas, así una página ordenada por ranking (sin
+-- ventana de tiempo) cuesta lo mismo que una del feed cronológico. Con ventana
+-- (`t` en top y controversial) no hay índice que sirva a la vez el filtro por
+-- created_at y el orden por puntuación: Postgres lee la ventana con el índice
+-- de created_at y la ordena, o recorre el índice de la puntuación descartando
+-- los posts fuera de ella. El coste crece con el número de posts de la ventana.
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS score INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS hot_score DOUBLE PRECISION NOT NULL DEFAULT 0;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS controversy_score DOUBLE PRECISION NOT NULL DEFAULT 0;
+
+-- hot: log10 del score con su signo + segundos desde 2005-12-08 / 45000.
+-- Cada 12.5 horas de antigüedad equivalen a un orden de magnitud de votos, así que
+-- el decaimiento va implícito en la fórmula y no hace falta recalcular periódicamente.
+CREATE OR REPLACE FUNCTION post_hot_score(p_likes INTEGER, p_dislikes INTEGER, p_created_at TIMESTAMP WITH TIME ZONE)
+RETURNS DOUBLE PRECISION
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT SIGN(p_likes - p_dislikes) * LOG(GREATEST(ABS(p_likes - p_dislikes), 1))
+        + (EXTRACT(EPOCH FROM p_created_at) - 1134028003) / 45000.0;
+$$;
+
+-- controversial: (likes + dislikes) ^ (minoría / mayoría); 0 si todos votan igual
+CREATE OR REPLACE FUNCTION post_controversy_score(p_likes INTEGER, p_dislikes INTEGER)
+RETURNS DOUBLE PRECISION
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE
+        WHEN p_likes <= 0 OR p_dislikes <= 0 THEN 0
+        ELSE POWER(p_likes + p_dislikes, LEAST(p_likes, p_dislikes)::DOUBLE PRECISION / GREATEST(p_likes, p_dislikes))
+    END;
+$$;
+
+-- Recalcula las puntuaciones cuando cambian los contadores (los mantiene el trigger de likes)
+CREATE OR REPLACE FUNCTION update_post_rankings()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.score := NEW.likes_count - NEW.dislikes_count;
+    NEW.hot_score := post_hot_score(NEW.likes_count, NEW.dislikes_count, NEW.created_at);
+    NEW.controversy_score := post_controversy_score(NEW.likes_count, NEW.dislikes_count);
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_posts_rankings ON posts;
+CREATE TRIGGER trg_posts_rankings
+    BEFORE INSERT OR UPDATE OF likes_count, dislikes_count, created_at ON posts
+    FOR EACH ROW EXECUTE FUNCTION update_post_rankings();
+
+-- Índices de cada orden, con id como desempate (igual que el cursor)
+CREATE INDEX IF NOT EXISTS idx_posts_hot_score_id ON posts(hot_score DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_posts_score_id ON posts(score DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_posts_controversy_score_id ON posts(controversy_score DESC, id DESC);
+
+-- Inicializar las puntuaciones de los posts existentes
+UPDATE posts
+SET score = likes_count - dislikes_count,
+    hot_score = post_hot_score(likes_count, dislikes_count, created_at),
+    controversy_score = post_controversy_score(likes_count, dislikes_count);
@@ -0,0 +1,9 @@
+-- Migración: Índice para encontrar posts con media pendiente de procesar
+-- Requiere migration_add_media_variants.sql
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+-- Cada worker busca periódicamente posts que siguen 'pending' después de
+-- MEDIA_STALE_MINUTES (su trabajo se perdió al reiniciarse) para marcarlos
+-- 'failed'. El índice parcial solo contiene esos pocos posts, así el barrido
+-- no recorre la tabla entera
+CREATE INDEX IF NOT EXISTS idx_posts_media_pending ON posts(created_at) WHERE media_status = 'pending';
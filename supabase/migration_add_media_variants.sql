@@ -0,0 +1,9 @@
+-- Migración: Variantes de media generadas en segundo plano
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+-- media_variants guarda las URLs de las variantes, por ejemplo:
+--   imagen: {"thumbnail": "...", "feed": "...", "full": "..."}
+--   video:  {"poster": "...", "thumbnail": "..."}
+-- media_status: 'pending' mientras se procesan, 'ready' o 'failed' al terminar
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS media_variants JSONB;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS media_status TEXT;
@@ -0,0 +1,85 @@
+-- Migración: Contadores de likes, dislikes y comentarios en la tabla posts
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+-- Los contadores se mantienen con triggers, así leer los totales de un post
+-- es una sola fila en lugar de descargar y contar todos sus votos
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS likes_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS dislikes_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS comments_count INTEGER NOT NULL DEFAULT 0;
+
+-- Trigger de likes: ajusta los contadores al insertar, cambiar o borrar un voto
+CREATE OR REPLACE FUNCTION update_post_like_counters()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.is_like = NEW.is_like AND OLD.post_id = NEW.post_id THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE posts
+        SET likes_count = likes_count - (CASE WHEN OLD.is_like THEN 1 ELSE 0 END),
+            dislikes_count = dislikes_count - (CASE WHEN OLD.is_like THEN 0 ELSE 1 END)
+        WHERE id = OLD.post_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE posts
+        SET likes_count = likes_count + (CASE WHEN NEW.is_like THEN 1 ELSE 0 END),
+            dislikes_count = dislikes_count + (CASE WHEN NEW.is_like THEN 0 ELSE 1 END)
+        WHERE id = NEW.post_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_likes_post_counters ON likes;
+CREATE TRIGGER trg_likes_post_counters
+    AFTER INSERT OR UPDATE OR DELETE ON likes
+    FOR EACH ROW EXECUTE FUNCTION update_post_like_counters();
+
+-- Trigger de comentarios
+CREATE OR REPLACE FUNCTION update_post_comment_counter()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE posts SET comments_count = comments_count + 1 WHERE id = NEW.post_id;
+    ELSE
+        UPDATE posts SET comments_count = comments_count - 1 WHERE id = OLD.post_id;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_comments_post_counter ON comments;
+CREATE TRIGGER trg_comments_post_counter
+    AFTER INSERT OR DELETE ON comments
+    FOR EACH ROW EXECUTE FUNCTION update_post_comment_counter();
+
+-- Inicializar los contadores con los datos existentes
+UPDATE posts p
+SET likes_count = COALESCE(l.likes, 0),
+    dislikes_count = COALESCE(l.dislikes, 0),
+    comments_count = COALESCE(c.comments, 0)
+FROM posts p2
+LEFT JOIN (
+    SELECT post_id,
+           COUNT(*) FILTER (WHERE is_like) AS likes,
+           COUNT(*) FILTER (WHERE NOT is_like) AS dislikes
+    FROM likes
+    GROUP BY post_id
+) l ON l.post_id = p2.id
+LEFT JOIN (
+    SELECT post_id, COUNT(*) AS comments
+    FROM comments
+    GROUP BY post_id
+) c ON c.post_id = p2.id
+WHERE p.id = p2.id;
@@ -0,0 +1,62 @@
+-- Migración: Búsqueda de texto completo en posts y comentarios
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+-- Vector de búsqueda de un texto (configuración 'spanish': busca por raíz de
+-- palabra e ignora palabras vacías). Se indexa como expresión en lugar de
+-- guardarlo en una columna para no agregarlo a cada `select=*` de la API
+CREATE OR REPLACE FUNCTION search_document(p_content TEXT)
+RETURNS tsvector
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT to_tsvector('spanish'::regconfig, COALESCE(p_content, ''));
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_posts_search ON posts USING GIN (search_document(content));
+CREATE INDEX IF NOT EXISTS idx_comments_search ON comments USING GIN (search_document(content));
+
+-- Resultados de la búsqueda `p_query` (sintaxis de buscador web: "frase exacta",
+-- OR, -excluir) ordenados por relevancia y luego por fecha, paginados por
+-- keyset sobre (rank, created_at, id). p_type: 'all', 'posts' o 'comments'.
+-- Los índices GIN encuentran las coincidencias; solo esas filas se puntúan
+CREATE OR REPLACE FUNCTION search_content(
+    p_query TEXT,
+    p_type TEXT DEFAULT 'all',
+    p_limit INTEGER DEFAULT 20,
+    p_before_rank REAL DEFAULT NULL,
+    p_before_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_before_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+    type TEXT,
+    id UUID,
+    post_id UUID,
+    user_email TEXT,
+    content TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    rank REAL
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('spanish', p_query) AS query
+    ),
+    matches AS (
+        SELECT 'post'::text AS type, p.id, p.id AS post_id, p.user_email, p.content, p.created_at,
+               ts_rank(search_document(p.content), q.query) AS rank
+        FROM posts p, q
+        WHERE p_type IN ('all', 'posts') AND search_document(p.content) @@ q.query
+        UNION ALL
+        SELECT 'comment'::text, c.id, c.post_id, c.user_email, c.content, c.created_at,
+               ts_rank(search_document(c.content), q.query)
+        FROM comments c, q
+        WHERE p_type IN ('all', 'comments') AND search_document(c.content) @@ q.query
+    )
+    SELECT m.type, m.id, m.post_id, m.user_email, m.content, m.created_at, m.rank
+    FROM matches m
+    WHERE p_before_rank IS NULL
+       OR (m.rank, m.created_at, m.id) < (p_before_rank, p_before_at, p_before_id)
+    ORDER BY m.rank DESC, m.created_at DESC, m.id DESC
+    LIMIT p_limit;
+$$;
@@ -0,0 +1,125 @@
+-- Migración: Contadores de mensajes no leídos mantenidos por triggers
+-- Requiere migration_add_conversation_list.sql
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+-- No leídos por conversación (destinatario, remitente) y total por usuario.
+-- Leer el conteo es una búsqueda por clave primaria en lugar de un COUNT
+-- sobre messages en cada petición.
+CREATE TABLE IF NOT EXISTS message_unread_counts (
+    receiver_email TEXT NOT NULL,
+    sender_email TEXT NOT NULL,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (receiver_email, sender_email)
+);
+
+CREATE TABLE IF NOT EXISTS user_unread_counts (
+    user_email TEXT PRIMARY KEY,
+    unread_count INTEGER NOT NULL DEFAULT 0
+);
+
+-- Solo el backend (service key) accede a los contadores
+ALTER TABLE message_unread_counts ENABLE ROW LEVEL SECURITY;
+ALTER TABLE user_unread_counts ENABLE ROW LEVEL SECURITY;
+
+-- Suma `delta` a los dos contadores. El upsert bloquea la fila, así que
+-- envíos y lecturas concurrentes no pierden actualizaciones.
+CREATE OR REPLACE FUNCTION bump_unread_counts(p_receiver_email TEXT, p_sender_email TEXT, p_delta INTEGER)
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    INSERT INTO message_unread_counts (receiver_email, sender_email, unread_count)
+    VALUES (p_receiver_email, p_sender_email, p_delta)
+    ON CONFLICT (receiver_email, sender_email)
+    DO UPDATE SET unread_count = message_unread_counts.unread_count + EXCLUDED.unread_count;
+
+    INSERT INTO user_unread_counts (user_email, unread_count)
+    VALUES (p_receiver_email, p_delta)
+    ON CONFLICT (user_email)
+    DO UPDATE SET unread_count = user_unread_counts.unread_count + EXCLUDED.unread_count;
+$$;
+
+-- Trigger de mensajes: cuenta los no leídos al insertar, marcar como leído o borrar
+CREATE OR REPLACE FUNCTION update_unread_counters()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.read IS NOT DISTINCT FROM NEW.read THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND NOT COALESCE(OLD.read, FALSE) THEN
+        PERFORM bump_unread_counts(OLD.receiver_email, OLD.sender_email, -1);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NOT COALESCE(NEW.read, FALSE) THEN
+        PERFORM bump_unread_counts(NEW.receiver_email, NEW.sender_email, 1);
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_messages_unread_counters ON messages;
+CREATE TRIGGER trg_messages_unread_counters
+    AFTER INSERT OR UPDATE OF read OR DELETE ON messages
+    FOR EACH ROW EXECUTE FUNCTION update_unread_counters();
+
+-- Inicializar los contadores con los datos existentes
+INSERT INTO message_unread_counts (receiver_email, sender_email, unread_count)
+SELECT receiver_email, sender_email, COUNT(*)
+FROM messages
+WHERE read = FALSE
+GROUP BY receiver_email, sender_email
+ON CONFLICT (receiver_email, sender_email) DO UPDATE SET unread_count = EXCLUDED.unread_count;
+
+INSERT INTO user_unread_counts (user_email, unread_count)
+SELECT receiver_email, COUNT(*)
+FROM messages
+WHERE read = FALSE
+GROUP BY receiver_email
+ON CONFLICT (user_email) DO UPDATE SET unread_count = EXCLUDED.unread_count;
+
+-- La lista de conversaciones lee los no leídos de los contadores en lugar de contarlos
+CREATE OR REPLACE FUNCTION get_conversations(
+    p_user_email TEXT,
+    p_limit INTEGER DEFAULT 20,
+    p_before_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_before_email TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    email TEXT,
+    last_message_id UUID,
+    last_message TEXT,
+    last_sender_email TEXT,
+    last_message_at TIMESTAMP WITH TIME ZONE,
+    unread_count BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH user_messages AS (
+        SELECT m.receiver_email AS partner, m.id, m.content, m.sender_email, m.created_at
+        FROM messages m
+        WHERE m.sender_email = p_user_email
+        UNION ALL
+        SELECT m.sender_email AS partner, m.id, m.content, m.sender_email, m.created_at
+        FROM messages m
+        WHERE m.receiver_email = p_user_email
+    ),
+    latest AS (
+        SELECT DISTINCT ON (partner) partner, id, content, sender_email, created_at
+        FROM user_messages
+        ORDER BY partner, created_at DESC, id DESC
+    )
+    SELECT l.partner, l.id, LEFT(l.content, 140), l.sender_email, l.created_at, COALESCE(u.unread_count, 0)::BIGINT
+    FROM latest l
+    LEFT JOIN message_unread_counts u ON u.receiver_email = p_user_email AND u.sender_email = l.partner
+    WHERE p_before_at IS NULL OR (l.created_at, l.partner) < (p_before_at, p_before_email)
+    ORDER BY l.created_at DESC, l.partner DESC
+    LIMIT p_limit;
+$$;
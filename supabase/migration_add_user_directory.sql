@@ -0,0 +1,16 @@
+-- Migración: Directorio de usuarios con búsqueda y paginación por cursor
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Nombre con el que se ordena y se busca por prefijo en el directorio: el
+-- username en minúsculas, o el email si el usuario aún no eligió uno.
+-- COLLATE "C" permite que el mismo índice sirva para ORDER BY y para LIKE 'abc%'.
+ALTER TABLE user_profiles ADD COLUMN IF NOT EXISTS directory_name TEXT COLLATE "C"
+    GENERATED ALWAYS AS (LOWER(COALESCE(username, email))) STORED;
+
+-- Páginas del directorio: (directory_name, email) > cursor
+CREATE INDEX IF NOT EXISTS idx_user_profiles_directory ON user_profiles(directory_name, email);
+
+-- Búsqueda por fragmento del username (ILIKE '%abc%') con índice de trigramas
+CREATE INDEX IF NOT EXISTS idx_user_profiles_username_trgm ON user_profiles USING GIN (username gin_trgm_ops);
@@ -0,0 +1,6 @@
+-- Migración: Índice para paginar los posts de un usuario
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+-- Los posts del perfil se filtran por user_email y se paginan por
+-- (created_at, id) < cursor; con este índice cada página lee solo sus filas
+CREATE INDEX IF NOT EXISTS idx_posts_user_email_created_at_id ON posts(user_email, created_at DESC, id DESC);
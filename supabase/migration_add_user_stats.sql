@@ -0,0 +1,163 @@
+-- Migración: Estadísticas de usuario precalculadas
+-- Requiere migration_add_post_counters.sql
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+-- Una fila por usuario, mantenida por triggers en posts, comments y likes,
+-- para que las estadísticas del perfil sean una sola lectura por clave primaria
+CREATE TABLE IF NOT EXISTS user_stats (
+    email TEXT PRIMARY KEY,
+    total_posts INTEGER NOT NULL DEFAULT 0,
+    total_comments INTEGER NOT NULL DEFAULT 0,
+    total_likes_received INTEGER NOT NULL DEFAULT 0,
+    total_dislikes_received INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE user_stats ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "User stats are viewable by everyone" ON user_stats;
+
+CREATE POLICY "User stats are viewable by everyone"
+    ON user_stats FOR SELECT
+    USING (true);
+
+-- Suma los deltas a la fila del usuario (creándola si no existe)
+CREATE OR REPLACE FUNCTION bump_user_stats(
+    p_email TEXT,
+    p_posts INTEGER,
+    p_comments INTEGER,
+    p_likes INTEGER,
+    p_dislikes INTEGER
+)
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    INSERT INTO user_stats (email, total_posts, total_comments, total_likes_received, total_dislikes_received)
+    VALUES (p_email, p_posts, p_comments, p_likes, p_dislikes)
+    ON CONFLICT (email) DO UPDATE SET
+        total_posts = user_stats.total_posts + EXCLUDED.total_posts,
+        total_comments = user_stats.total_comments + EXCLUDED.total_comments,
+        total_likes_received = user_stats.total_likes_received + EXCLUDED.total_likes_received,
+        total_dislikes_received = user_stats.total_dislikes_received + EXCLUDED.total_dislikes_received,
+        updated_at = NOW();
+$$;
+
+-- Posts: al borrar un post se restan de una vez los votos que tenía. Los
+-- likes borrados en cascada ya no encuentran el post y no restan de nuevo.
+CREATE OR REPLACE FUNCTION update_user_stats_on_post()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_user_stats(NEW.user_email, 1, 0, 0, 0);
+    ELSE
+        PERFORM bump_user_stats(OLD.user_email, -1, 0, -OLD.likes_count, -OLD.dislikes_count);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_posts_user_stats ON posts;
+CREATE TRIGGER trg_posts_user_stats
+    AFTER INSERT OR DELETE ON posts
+    FOR EACH ROW EXECUTE FUNCTION update_user_stats_on_post();
+
+-- Comentarios: cuentan para quien comenta, también al borrarse en cascada
+CREATE OR REPLACE FUNCTION update_user_stats_on_comment()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_user_stats(NEW.user_email, 0, 1, 0, 0);
+    ELSE
+        PERFORM bump_user_stats(OLD.user_email, 0, -1, 0, 0);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_comments_user_stats ON comments;
+CREATE TRIGGER trg_comments_user_stats
+    AFTER INSERT OR DELETE ON comments
+    FOR EACH ROW EXECUTE FUNCTION update_user_stats_on_comment();
+
+-- Likes: se reemplaza el trigger de contadores de posts para que, con el
+-- mismo UPDATE, obtenga el autor del post y actualice sus estadísticas
+CREATE OR REPLACE FUNCTION update_post_like_counters()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_author TEXT;
+    v_like INTEGER;
+    v_dislike INTEGER;
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.is_like = NEW.is_like AND OLD.post_id = NEW.post_id THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        v_like := CASE WHEN OLD.is_like THEN 1 ELSE 0 END;
+        v_dislike := 1 - v_like;
+        UPDATE posts
+        SET likes_count = likes_count - v_like,
+            dislikes_count = dislikes_count - v_dislike
+        WHERE id = OLD.post_id
+        RETURNING user_email INTO v_author;
+        -- Si el post ya no existe (borrado en cascada) no hay nada que restar
+        IF FOUND THEN
+            PERFORM bump_user_stats(v_author, 0, 0, -v_like, -v_dislike);
+        END IF;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        v_like := CASE WHEN NEW.is_like THEN 1 ELSE 0 END;
+        v_dislike := 1 - v_like;
+        UPDATE posts
+        SET likes_count = likes_count + v_like,
+            dislikes_count = dislikes_count + v_dislike
+        WHERE id = NEW.post_id
+        RETURNING user_email INTO v_author;
+        IF FOUND THEN
+            PERFORM bump_user_stats(v_author, 0, 0, v_like, v_dislike);
+        END IF;
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+-- Inicializar con los datos existentes
+INSERT INTO user_stats (email, total_posts, total_comments, total_likes_received, total_dislikes_received)
+SELECT email,
+       SUM(posts)::INTEGER,
+       SUM(comments)::INTEGER,
+       SUM(likes)::INTEGER,
+       SUM(dislikes)::INTEGER
+FROM (
+    SELECT user_email AS email, COUNT(*) AS posts, 0 AS comments,
+           SUM(likes_count) AS likes, SUM(dislikes_count) AS dislikes
+    FROM posts
+    GROUP BY user_email
+    UNION ALL
+    SELECT user_email, 0, COUNT(*), 0, 0
+    FROM comments
+    GROUP BY user_email
+) totals
+GROUP BY email
+ON CONFLICT (email) DO UPDATE SET
+    total_posts = EXCLUDED.total_posts,
+    total_comments = EXCLUDED.total_comments,
+    total_likes_received = EXCLUDED.total_likes_received,
+    total_dislikes_received = EXCLUDED.total_dislikes_received,
+    updated_at = NOW();
@@ -0,0 +1,22 @@
+-- Migración: Voto atómico (upsert) que devuelve los nuevos totales del post
+-- Requiere migration_add_post_counters.sql
+-- Ejecuta este SQL en el SQL Editor de Supabase
+
+-- Inserta o actualiza el voto en una sola sentencia (sin carrera contra
+-- UNIQUE(post_id, user_email)) y retorna los contadores ya actualizados
+-- por el trigger, todo en un solo round trip
+CREATE OR REPLACE FUNCTION vote_post(p_post_id UUID, p_user_email TEXT, p_is_like BOOLEAN)
+RETURNS TABLE (likes INTEGER, dislikes INTEGER)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO likes (post_id, user_email, is_like)
+    VALUES (p_post_id, p_user_email, p_is_like)
+    ON CONFLICT (post_id, user_email) DO UPDATE SET is_like = EXCLUDED.is_like;
+
+    RETURN QUERY
+    SELECT p.likes_count, p.dislikes_count
+    FROM posts p
+    WHERE p.id = p_post_id;
+END;
+$$;